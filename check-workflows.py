@@ -1,11 +1,26 @@
 #!/usr/bin/env python3
 """
 Check GitHub Actions workflow status for Money Quiz repository
+
+Usage:
+    python check-workflows.py                 # status + common error check
+    python check-workflows.py flakes          # flaky-job report over run history
+    python check-workflows.py cost            # projected runner-minutes per push / PR
+    python check-workflows.py fleet           # latest runs across many repos/branches
 """
 
-import requests
+import argparse
+import fnmatch
+import itertools
+import math
+import os
+import re
+import statistics
+import threading
 import json
 import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 # GitHub API configuration
@@ -14,26 +29,63 @@ REPO_NAME = "Money-Quiz"
 BRANCH = "arj-upgrade"
 API_BASE = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}"
 
-def get_workflow_runs():
+# Optional token; unauthenticated requests are limited to 60/hour
+GITHUB_TOKEN = os.environ.get('GITHUB_TOKEN', '')
+
+# Conclusions that count as a pass or a fail when looking for flakes
+PASS_CONCLUSIONS = {'success'}
+FAIL_CONCLUSIONS = {'failure', 'timed_out'}
+
+WORKFLOWS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.github', 'workflows')
+
+# Assumed job length when no run history is available for it
+DEFAULT_JOB_MINUTES = 3.0
+
+# Targets checked by 'fleet' when no config file is given
+DEFAULT_FLEET_TARGETS = [
+    {"repo": f"{REPO_OWNER}/{REPO_NAME}", "branch": branch}
+    for branch in ("main", "develop", "arj-upgrade", "v3.21-critical-fixes")
+]
+
+# Requests kept in reserve so a fleet check never drains the whole quota
+RATE_LIMIT_RESERVE = 5
+
+def api_headers():
+    """Headers for GitHub API requests"""
+    headers = {"Accept": "application/vnd.github+json"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+    return headers
+
+def get_workflow_runs(page=1, per_page=10):
     """Get recent workflow runs"""
+    import requests
+    
     url = f"{API_BASE}/actions/runs"
     params = {
         "branch": BRANCH,
-        "per_page": 10
+        "per_page": per_page,
+        "page": page
     }
     
-    response = requests.get(url, params=params)
+    response = requests.get(url, params=params, headers=api_headers())
     if response.status_code == 200:
         return response.json()
     else:
         print(f"Error fetching workflow runs: {response.status_code}")
         return None
 
-def get_workflow_jobs(run_id):
+def get_workflow_jobs(run_id, all_attempts=False):
     """Get jobs for a specific workflow run"""
+    import requests
+    
     url = f"{API_BASE}/actions/runs/{run_id}/jobs"
+    params = {"per_page": 100}
+    if all_attempts:
+        # Include jobs from earlier attempts so reruns are visible
+        params["filter"] = "all"
     
-    response = requests.get(url)
+    response = requests.get(url, params=params, headers=api_headers())
     if response.status_code == 200:
         return response.json()
     else:
@@ -44,6 +96,587 @@ def format_time(timestamp):
     dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
     return dt.strftime('%Y-%m-%d %H:%M:%S')
 
+def job_duration_minutes(job):
+    """Wall-clock minutes a job occupied a runner"""
+    if not job.get('started_at') or not job.get('completed_at'):
+        return 0.0
+    started = datetime.fromisoformat(job['started_at'].replace('Z', '+00:00'))
+    completed = datetime.fromisoformat(job['completed_at'].replace('Z', '+00:00'))
+    return max((completed - started).total_seconds(), 0) / 60
+
+def split_matrix_cell(job_name):
+    """Split 'PHPUnit Tests (7.4, 5.8)' into ('PHPUnit Tests', '7.4, 5.8')"""
+    match = re.match(r'^(.*?) \((.*)\)$', job_name)
+    if match:
+        return match.group(1), match.group(2)
+    return job_name, ''
+
+def fetch_job_history(pages=3, per_page=100):
+    """Fetch completed runs and every job attempt as flat records"""
+    records = []
+    for page in range(1, pages + 1):
+        runs_data = get_workflow_runs(page=page, per_page=per_page)
+        if not runs_data:
+            break
+        runs = runs_data.get('workflow_runs', [])
+        if not runs:
+            break
+        
+        for run in runs:
+            if run['status'] != 'completed':
+                continue
+            jobs_data = get_workflow_jobs(run['id'], all_attempts=True)
+            if not jobs_data:
+                continue
+            for job in jobs_data.get('jobs', []):
+                job_name, matrix_cell = split_matrix_cell(job['name'])
+                records.append({
+                    "workflow": run['name'],
+                    "job": job_name,
+                    "matrix": matrix_cell,
+                    "commit": run['head_sha'],
+                    "run_id": run['id'],
+                    "run_attempt": job.get('run_attempt', 1),
+                    "conclusion": job['conclusion'],
+                    "started_at": job.get('started_at'),
+                    "minutes": round(job_duration_minutes(job), 2)
+                })
+        
+        if len(runs) < per_page:
+            break
+    
+    return records
+
+def find_flaky_jobs(records):
+    """Rank jobs that both passed and failed on the same commit"""
+    outcomes = defaultdict(list)
+    for record in records:
+        key = (record['workflow'], record['job'], record['matrix'], record['commit'])
+        outcomes[key].append(record)
+    
+    stats = defaultdict(lambda: {"commits": 0, "flaky_commits": 0, "flaky_failures": 0,
+                                 "wasted_minutes": 0.0, "examples": []})
+    for (workflow, job, matrix, commit), attempts in outcomes.items():
+        conclusions = {a['conclusion'] for a in attempts}
+        passed = conclusions & PASS_CONCLUSIONS
+        failed = conclusions & FAIL_CONCLUSIONS
+        if not passed and not failed:
+            continue
+        
+        entry = stats[(workflow, job, matrix)]
+        entry["commits"] += 1
+        if passed and failed:
+            failures = [a for a in attempts if a['conclusion'] in FAIL_CONCLUSIONS]
+            entry["flaky_commits"] += 1
+            entry["flaky_failures"] += len(failures)
+            entry["wasted_minutes"] += sum(a['minutes'] for a in failures)
+            entry["examples"].append(commit[:7])
+    
+    flaky = []
+    for (workflow, job, matrix), entry in stats.items():
+        if not entry["flaky_commits"]:
+            continue
+        flaky.append({
+            "workflow": workflow,
+            "job": job,
+            "matrix": matrix,
+            "commits": entry["commits"],
+            "flaky_commits": entry["flaky_commits"],
+            "flaky_failures": entry["flaky_failures"],
+            "flake_rate": entry["flaky_commits"] / entry["commits"],
+            "wasted_minutes": round(entry["wasted_minutes"], 1),
+            "examples": entry["examples"][:3]
+        })
+    
+    flaky.sort(key=lambda f: (f["flake_rate"], f["wasted_minutes"]), reverse=True)
+    return flaky
+
+def print_flaky_jobs(flaky, total_records):
+    """Print the flaky-job ranking"""
+    print("=== Flaky Job Report ===")
+    print(f"Repository: {REPO_OWNER}/{REPO_NAME}")
+    print(f"Branch: {BRANCH}")
+    print(f"Job attempts analysed: {total_records}")
+    print("=" * 50)
+    
+    if not flaky:
+        print("✅ No job both passed and failed on the same commit")
+        return
+    
+    total_wasted = sum(f["wasted_minutes"] for f in flaky)
+    print(f"⚠️  {len(flaky)} flaky job(s), {total_wasted:.1f} runner-minutes burned on failed attempts\n")
+    print(f"{'Flake rate':>10}  {'Wasted min':>10}  {'Commits':>9}  Job")
+    for f in flaky:
+        name = f"{f['workflow']} / {f['job']}"
+        if f['matrix']:
+            name += f" ({f['matrix']})"
+        print(f"{f['flake_rate']:>10.0%}  {f['wasted_minutes']:>10.1f}  "
+              f"{f['flaky_commits']:>4}/{f['commits']:<4}  {name}")
+        print(f"{'':>36}e.g. {', '.join(f['examples'])}")
+
+def run_flakes(args):
+    """Entry point for the 'flakes' subcommand"""
+    if args.from_file:
+        with open(args.from_file) as f:
+            records = json.load(f)
+    else:
+        records = fetch_job_history(pages=args.pages)
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(records, f, indent=2)
+            print(f"✓ Job history saved to {args.save}")
+    
+    flaky = find_flaky_jobs(records)
+    if args.json:
+        print(json.dumps(flaky, indent=2))
+    else:
+        print_flaky_jobs(flaky, len(records))
+
+def load_workflows(workflows_dir=WORKFLOWS_DIR):
+    """Parse every workflow YAML file in .github/workflows"""
+    try:
+        import yaml
+    except ImportError:
+        print("Error: the 'cost' subcommand needs PyYAML (pip install pyyaml)")
+        exit(1)
+    
+    workflows = {}
+    for name in sorted(os.listdir(workflows_dir)):
+        if not name.endswith(('.yml', '.yaml')):
+            continue
+        with open(os.path.join(workflows_dir, name)) as f:
+            data = yaml.safe_load(f) or {}
+        # YAML 1.1 reads the bare key 'on' as boolean True
+        data['on'] = data.get('on', data.pop(True, {}))
+        workflows[name] = data
+    return workflows
+
+def expand_matrix(strategy):
+    """Expand a strategy.matrix block into a list of cells (dicts)"""
+    matrix = (strategy or {}).get('matrix')
+    if not matrix:
+        return [{}]
+    
+    axes = {k: v for k, v in matrix.items() if k not in ('include', 'exclude')}
+    cells = [dict(zip(axes, values)) for values in itertools.product(*axes.values())]
+    
+    for exclude in matrix.get('exclude', []):
+        cells = [c for c in cells
+                 if not all(str(c.get(k)) == str(v) for k, v in exclude.items())]
+    
+    for include in matrix.get('include', []):
+        # Extend matching cells; otherwise the include becomes a new cell
+        original = {k: v for k, v in include.items() if k in axes}
+        matched = False
+        for cell in cells:
+            if all(str(cell.get(k)) == str(v) for k, v in original.items()):
+                cell.update({k: v for k, v in include.items() if k not in axes})
+                matched = True
+        if not matched:
+            cells.append(dict(include))
+    
+    return cells
+
+def workflow_triggered(workflow, event, branch):
+    """Does this workflow run for a push to / PR into the given branch?"""
+    triggers = workflow.get('on') or {}
+    if isinstance(triggers, str):
+        triggers = {triggers: None}
+    elif isinstance(triggers, list):
+        triggers = {t: None for t in triggers}
+    
+    if event not in triggers:
+        return False
+    config = triggers[event] or {}
+    branches = config.get('branches')
+    if branches is None:
+        return True
+    return any(fnmatch.fnmatch(branch, pattern.replace('**', '*')) for pattern in branches)
+
+def path_filtered(workflow, event):
+    """Does the event's trigger only fire when certain files change?"""
+    triggers = workflow.get('on') or {}
+    config = triggers.get(event) if isinstance(triggers, dict) else None
+    return bool(config) and ('paths' in config or 'paths-ignore' in config)
+
+def evaluate_condition(expression, context):
+    """Evaluate a job-level 'if:' expression against a simulated context"""
+    expression = str(expression).strip()
+    if expression.startswith('${{') and expression.endswith('}}'):
+        expression = expression[3:-2]
+    
+    token_re = re.compile(r"\s*(?:('[^']*')|(&&|\|\||==|!=|!|\(|\))|([A-Za-z_][\w.\-]*)\s*(\(\))?)")
+    python = []
+    position = 0
+    while position < len(expression.rstrip()):
+        match = token_re.match(expression, position)
+        if not match:
+            return True  # Unknown syntax: assume the job runs
+        string, operator, name, call = match.groups()
+        if string:
+            python.append(repr(string[1:-1]))
+        elif operator:
+            python.append({'&&': 'and', '||': 'or', '!': 'not'}.get(operator, operator))
+        elif call:
+            python.append(f"fn[{name!r}]()")
+        elif name in ('true', 'false', 'null'):
+            python.append({'true': 'True', 'false': 'False', 'null': 'None'}[name])
+        else:
+            python.append(f"ctx({name!r})")
+        position = match.end()
+    
+    try:
+        return bool(eval(' '.join(python), {'__builtins__': {}},
+                         {'ctx': context['lookup'], 'fn': context['functions']}))
+    except Exception:
+        return True
+
+def jobs_that_run(workflow, event, branch):
+    """Job ids that would run for an event, following needs: and if: rules"""
+    jobs = workflow.get('jobs') or {}
+    runs = {}
+    
+    def needs_of(job):
+        needs = job.get('needs') or []
+        return [needs] if isinstance(needs, str) else needs
+    
+    def decide(job_id, stack=()):
+        if job_id in runs:
+            return runs[job_id]
+        if job_id in stack or job_id not in jobs:
+            return False
+        job = jobs[job_id]
+        needs = needs_of(job)
+        needs_ran = [decide(n, stack + (job_id,)) for n in needs]
+        
+        def lookup(path):
+            parts = path.split('.')
+            if parts[0] == 'needs' and len(parts) >= 3:
+                ran = runs.get(parts[1], False)
+                if parts[2] == 'result':
+                    return 'success' if ran else 'skipped'
+                return None  # Step outputs are unknown statically
+            return {
+                'github.event_name': event,
+                'github.ref': f"refs/heads/{branch}",
+                'github.event.action': 'synchronize' if event == 'pull_request' else None,
+                'github.event.pull_request.draft': False if event == 'pull_request' else None,
+            }.get(path)
+        
+        functions = {
+            'always': lambda: True,
+            'success': lambda: all(needs_ran),
+            'failure': lambda: False,
+            'cancelled': lambda: False,
+        }
+        condition = job.get('if')
+        if condition is None:
+            result = all(needs_ran)
+        else:
+            status_checked = re.search(r'\b(always|success|failure|cancelled)\(\)', str(condition))
+            result = evaluate_condition(condition, {'lookup': lookup, 'functions': functions})
+            if not status_checked:
+                result = result and all(needs_ran)
+        runs[job_id] = result
+        return result
+    
+    for job_id in jobs:
+        decide(job_id)
+    return [job_id for job_id in jobs if runs[job_id]]
+
+def cell_label(cell):
+    """Matrix cell as GitHub renders it in job names: '7.4, 5.8'"""
+    return ', '.join(str(v) for v in cell.values())
+
+def observed_durations(records):
+    """Median minutes per (workflow, job, matrix cell) and per (workflow, job)"""
+    by_cell = defaultdict(list)
+    by_job = defaultdict(list)
+    for record in records:
+        if record.get('conclusion') not in PASS_CONCLUSIONS | FAIL_CONCLUSIONS:
+            continue
+        by_cell[(record['workflow'], record['job'], record['matrix'])].append(record['minutes'])
+        by_job[(record['workflow'], record['job'])].append(record['minutes'])
+    return ({k: statistics.median(v) for k, v in by_cell.items()},
+            {k: statistics.median(v) for k, v in by_job.items()})
+
+def estimate_cost(workflows, records, event, branch, drop=(), shards=None, shard_overhead=1.0):
+    """Projected jobs, billed runner-minutes and wall-clock for one event"""
+    cell_minutes, job_minutes = observed_durations(records)
+    shards = shards or {}
+    units = []
+    conditional = []
+    wall_clock = 0.0
+    
+    for filename, workflow in workflows.items():
+        if not workflow_triggered(workflow, event, branch):
+            continue
+        workflow_name = workflow.get('name', filename)
+        if path_filtered(workflow, event):
+            # Counted as running: the estimate is an upper bound for these
+            conditional.append(workflow_name)
+        jobs = workflow.get('jobs') or {}
+        finish = {}
+        
+        for job_id in jobs_that_run(workflow, event, branch):
+            job = jobs[job_id]
+            job_name = job.get('name', job_id)
+            cells = [c for c in expand_matrix(job.get('strategy'))
+                     if not any(str(c.get(k)) == v for k, v in drop)]
+            
+            longest = 0.0
+            for cell in cells:
+                label = cell_label(cell)
+                minutes = cell_minutes.get((workflow_name, job_name, label),
+                                           job_minutes.get((workflow_name, job_name), DEFAULT_JOB_MINUTES))
+                count = shards.get(job_id, 1)
+                per_shard = minutes / count + (shard_overhead if count > 1 else 0)
+                units.append({
+                    "workflow": workflow_name,
+                    "job": job_name,
+                    "job_id": job_id,
+                    "matrix": label,
+                    "cell": cell,
+                    "minutes": minutes,
+                    "shards": count,
+                    # GitHub bills each job rounded up to the whole minute
+                    "billed": count * math.ceil(per_shard)
+                })
+                longest = max(longest, per_shard)
+            
+            needs = job.get('needs') or []
+            needs = [needs] if isinstance(needs, str) else needs
+            finish[job_id] = max([finish.get(n, 0.0) for n in needs] + [0.0]) + longest
+        
+        wall_clock = max([wall_clock] + list(finish.values()))
+    
+    return {
+        "event": event,
+        "branch": branch,
+        "jobs": len(units),
+        "runner_minutes": sum(u['billed'] for u in units),
+        "wall_clock_minutes": round(wall_clock, 1),
+        "conditional": conditional,
+        "units": units
+    }
+
+def pruning_candidates(estimate):
+    """Runner-minutes saved by dropping each matrix axis value"""
+    savings = defaultdict(float)
+    for unit in estimate['units']:
+        for axis, value in unit['cell'].items():
+            savings[(unit['workflow'], unit['job'], axis, str(value))] += unit['billed']
+    ranked = sorted(savings.items(), key=lambda item: item[1], reverse=True)
+    return [{"workflow": w, "job": j, "drop": f"{a}={v}", "saved_minutes": m}
+            for (w, j, a, v), m in ranked]
+
+def print_cost_estimate(estimate, baseline=None):
+    """Print one event's projection, with the what-if delta if any"""
+    label = "push to" if estimate['event'] == 'push' else "PR into"
+    print(f"\n--- Per {label} {estimate['branch']} ---")
+    print(f"Jobs: {estimate['jobs']}  Runner-minutes: {estimate['runner_minutes']}  "
+          f"Wall-clock: ~{estimate['wall_clock_minutes']} min")
+    if baseline:
+        saved = baseline['runner_minutes'] - estimate['runner_minutes']
+        faster = baseline['wall_clock_minutes'] - estimate['wall_clock_minutes']
+        print(f"What-if vs current: {saved:+} runner-minutes saved, {faster:+.1f} min faster")
+    if estimate['conditional']:
+        print(f"Counted, but only run when their paths change: {', '.join(estimate['conditional'])}")
+    
+    per_job = defaultdict(lambda: [0, 0])
+    for unit in estimate['units']:
+        per_job[(unit['workflow'], unit['job'])][0] += 1
+        per_job[(unit['workflow'], unit['job'])][1] += unit['billed']
+    print(f"{'Cells':>6}  {'Minutes':>7}  Job")
+    for (workflow, job), (cells, minutes) in sorted(per_job.items(), key=lambda i: -i[1][1]):
+        print(f"{cells:>6}  {minutes:>7}  {workflow} / {job}")
+
+def parse_shards(values, workflows):
+    """{job id: shard count} of --shard JOB_ID=N, rejecting ids no workflow defines"""
+    job_ids = {job_id for workflow in workflows.values() for job_id in (workflow.get('jobs') or {})}
+    shards = {}
+    for value in values:
+        job_id, _, count = value.partition('=')
+        if not count.isdigit() or int(count) < 1:
+            print(f"Error: --shard {value}: expected JOB_ID=N with N a positive integer")
+            exit(1)
+        if job_id not in job_ids:
+            print(f"Error: --shard {value}: no job '{job_id}' in the workflow matrix "
+                  f"(known jobs: {', '.join(sorted(job_ids))})")
+            exit(1)
+        shards[job_id] = int(count)
+    return shards
+
+def parse_drop(value):
+    """argparse type for --drop AXIS=VALUE"""
+    axis, sep, cell_value = value.partition('=')
+    if not sep or not axis or not cell_value:
+        raise argparse.ArgumentTypeError(f"expected AXIS=VALUE, got '{value}'")
+    return axis, cell_value
+
+def run_cost(args):
+    """Entry point for the 'cost' subcommand"""
+    workflows = load_workflows(args.workflows_dir)
+    records = []
+    if args.history:
+        with open(args.history) as f:
+            records = json.load(f)
+    
+    drop = args.drop
+    shards = parse_shards(args.shard, workflows)
+    what_if = bool(drop or shards)
+    
+    print("=== Workflow Matrix Cost Estimate ===")
+    print(f"Workflows: {', '.join(workflows)}")
+    print(f"Durations: {'observed from ' + args.history if records else f'{DEFAULT_JOB_MINUTES} min default per job'}")
+    print("=" * 50)
+    
+    report = {}
+    for event, branch in (('push', args.branch), ('pull_request', args.pr_base)):
+        current = estimate_cost(workflows, records, event, branch)
+        estimate = current
+        if what_if:
+            estimate = estimate_cost(workflows, records, event, branch, drop, shards, args.shard_overhead)
+        report[event] = {k: v for k, v in estimate.items() if k != 'units'}
+        print_cost_estimate(estimate, current if what_if else None)
+    
+    candidates = pruning_candidates(estimate_cost(workflows, records, 'pull_request', args.pr_base))
+    print("\n--- Pruning candidates (per PR) ---")
+    for candidate in candidates[:args.top]:
+        print(f"  drop {candidate['drop']:<28} saves {candidate['saved_minutes']:>5.0f} min  "
+              f"({candidate['workflow']} / {candidate['job']})")
+    
+    if args.json:
+        report['pruning_candidates'] = candidates[:args.top]
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Estimate saved to {args.json}")
+
+class RateBudget:
+    """Rate-limit budget shared by every worker in a fleet check"""
+    
+    def __init__(self, max_requests, reserve=RATE_LIMIT_RESERVE):
+        self.remaining = max_requests
+        self.reserve = reserve
+        self.used = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Reserve one request; False once the budget is spent"""
+        with self.lock:
+            if self.remaining - self.reserve <= 0:
+                return False
+            self.remaining -= 1
+            self.used += 1
+            return True
+    
+    def update(self, response):
+        """Sync with the server's view of the remaining quota"""
+        header = response.headers.get('X-RateLimit-Remaining')
+        if header is None:
+            return
+        with self.lock:
+            self.remaining = min(self.remaining, int(header))
+
+def create_session(pool_size):
+    """Pooled keep-alive session shared across fleet workers"""
+    import requests
+    
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.headers.update(api_headers())
+    return session
+
+def load_fleet_targets(config_path):
+    """Read repo/branch targets from a JSON config file"""
+    if not config_path:
+        return DEFAULT_FLEET_TARGETS
+    with open(config_path) as f:
+        config = json.load(f)
+    targets = []
+    for target in config.get('targets', []):
+        branches = target.get('branches') or [target.get('branch')]
+        for branch in branches:
+            targets.append({"repo": target['repo'], "branch": branch})
+    return targets
+
+def fetch_target_status(session, budget, target, per_page=20):
+    """Latest run of each workflow for one repo/branch"""
+    import requests
+    
+    result = {"repo": target['repo'], "branch": target['branch'], "runs": [], "error": None}
+    if not budget.acquire():
+        result["error"] = "rate-limit budget exhausted"
+        return result
+    
+    url = f"https://api.github.com/repos/{target['repo']}/actions/runs"
+    try:
+        response = session.get(url, params={"branch": target['branch'], "per_page": per_page}, timeout=30)
+    except requests.exceptions.RequestException as e:
+        result["error"] = str(e)
+        return result
+    budget.update(response)
+    
+    if response.status_code != 200:
+        result["error"] = f"HTTP {response.status_code}"
+        return result
+    
+    latest = {}
+    for run in response.json().get('workflow_runs', []):
+        # Runs come newest first; keep the first one seen per workflow
+        latest.setdefault(run['name'], run)
+    result["runs"] = list(latest.values())
+    return result
+
+def print_fleet_table(results, elapsed, budget):
+    """Render one aggregated table for every target"""
+    print("=== Fleet Workflow Status ===")
+    print(f"Targets: {len(results)}  Time: {elapsed:.1f}s  API requests: {budget.used}")
+    print("=" * 50)
+    print(f"{'':2} {'Repository':<32} {'Branch':<22} {'Workflow':<24} {'Started':<19} Commit")
+    
+    failing = 0
+    for result in results:
+        repo, branch = result['repo'], result['branch']
+        if result['error']:
+            print(f"❓ {repo:<32} {branch:<22} {'(' + result['error'] + ')'}")
+            continue
+        if not result['runs']:
+            print(f"➖ {repo:<32} {branch:<22} (no runs)")
+            continue
+        for run in sorted(result['runs'], key=lambda r: r['name']):
+            if run['status'] != 'completed':
+                icon = '🔄'
+            elif run['conclusion'] == 'success':
+                icon = '✅'
+            else:
+                icon = '❌'
+                failing += 1
+            commit = run['head_commit']['message'].split('\n')[0][:40] if run.get('head_commit') else ''
+            print(f"{icon} {repo:<32} {branch:<22} {run['name'][:24]:<24} "
+                  f"{format_time(run['created_at'])} {commit}")
+    
+    print(f"\n{'⚠️  ' + str(failing) + ' failing workflow(s)' if failing else '✅ No failing workflows'}")
+
+def run_fleet(args):
+    """Entry point for the 'fleet' subcommand"""
+    targets = load_fleet_targets(args.config)
+    workers = max(1, min(args.workers, len(targets)))
+    session = create_session(workers)
+    budget = RateBudget(args.max_requests)
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda t: fetch_target_status(session, budget, t), targets))
+    elapsed = time.perf_counter() - started
+    session.close()
+    
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_fleet_table(results, elapsed, budget)
+
 def print_workflow_status():
     """Print current workflow status"""
     print("=== GitHub Actions Workflow Status ===")
@@ -132,7 +765,8 @@ def check_for_errors():
     
     return errors_found
 
-if __name__ == "__main__":
+def run_status(args):
+    """Default behaviour: current status plus common error check"""
     print_workflow_status()
     
     # Check for errors
@@ -146,4 +780,54 @@ if __name__ == "__main__":
         print("✅ All workflows are passing or in progress!")
     
     print("\nView full details at:")
-    print(f"https://github.com/{REPO_OWNER}/{REPO_NAME}/actions")
\ No newline at end of file
+    print(f"https://github.com/{REPO_OWNER}/{REPO_NAME}/actions")
+
+def build_parser():
+    """Command-line interface"""
+    parser = argparse.ArgumentParser(description="GitHub Actions tooling for Money Quiz")
+    parser.add_argument('--branch', default=BRANCH, help=f"branch to inspect (default: {BRANCH})")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    subparsers.add_parser('status', help="current workflow status (default)")
+    
+    flakes = subparsers.add_parser('flakes', help="find jobs that passed and failed on the same commit")
+    flakes.add_argument('--pages', type=int, default=3, help="pages of 100 runs to fetch")
+    flakes.add_argument('--save', help="save fetched job history to a JSON file")
+    flakes.add_argument('--from-file', help="analyse a previously saved job history")
+    flakes.add_argument('--json', action='store_true', help="print the ranking as JSON")
+    
+    cost = subparsers.add_parser('cost', help="projected runner-minutes per push and per PR")
+    cost.add_argument('--workflows-dir', default=WORKFLOWS_DIR, help="directory of workflow YAML files")
+    cost.add_argument('--history', help="job history saved by 'flakes --save' for observed durations")
+    cost.add_argument('--pr-base', default='main', help="base branch for the per-PR estimate")
+    cost.add_argument('--drop', action='append', default=[], type=parse_drop, metavar='AXIS=VALUE',
+                      help="what-if: prune matrix cells, e.g. wordpress-version=5.8")
+    cost.add_argument('--shard', action='append', default=[], metavar='JOB_ID=N',
+                      help="what-if: split each cell of a job into N parallel shards")
+    cost.add_argument('--shard-overhead', type=float, default=1.0,
+                      help="setup minutes added to every shard")
+    cost.add_argument('--top', type=int, default=10, help="pruning candidates to list")
+    cost.add_argument('--json', help="also write the estimate to a JSON file")
+    
+    fleet = subparsers.add_parser('fleet', help="latest runs across many repos and branches at once")
+    fleet.add_argument('--config', help='JSON file: {"targets": [{"repo": "owner/name", "branches": [...]}]}')
+    fleet.add_argument('--workers', type=int, default=10, help="concurrent requests")
+    fleet.add_argument('--max-requests', type=int, default=60, help="API requests this check may spend")
+    fleet.add_argument('--json', action='store_true', help="print raw results as JSON")
+    
+    return parser
+
+def main(argv=None):
+    global BRANCH
+    args = build_parser().parse_args(argv)
+    BRANCH = args.branch
+    
+    commands = {
+        'flakes': run_flakes,
+        'cost': run_cost,
+        'fleet': run_fleet,
+    }
+    commands.get(args.command, run_status)(args)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,35 +1,42 @@
 #!/usr/bin/env python3
 """
 Test Grok API connection and send review
+
+--bench measures streamed latency and throughput at rising concurrency
+instead, to find the concurrency sweet spot before a large review run.
 """
 
-import requests
+import argparse
 import json
 import time
-import os
+from concurrent.futures import ThreadPoolExecutor
 
-# Configuration
-API_KEY = os.environ.get('GROK_API_KEY', '')
-API_ENDPOINT = "https://api.x.ai/v1/chat/completions"
+# Configuration (the API key is checked lazily, when a request is made)
+from mqtools.config import API_ENDPOINT, LATENCY_MODEL_PATH, MODEL, require_api_key
+from mqtools.latency import LatencyTracker, payload_tokens, percentile
 
-if not API_KEY:
-    print("Error: GROK_API_KEY environment variable not set")
-    print("Please set it with: export GROK_API_KEY='your-api-key'")
-    exit(1)
+BENCH_LEVELS = "1,2,4,8,16"
+BENCH_CODE = ("$results = $wpdb->get_row( \"SELECT * FROM \".$table_prefix.TABLE_MQ_PROSPECTS."
+              "\" WHERE Email = '\".$Email.\"'\", OBJECT );\n")
+MAX_ERROR_RATE = 0.01   # levels above this are never the sweet spot
+NEAR_BEST = 0.9         # throughput within 10% of the best counts as saturated
 
 def test_grok_api():
     """Test the Grok API with a simple request"""
     
+    api_key = require_api_key()
+    import requests
+    
     print("Testing Grok API connection...")
     
     headers = {
-        "Authorization": f"Bearer {API_KEY}",
+        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
     
     # Simple test message
     payload = {
-        "model": "grok-4-0709",
+        "model": MODEL,
         "messages": [
             {
                 "role": "user",
@@ -40,13 +47,17 @@ def test_grok_api():
         "max_tokens": 100
     }
     
+    # Deadlines from the shared latency model; 30s until it has samples
+    tracker = LatencyTracker(path=LATENCY_MODEL_PATH)
+    connect, read, _ = tracker.timeouts(payload_tokens(payload), payload["max_tokens"], default=30)
+    
     try:
         print("Sending test request...")
         response = requests.post(
             API_ENDPOINT,
             headers=headers,
             json=payload,
-            timeout=30
+            timeout=(connect, read)
         )
         
         print(f"Status Code: {response.status_code}")
@@ -67,7 +78,7 @@ def test_grok_api():
         print(f"Error: {e}")
         return False
     except requests.exceptions.Timeout as e:
-        print(f"\n✗ Timeout Error: Request timed out after 30 seconds")
+        print(f"\n✗ Timeout Error: Request timed out after {read:.0f} seconds")
         print(f"Error: {e}")
         return False
     except Exception as e:
@@ -77,10 +88,13 @@ def test_grok_api():
 def send_code_review():
     """Send a shorter code review request"""
     
+    api_key = require_api_key()
+    import requests
+    
     print("\nPreparing code review request...")
     
     headers = {
-        "Authorization": f"Bearer {API_KEY}",
+        "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
     
@@ -122,7 +136,7 @@ Please:
 Can you provide a brief security assessment?"""
 
     payload = {
-        "model": "grok-4-0709",
+        "model": MODEL,
         "messages": [
             {
                 "role": "system",
@@ -137,13 +151,16 @@ Can you provide a brief security assessment?"""
         "max_tokens": 2000
     }
     
+    tracker = LatencyTracker(path=LATENCY_MODEL_PATH)
+    connect, read, _ = tracker.timeouts(payload_tokens(payload), payload["max_tokens"], default=45)
+    
     try:
         print("Sending code review request...")
         response = requests.post(
             API_ENDPOINT,
             headers=headers,
             json=payload,
-            timeout=45
+            timeout=(connect, read)
         )
         
         if response.status_code == 200:
@@ -170,7 +187,206 @@ Can you provide a brief security assessment?"""
     except Exception as e:
         print(f"\n✗ Error: {type(e).__name__}: {e}")
 
-if __name__ == "__main__":
+def bench_payload(prompt_tokens, max_tokens):
+    """Streaming review request of roughly prompt_tokens tokens"""
+    code = (BENCH_CODE * (prompt_tokens * 4 // len(BENCH_CODE) + 1))[:prompt_tokens * 4]
+    return {
+        "model": MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a WordPress security expert."
+            },
+            {
+                "role": "user",
+                "content": f"Review this code for security issues:\n```php\n{code}\n```"
+            }
+        ],
+        "temperature": 0.3,
+        "max_tokens": max_tokens,
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    }
+
+def stream_request(session, endpoint, payload, timeout):
+    """One streamed completion: latency, time to first token and tokens received"""
+    started = time.perf_counter()
+    first_token = None
+    pieces = 0
+    usage = None
+    response = session.post(endpoint, json=payload, timeout=timeout, stream=True)
+    try:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith(b'data: '):
+                continue
+            data = line[len(b'data: '):]
+            if data == b'[DONE]':
+                break
+            chunk = json.loads(data)
+            usage = chunk.get('usage') or usage
+            for choice in chunk.get('choices', []):
+                if choice.get('delta', {}).get('content'):
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                    pieces += 1
+    finally:
+        response.close()
+    latency = time.perf_counter() - started
+    tokens = (usage or {}).get('completion_tokens') or pieces
+    return {"latency": latency, "ttft": first_token if first_token is not None else latency, "tokens": tokens}
+
+def run_level(session, endpoint, payload, concurrency, count, timeout):
+    """count streamed requests with concurrency in flight; summary of the level"""
+    def one(_):
+        try:
+            return stream_request(session, endpoint, payload, timeout)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+    
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(count)))
+    wall = time.perf_counter() - started
+    
+    ok = [r for r in results if 'error' not in r]
+    errors = [r['error'] for r in results if 'error' in r]
+    summary = {
+        "concurrency": concurrency,
+        "requests": count,
+        "errors": len(errors),
+        "error_rate": round(len(errors) / count, 3),
+        "throughput_tokens_per_second": round(sum(r['tokens'] for r in ok) / wall, 1)
+    }
+    if ok:
+        latencies = [r['latency'] * 1000 for r in ok]
+        ttfts = [r['ttft'] * 1000 for r in ok]
+        # Generation speed of each stream once its first token arrived
+        rates = [r['tokens'] / (r['latency'] - r['ttft']) for r in ok if r['latency'] > r['ttft']]
+        summary.update({
+            "latency_ms": {f"p{q}": round(percentile(latencies, q / 100), 1) for q in (50, 95, 99)},
+            "ttft_ms": {f"p{q}": round(percentile(ttfts, q / 100), 1) for q in (50, 95, 99)},
+            "tokens_per_second": round(percentile(rates, 0.5), 1) if rates else None
+        })
+    if errors:
+        summary["sample_error"] = errors[0]
+    return summary
+
+def sweet_spot(levels):
+    """Lowest concurrency that gets near the best throughput without errors
+    
+    Past that point more parallel calls mostly add latency.
+    """
+    healthy = [level for level in levels if level['error_rate'] <= MAX_ERROR_RATE and 'latency_ms' in level]
+    if not healthy:
+        return None
+    best = max(level['throughput_tokens_per_second'] for level in healthy)
+    return min(level['concurrency'] for level in healthy
+               if level['throughput_tokens_per_second'] >= NEAR_BEST * best)
+
+def render_benchmark(report):
+    """Markdown table of a benchmark report"""
+    settings = report['settings']
+    lines = [
+        "# Grok API Benchmark",
+        "",
+        f"**Date:** {report['date']}  **Endpoint:** {report['endpoint']}",
+        f"**Requests per level:** {settings['requests']}  **Prompt:** ~{settings['prompt_tokens']} tokens  "
+        f"**max_tokens:** {settings['max_tokens']}",
+        "",
+        "| Concurrency | TTFT p50 ms | TTFT p95 ms | Latency p50 ms | Latency p95 ms | Latency p99 ms "
+        "| Tokens/s per stream | Total tokens/s | Error rate |",
+        "|---:|---:|---:|---:|---:|---:|---:|---:|---:|"
+    ]
+    for level in report['levels']:
+        ttft = level.get('ttft_ms', {})
+        latency = level.get('latency_ms', {})
+        lines.append(f"| {level['concurrency']} | {ttft.get('p50', '-')} | {ttft.get('p95', '-')} "
+                     f"| {latency.get('p50', '-')} | {latency.get('p95', '-')} | {latency.get('p99', '-')} "
+                     f"| {level.get('tokens_per_second') or '-'} | {level['throughput_tokens_per_second']} "
+                     f"| {level['error_rate']:.1%} |")
+    lines.append("")
+    if report['sweet_spot']:
+        lines.append(f"**Sweet spot:** concurrency {report['sweet_spot']} "
+                     f"(lowest with {NEAR_BEST:.0%} of the best total tokens/s and at most {MAX_ERROR_RATE:.0%} errors)")
+    else:
+        lines.append("**Sweet spot:** none - every level had errors")
+    return "\n".join(lines) + "\n"
+
+def run_benchmark(args):
+    """Sweep concurrency levels and report latency, TTFT, throughput and errors"""
+    import requests
+    
+    server = None
+    if args.mock:
+        from mqtools.mock_server import MockSettings, start_mock_server
+        server, endpoint = start_mock_server(MockSettings(median=args.mock_median, seed=42))
+        api_key = "mock"
+    else:
+        endpoint, api_key = API_ENDPOINT, require_api_key()
+    
+    levels = [int(level) for level in args.levels.split(',')]
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=max(levels), pool_maxsize=max(levels))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update({
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    })
+    payload = bench_payload(args.prompt_tokens, args.max_tokens)
+    connect, read, _ = LatencyTracker(path=LATENCY_MODEL_PATH).timeouts(
+        payload_tokens(payload), args.max_tokens, default=60)
+    
+    print(f"Benchmarking {endpoint}")
+    print(f"{args.requests} requests per level, ~{args.prompt_tokens} prompt tokens, max_tokens {args.max_tokens}")
+    print("=" * 60)
+    results = []
+    for concurrency in levels:
+        level = run_level(session, endpoint, payload, concurrency, args.requests, (connect, read))
+        results.append(level)
+        latency = level.get('latency_ms', {})
+        print(f"  concurrency {concurrency:>2}: p50 {latency.get('p50', '-')} ms, "
+              f"{level['throughput_tokens_per_second']} tokens/s, {level['error_rate']:.1%} errors")
+    session.close()
+    if server:
+        server.shutdown()
+    
+    report = {
+        "date": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "endpoint": "mock" if args.mock else endpoint,
+        "settings": {"requests": args.requests, "prompt_tokens": args.prompt_tokens,
+                     "max_tokens": args.max_tokens, "levels": levels},
+        "levels": results,
+        "sweet_spot": sweet_spot(results)
+    }
+    markdown = render_benchmark(report)
+    with open(args.json, 'w') as f:
+        json.dump(report, f, indent=2)
+    with open(args.markdown, 'w') as f:
+        f.write(markdown)
+    print("\n" + markdown)
+    print(f"✓ Results saved to {args.json} and {args.markdown}")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Test the Grok API connection, or benchmark it")
+    parser.add_argument('--bench', action='store_true', help="latency/throughput sweep instead of the connection test")
+    parser.add_argument('--levels', default=BENCH_LEVELS, help=f"concurrency levels (default: {BENCH_LEVELS})")
+    parser.add_argument('--requests', type=int, default=16, help="requests per concurrency level")
+    parser.add_argument('--prompt-tokens', type=int, default=500, help="approximate prompt size")
+    parser.add_argument('--max-tokens', type=int, default=200, help="completion size")
+    parser.add_argument('--mock', action='store_true', help="benchmark an in-process mock server instead")
+    parser.add_argument('--mock-median', type=float, default=0.2, help="mock first-token median in seconds")
+    parser.add_argument('--json', default='grok-api-benchmark.json')
+    parser.add_argument('--markdown', default='grok-api-benchmark.md')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.bench:
+        run_benchmark(args)
+        return
+    
     # First test the connection
     if test_grok_api():
         # If successful, send the code review
@@ -182,4 +398,7 @@ if __name__ == "__main__":
         print("2. API key might be invalid or expired")
         print("3. Network connectivity issues")
         print("4. API service might be down")
-        print("\nPlease verify your API credentials and endpoint.")
\ No newline at end of file
+        print("\nPlease verify your API credentials and endpoint.")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
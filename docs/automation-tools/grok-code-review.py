@@ -3,30 +3,38 @@
 Script to send Money Quiz plugin code to Grok AI for review
 """
 
-import requests
 import json
-import os
+import sys
 from pathlib import Path
 
-# Configuration
-API_KEY = os.environ.get('GROK_API_KEY', '')
-API_ENDPOINT = "https://api.x.ai/v1/chat/completions"
-
-if not API_KEY:
-    print("Error: GROK_API_KEY environment variable not set")
-    print("Please set it with: export GROK_API_KEY='your-api-key'")
-    exit(1)
+# Configuration (the API key is checked lazily, when a request is made)
+from mqtools.client import GrokClient
+from mqtools.config import API_ENDPOINT, MODEL, OUTPUT_MODEL_PATH, plugin_path, require_api_key
+from mqtools.latency import estimate_tokens
+from mqtools.outputs import STOP_INSTRUCTION, OutputModel, complete_sized, stop_parameters
+from mqtools.symbols import load_symbol_index
 
 def read_file(file_path):
     """Read file content"""
     with open(file_path, 'r', encoding='utf-8') as file:
         return file.read()
 
-def analyze_code_with_grok(code_content, filename):
+def analyze_code_with_grok(client, outputs, code_content, filename, context=''):
     """Send code to Grok for analysis"""
+    input_tokens = estimate_tokens(code_content)
+    max_tokens = outputs.max_tokens("comprehensive", input_tokens)
+    
+    if context:
+        context = f"""Definitions from other plugin files that this code uses (for reference, not under review):
+    ```php
+    {context}
+    ```
+    
+    """
     
+    # Stable instructions first and the file last, so calls share a cacheable prefix
     prompt = f"""
-    Please perform a comprehensive code review of this WordPress plugin file: {filename}
+    Please perform a comprehensive code review of the WordPress plugin file at the end of this message.
     
     Focus on:
     1. Security vulnerabilities (SQL injection, XSS, CSRF)
@@ -35,19 +43,20 @@ def analyze_code_with_grok(code_content, filename):
     4. Bugs and potential errors
     5. Suggestions for improvement
     
+    {STOP_INSTRUCTION}
+    
+    {context}File: {filename}
+    
     Code:
     ```php
     {code_content}
     ```
-    """
     
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
+    {outputs.guidance(max_tokens)}
+    """
     
     payload = {
-        "model": "grok-4-0709",  # Update based on API docs
+        "model": MODEL,
         "messages": [
             {
                 "role": "system",
@@ -59,27 +68,34 @@ def analyze_code_with_grok(code_content, filename):
             }
         ],
         "temperature": 0.7,
-        "max_tokens": 4000
+        "max_tokens": max_tokens,
+        **stop_parameters(MODEL)
     }
     
-    try:
-        response = requests.post(API_ENDPOINT, headers=headers, json=payload)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error calling Grok API: {e}")
+    result = complete_sized(client, payload, outputs, "comprehensive", input_tokens)
+    if "error" in result:
+        print(f"Error calling Grok API: {result['error']}")
         return None
+    return result
+
+DEFAULT_FILES = [
+    "moneyquiz.php",
+    "class.moneyquiz.php",
+    "quiz.moneycoach.php",
+    "integration.admin.php"
+]
 
-def main():
+def main(files_to_review=None):
     """Main function to review Money Quiz plugin files"""
     
     # Define files to review
-    files_to_review = [
-        "moneyquiz.php",
-        "class.moneyquiz.php",
-        "quiz.moneycoach.php",
-        "integration.admin.php"
-    ]
+    files_to_review = files_to_review or [plugin_path(name) for name in DEFAULT_FILES]
+    if not any(Path(filename).exists() for filename in files_to_review):
+        print(f"None of the files to review were found: {', '.join(map(str, files_to_review))}")
+        sys.exit(1)
+    client = GrokClient(require_api_key(), API_ENDPOINT, timeout=60)
+    symbols = load_symbol_index()
+    outputs = OutputModel(path=OUTPUT_MODEL_PATH)
     
     results = {}
     
@@ -93,7 +109,7 @@ def main():
             if len(code_content) > 10000:
                 code_content = code_content[:10000] + "\n... [truncated]"
             
-            result = analyze_code_with_grok(code_content, filename)
+            result = analyze_code_with_grok(client, outputs, code_content, filename, symbols.context_for(code_content))
             if result:
                 results[filename] = result
                 print(f"✓ Completed analysis of {filename}")
@@ -101,6 +117,8 @@ def main():
                 print(f"✗ Failed to analyze {filename}")
         else:
             print(f"File not found: {filename}")
+    client.close()
+    outputs.save()
     
     # Save results
     with open('grok-analysis-results.json', 'w') as f:
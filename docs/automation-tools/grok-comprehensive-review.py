@@ -4,27 +4,74 @@ Comprehensive script to analyze Money Quiz plugin with Grok AI
 Handles large files, multiple analysis types, and generates detailed reports
 """
 
-import requests
+import hashlib
 import json
 import os
+import sys
 import time
 from pathlib import Path
 from datetime import datetime
 
-# Configuration
-API_KEY = os.environ.get('GROK_API_KEY', '')
-API_ENDPOINT = "https://api.x.ai/v1/chat/completions"
+# Configuration (the API key is checked lazily, when a request is made)
+from mqtools.chunkers import PHP, chunker_for
+from mqtools.clones import collapse, collapsed_regions, find_clones, render_clones
+from mqtools.client import GrokClient
+from mqtools.config import (API_ENDPOINT, FINDINGS_DB, MODEL, OUTPUT_MODEL_PATH, PLUGIN_DIR, REVIEW_OVERRIDES,
+                            plugin_path, require_api_key)
+from mqtools.dedupe import consolidate_findings, render_consolidated, render_group
+from mqtools.diffscope import (DIFF_NOTE, changed_lines, file_at, on_changed_lines, parse_range,
+                               regions_for, render_units)
+from mqtools.findings import FindingsIndex, chunk_line_offsets, findings_from_results, reviewed_files
+from mqtools.latency import estimate_tokens
+from mqtools.outputs import DEFAULT_MAX_TOKENS, STOP_INSTRUCTION, OutputModel, complete_sized, stop_parameters
+from mqtools.packing import PACKED_NOTE, is_small, pack_files, render_packed, split_packed_response
+from mqtools.queries import load_query_index, query_findings, query_note
+from mqtools.results import RAW_LOG, ResultLog, UnitResult, load_results
+from mqtools.rundiff import diff_findings, render_delta
+from mqtools.symbols import load_symbol_index
+from mqtools.taint import load_taint_engine, taint_findings, taint_note
+from mqtools.vendored import FIRST_PARTY, classify_text, load_overrides, relative_name, split_first_party
 
-if not API_KEY:
-    print("Error: GROK_API_KEY environment variable not set")
-    print("Please set it with: export GROK_API_KEY='your-api-key'")
-    exit(1)
+PENDING_FILE = 'grok-pending-units.json'
+METRICS_FILE = 'grok-run-metrics.json'
+# Counters a resumed run adds to those of the run it resumes
+ADDITIVE_METRICS = ("requests", "hedges", "hedge_wins", "timeouts_hit", "skipped", "prompt_tokens", "cached_tokens",
+                    "completion_tokens", "circuit_opens", "symbol_context_tokens", "packed_requests")
+
+def merge_metrics(previous, metrics):
+    """Metrics of the run a --resume continued, with the resumed units' counters added"""
+    merged = dict(previous)
+    for key in ADDITIVE_METRICS:
+        merged[key] = previous.get(key, 0) + metrics.get(key, 0)
+    merged["cache_hit_rate"] = round(merged["cached_tokens"] / max(1, merged["prompt_tokens"]), 3)
+    # Percentiles cannot be combined; each resume keeps its own
+    merged["resumes"] = previous.get("resumes", []) + [metrics]
+    return merged
 
 class GrokCodeReviewer:
-    def __init__(self, api_key, api_endpoint):
+    def __init__(self, api_key, api_endpoint, raw_report=False, full_report=False, hedging=False,
+                 packing=True):
         self.api_key = api_key
         self.api_endpoint = api_endpoint
+        self.client = GrokClient(api_key, api_endpoint, timeout=60, hedging=hedging)
+        self.outputs = OutputModel(path=OUTPUT_MODEL_PATH)  # max_tokens from past answer lengths
+        self.max_tokens_sent = []
+        self.raw_report = raw_report  # Full per-chunk output instead of consolidated findings
+        self.full_report = full_report  # All findings, not just the delta against the last run
+        self.packing = packing  # Review small files together in shared requests
+        self.packed_requests = 0
         self.results = {}
+        self.log = None  # JSONL log of full response bodies, opened per run
+        self.symbols = None  # plugin symbol index, loaded on first use
+        self.taint = None  # local taint engine, loaded on first use
+        self.queries = None  # local $wpdb query index, loaded on first use
+        self.context_tokens = 0
+        self.excluded = {}  # minified and vendored files left out: path -> (kind, reason, tokens)
+        self.clones = []  # clone classes of the reviewed files; one copy of each is sent
+        self.collapsed = {}  # relative path -> [(first line, last line, note)] of the copies left out
+        self.clone_tokens_saved = 0
+        self.pending = {}  # failed units and units skipped while the circuit was open, for --resume
+        self.run_id = datetime.now().strftime('%Y%m%d-%H%M%S')
         
     def read_file(self, file_path):
         """Read file content with error handling"""
@@ -35,110 +82,150 @@ class GrokCodeReviewer:
             print(f"Error reading {file_path}: {e}")
             return None
     
-    def chunk_code(self, code, max_length=8000):
-        """Split large code files into chunks"""
-        if len(code) <= max_length:
-            return [code]
-        
-        chunks = []
-        lines = code.split('\n')
-        current_chunk = []
-        current_length = 0
-        
-        for line in lines:
-            if current_length + len(line) > max_length and current_chunk:
-                chunks.append('\n'.join(current_chunk))
-                current_chunk = [line]
-                current_length = len(line)
-            else:
-                current_chunk.append(line)
-                current_length += len(line) + 1
-        
-        if current_chunk:
-            chunks.append('\n'.join(current_chunk))
+    def chunk_code(self, code, max_length=8000, filename=None):
+        """Split large code files into chunks of whole units of their language"""
+        return chunker_for(filename).split(code, max_length)
+    
+    def find_clones(self, files):
+        """Detect clone classes among the files under review, so each is sent once"""
+        self.clones = find_clones(files, PLUGIN_DIR)
+        self.collapsed = collapsed_regions(self.clones)
+        for filepath in files:
+            code = self.read_file(filepath) if relative_name(filepath, PLUGIN_DIR) in self.collapsed else None
+            if code:
+                self.clone_tokens_saved += estimate_tokens(code) - estimate_tokens(self.without_clones(filepath, code))
+        if self.clones:
+            copies = sum(len(regions) for regions in self.collapsed.values())
+            print(f"✓ {len(self.clones)} clone classes: {copies} near-copies left out of prompts "
+                  f"(~{self.clone_tokens_saved} tokens), reviewed through one copy each")
+    
+    def without_clones(self, filepath, code):
+        """code with the copies of clone classes blanked, except their representatives; lines keep their numbers"""
+        return collapse(code, self.collapsed.get(relative_name(filepath, PLUGIN_DIR)), filepath)
+    
+    def symbol_context(self, code):
+        """Definitions from the rest of the plugin that code references"""
+        if self.symbols is None:
+            self.symbols = load_symbol_index()
+        return self.symbols.context_for(code)
+    
+    def taint_sinks(self, filepath, code=None):
+        """SQL and output sinks of a file with the local taint engine's verdicts"""
+        if not chunker_for(filepath).taint:
+            return []
+        if self.taint is None:
+            self.taint = load_taint_engine()
+        if not (os.path.isabs(filepath) or os.path.exists(filepath)):
+            filepath = os.path.join(self.taint.root, filepath)  # diff paths are relative to the plugin
+        if code is None:
+            code = self.read_file(filepath)
+        name = os.path.relpath(os.path.abspath(filepath), os.path.abspath(self.taint.root))
+        return self.taint.file_sinks(name, code) if code else []
+    
+    def query_hotspots(self, filepath, code=None):
+        """$wpdb queries of a file that run once per loop iteration"""
+        if not chunker_for(filepath).taint:
+            return []
+        if self.queries is None:
+            self.queries = load_query_index()
+        if not (os.path.isabs(filepath) or os.path.exists(filepath)):
+            filepath = os.path.join(self.queries.root, filepath)  # diff paths are relative to the plugin
+        name = os.path.relpath(os.path.abspath(filepath), os.path.abspath(self.queries.root)).replace(os.sep, '/')
+        if code is None:
+            code = self.read_file(filepath)
+        if code:
+            self.queries.add_file(name, code)
+        return self.queries.hotspots([name])
+    
+    def local_findings(self):
+        """Findings decided without the model (taint flows, queries in loops) for every reviewed file"""
+        findings = []
+        for filepath, results in self.results.items():
+            if 'analyses' in results:
+                findings += taint_findings(self.taint_sinks(filepath), results['filename'])
+                findings += query_findings(self.query_hotspots(filepath), results['filename'])
+        return findings
+    
+    def context_block(self, context):
+        """Prompt section with the referenced definitions, if any"""
+        if not context:
+            return ""
+        return f"""Definitions from other plugin files that this code uses (for reference, not under review):
+        ```php
+        {context}
+        ```
         
-        return chunks
+        """
     
-    def analyze_security(self, code, filename):
-        """Perform security-focused analysis"""
-        prompt = f"""
-        Perform a SECURITY-FOCUSED review of this WordPress plugin file: {filename}
+    def build_prompt(self, instructions, code, filename, context='', notes='', max_tokens=DEFAULT_MAX_TOKENS,
+                     fence=PHP.fence):
+        """Prompt with stable material first and the chunk last
         
-        Specifically check for:
-        1. SQL Injection vulnerabilities
-        2. Cross-Site Scripting (XSS) vulnerabilities
-        3. Cross-Site Request Forgery (CSRF) issues
-        4. Authentication and authorization flaws
-        5. Insecure data storage or transmission
-        6. Hardcoded sensitive information
-        7. File upload vulnerabilities
-        8. Command injection risks
+        Instructions, packing notes and the file's symbol context are the
+        same for every chunk of a pass, so consecutive calls share a prefix
+        the provider can serve from its prompt cache. The file name and code
+        come after it, followed by the length hint for this unit.
+        """
+        return f"""{instructions}
+        {STOP_INSTRUCTION}
         
-        Provide specific line numbers and code examples for each vulnerability found.
+        {notes}{self.context_block(context)}File: {filename}
         
         Code:
-        ```php
+        ```{fence}
         {code}
         ```
+        
+        {self.outputs.guidance(max_tokens)}
+        """
+    
+    def review_unit(self, analysis_type, instructions, code, filename, context='', notes='', chunker=PHP):
+        """Send one unit with max_tokens sized from past answers to similar units"""
+        input_tokens = estimate_tokens(code)
+        max_tokens = self.outputs.max_tokens(analysis_type, input_tokens)
+        prompt = self.build_prompt(instructions, code, filename, context, notes, max_tokens, chunker.fence)
+        return self.call_grok_api(prompt, analysis_type, max_tokens, input_tokens)
+    
+    def analyze_security(self, code, filename, context='', notes='', chunker=PHP):
+        """Perform security-focused analysis"""
+        instructions = f"""
+        Perform a SECURITY-FOCUSED review of the {chunker.subject} at the end of this message.
+        
+        Specifically check for:
+{chunker.checklist("security")}
+        
+        Provide specific line numbers and code examples for each vulnerability found.
         """
-        return self.call_grok_api(prompt, "security")
+        return self.review_unit("security", instructions, code, filename, context, notes, chunker)
     
-    def analyze_code_quality(self, code, filename):
+    def analyze_code_quality(self, code, filename, context='', notes='', chunker=PHP):
         """Perform code quality analysis"""
-        prompt = f"""
-        Perform a CODE QUALITY review of this WordPress plugin file: {filename}
+        instructions = f"""
+        Perform a CODE QUALITY review of the {chunker.subject} at the end of this message.
         
         Focus on:
-        1. WordPress coding standards compliance
-        2. PHP best practices
-        3. Code organization and structure
-        4. DRY (Don't Repeat Yourself) violations
-        5. Function complexity and maintainability
-        6. Error handling and logging
-        7. Documentation and comments
-        8. Performance issues
+{chunker.checklist("code_quality")}
         
         Provide specific examples and improvement suggestions.
-        
-        Code:
-        ```php
-        {code}
-        ```
         """
-        return self.call_grok_api(prompt, "code_quality")
+        return self.review_unit("code_quality", instructions, code, filename, context, notes, chunker)
     
-    def analyze_architecture(self, code, filename):
+    def analyze_architecture(self, code, filename, context='', notes='', chunker=PHP):
         """Analyze architectural patterns and design"""
-        prompt = f"""
-        Analyze the ARCHITECTURE and DESIGN PATTERNS in this WordPress plugin file: {filename}
+        instructions = f"""
+        Analyze the ARCHITECTURE and DESIGN PATTERNS in the {chunker.subject} at the end of this message.
         
         Evaluate:
-        1. Separation of concerns
-        2. Design patterns used (or should be used)
-        3. Database design and queries
-        4. API design and integration points
-        5. Scalability considerations
-        6. Testability
-        7. Modularity and reusability
+{chunker.checklist("architecture")}
         
         Suggest architectural improvements for a version 4.0 rewrite.
-        
-        Code:
-        ```php
-        {code}
-        ```
         """
-        return self.call_grok_api(prompt, "architecture")
+        return self.review_unit("architecture", instructions, code, filename, context, notes, chunker)
     
-    def call_grok_api(self, prompt, analysis_type):
+    def call_grok_api(self, prompt, analysis_type, max_tokens=DEFAULT_MAX_TOKENS, input_tokens=None):
         """Make API call to Grok with retry logic"""
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
-            "model": "grok-4-0709",
+            "model": MODEL,
             "messages": [
                 {
                     "role": "system",
@@ -150,67 +237,103 @@ class GrokCodeReviewer:
                 }
             ],
             "temperature": 0.3,  # Lower temperature for more focused analysis
-            "max_tokens": 4000
+            "max_tokens": max_tokens,
+            **stop_parameters(MODEL)
         }
         
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    self.api_endpoint, 
-                    headers=headers, 
-                    json=payload,
-                    timeout=60
-                )
-                response.raise_for_status()
-                return response.json()
-            except requests.exceptions.RequestException as e:
-                print(f"API call failed (attempt {attempt + 1}/{max_retries}): {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    return {"error": str(e)}
+        self.max_tokens_sent.append(max_tokens)
+        if input_tokens is None:
+            input_tokens = estimate_tokens(prompt)
+        started = time.perf_counter()
+        result = complete_sized(self.client, payload, self.outputs, analysis_type, input_tokens)
+        seconds = round(time.perf_counter() - started, 3)
+        if self.log is None:
+            return UnitResult.from_response(result, seconds)
+        # Keep the answer and usage; the full body goes to the log
+        return self.log.record(result, seconds, analysis_type)
+    
+    def analysis_types(self):
+        """Review passes run over every file"""
+        return [
+            ("security", self.analyze_security),
+            ("code_quality", self.analyze_code_quality),
+            ("architecture", self.analyze_architecture)
+        ]
     
-    def analyze_file(self, filepath):
-        """Perform comprehensive analysis on a single file"""
+    def analyze_file(self, filepath, resume=None, code=None, units=None, notes='', name=None):
+        """Perform comprehensive analysis on a single file
+        
+        resume is the file's pending entry and previous results; only its
+        pending units are sent again. code and units replace the file on
+        disk and its chunks, e.g. with the line-numbered regions of a diff.
+        name is the path findings are keyed by, relative to the plugin root
+        unless given.
+        """
         print(f"\nAnalyzing {filepath}...")
-        code = self.read_file(filepath)
+        if code is None:
+            code = self.read_file(filepath)
         
         if not code:
             return {"error": f"Could not read {filepath}"}
+        if not units:
+            code = self.without_clones(filepath, code)
+        
+        digest = hashlib.sha256(code.encode('utf-8')).hexdigest()
+        if resume and resume[0]['digest'] != digest:
+            print("  File changed since the interrupted run, analysing it again in full")
+            resume = None
         
-        filename = os.path.basename(filepath)
+        filename = name or relative_name(filepath, PLUGIN_DIR)
+        chunker = chunker_for(filepath)
         file_results = {
             "filename": filename,
             "file_size": len(code),
             "analyses": {}
         }
         
-        # For large files, analyze in chunks
-        chunks = self.chunk_code(code)
+        if units:
+            # Units carry their own file line numbers
+            chunks = units
+            file_results["chunk_lines"] = [1] * len(units)
+            context = self.symbol_context(''.join(units)) if chunker.symbol_context else ''
+        else:
+            # For large files, analyze in chunks of whole functions, rules or elements
+            chunks = self.chunk_code(code, filename=filepath)
+            file_results["chunk_lines"] = chunk_line_offsets(chunks)
+            # One context for the whole file keeps it in the prefix shared by its chunks
+            context = self.symbol_context(code) if chunker.symbol_context else ''
         
         if len(chunks) > 1:
             print(f"  File is large, splitting into {len(chunks)} chunks for analysis")
         
-        # Perform different types of analysis
-        analysis_types = [
-            ("security", self.analyze_security),
-            ("code_quality", self.analyze_code_quality),
-            ("architecture", self.analyze_architecture)
-        ]
+        # Passes are told what is already decided locally: taint flows and queries inside loops
+        pass_notes = {"security": notes + taint_note(self.taint_sinks(filepath, code)),
+                      "code_quality": notes + query_note(self.query_hotspots(filepath, code))}
         
-        for analysis_name, analysis_func in analysis_types:
+        for analysis_name, analysis_func in self.analysis_types():
             print(f"  Performing {analysis_name} analysis...")
             chunk_results = []
             
             for i, chunk in enumerate(chunks):
+                if resume and i not in resume[0]['units'].get(analysis_name, []):
+                    chunk_results.append(resume[1]['analyses'][analysis_name][i])
+                    continue
+                
                 if len(chunks) > 1:
                     chunk_filename = f"{filename} (chunk {i+1}/{len(chunks)})"
                 else:
                     chunk_filename = filename
                 
-                result = analysis_func(chunk, chunk_filename)
+                result = analysis_func(chunk, chunk_filename, context,
+                                       pass_notes.get(analysis_name, notes), chunker)
+                if context:
+                    self.context_tokens += estimate_tokens(context)
                 chunk_results.append(result)
+                if result.error:
+                    entry = self.pending.setdefault(filepath, {"digest": digest, "units": {}})
+                    entry["units"].setdefault(analysis_name, []).append(i)
+                if result.circuit_open:
+                    continue  # endpoint is down: move on without waiting
                 time.sleep(1)  # Rate limiting
             
             file_results["analyses"][analysis_name] = chunk_results
@@ -218,12 +341,75 @@ class GrokCodeReviewer:
         
         return file_results
     
-    def generate_report(self):
+    def analyze_packed(self, files):
+        """Review several small files in shared requests
+        
+        files is a list of (filepath, code). Answers are split back into one
+        result per file; if an answer cannot be split, the files are left
+        pending so --resume reviews them one by one.
+        """
+        names = [relative_name(filepath, PLUGIN_DIR) for filepath, _ in files]
+        print(f"\nAnalyzing {len(files)} small files together: {', '.join(names)}")
+        chunker = chunker_for(files[0][0])  # bins hold files of one language
+        code = render_packed(files)
+        context = self.symbol_context(code) if chunker.symbol_context else ''
+        label = f"{len(files)} small files ({', '.join(names)})"
+        pass_notes = {
+            "security": PACKED_NOTE + ''.join(taint_note(self.taint_sinks(filepath, source), name)
+                                              for (filepath, source), name in zip(files, names)),
+            "code_quality": PACKED_NOTE + ''.join(query_note(self.query_hotspots(filepath, source), name)
+                                                  for (filepath, source), name in zip(files, names)),
+        }
+        
+        file_results = {}
+        for (filepath, source), name in zip(files, names):
+            file_results[filepath] = {
+                "filename": name,
+                "file_size": len(source),
+                "analyses": {},
+                "chunk_lines": [1],
+                "packed_with": [other for other in names if other != name]
+            }
+        
+        for analysis_name, analysis_func in self.analysis_types():
+            print(f"  Performing {analysis_name} analysis...")
+            result = analysis_func(code, label, context,
+                                   pass_notes.get(analysis_name, PACKED_NOTE), chunker)
+            self.packed_requests += 1
+            if context:
+                self.context_tokens += estimate_tokens(context)
+            parts = None
+            if not result.error:
+                parts = split_packed_response(result.content, [filepath for filepath, _ in files], analysis_name)
+                if parts is None:
+                    result = UnitResult(error="packed answer could not be split per file", log=result.log,
+                                        raw_offset=result.raw_offset)
+            
+            for filepath, source in files:
+                if parts is None:
+                    file_results[filepath]["analyses"][analysis_name] = [result]
+                    digest = hashlib.sha256(source.encode('utf-8')).hexdigest()
+                    entry = self.pending.setdefault(filepath, {"digest": digest, "units": {}})
+                    entry["units"].setdefault(analysis_name, []).append(0)
+                    continue
+                # Files of one request share its log entry; usage stays with the request
+                file_results[filepath]["analyses"][analysis_name] = [UnitResult(
+                    content=parts[filepath] or "No issues reported for this file.",
+                    finish_reason=result.finish_reason, seconds=result.seconds, packed=True,
+                    log=result.log, raw_offset=result.raw_offset)]
+            if result.circuit_open:
+                continue  # endpoint is down: move on without waiting
+            time.sleep(1)  # Rate limiting
+            print(f"  ✓ Completed {analysis_name} analysis")
+        
+        return file_results
+    
+    def generate_report(self, findings=None, previous_findings=None, previous_run=None, reviewed=None):
         """Generate a comprehensive markdown report"""
         report = f"""# Money Quiz Plugin - Grok AI Code Review Report
 
 **Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-**Reviewed by:** Grok AI (grok-4-0709)
+**Reviewed by:** Grok AI ({MODEL})
 
 ---
 
@@ -236,6 +422,22 @@ covering security vulnerabilities, code quality issues, and architectural recomm
 
 """
         
+        if findings and not self.raw_report:
+            if previous_findings is not None and not self.full_report:
+                # Only what changed since the previous run
+                delta = diff_findings(previous_findings, findings, reviewed)
+                report += render_delta(delta, previous_run, self.run_id, reviewed)
+            else:
+                # One entry per distinct issue instead of every chunk's full answer
+                report += render_consolidated(consolidate_findings(findings), len(findings))
+            for filepath, results in self.results.items():
+                for analysis_type, chunks in results.get('analyses', {}).items():
+                    for i, chunk_result in enumerate(chunks):
+                        if chunk_result.error:
+                            report += (f"**Error ({results['filename']}, {analysis_type}, "
+                                       f"chunk {i+1}):** {chunk_result.error}\n\n")
+            return report + render_clones(self.clones)
+        
         for filepath, results in self.results.items():
             report += f"\n## {results['filename']}\n\n"
             report += f"**File Size:** {results['file_size']} bytes\n\n"
@@ -244,60 +446,281 @@ covering security vulnerabilities, code quality issues, and architectural recomm
                 report += f"### {analysis_type.replace('_', ' ').title()} Analysis\n\n"
                 
                 for i, chunk_result in enumerate(chunks):
-                    if 'error' in chunk_result:
-                        report += f"**Error:** {chunk_result['error']}\n\n"
-                    elif 'choices' in chunk_result:
-                        content = chunk_result['choices'][0]['message']['content']
+                    if chunk_result.error:
+                        report += f"**Error:** {chunk_result.error}\n\n"
+                    elif chunk_result.content is not None:
                         if len(chunks) > 1:
                             report += f"#### Chunk {i+1}/{len(chunks)}\n\n"
-                        report += content + "\n\n"
+                        report += chunk_result.content + "\n\n"
             
             report += "---\n"
         
-        return report
+        return report + render_clones(self.clones)
+    
+    def load_pending(self):
+        """Pending units and results of an interrupted run, or None"""
+        try:
+            with open(PENDING_FILE) as f:
+                pending = json.load(f)
+            with open('grok-analysis-raw-results.json') as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return pending, load_results(results, ResultLog(RAW_LOG, append=True))
+    
+    def save_pending(self):
+        """Record failed and skipped units so the next run can resume them"""
+        if not self.pending:
+            if os.path.exists(PENDING_FILE):
+                os.remove(PENDING_FILE)
+            return
+        with open(PENDING_FILE, 'w') as f:
+            json.dump({"run_id": self.run_id, "files": self.pending, "clones": self.clones}, f, indent=2)
+        units = sum(len(chunks) for entry in self.pending.values() for chunks in entry["units"].values())
+        print(f"✗ {units} units in {len(self.pending)} files failed or were skipped "
+              f"({self.client.breaker.opens} circuit opens)")
+        print(f"  Saved to {PENDING_FILE}; rerun with --resume once the API is back")
     
-    def run_analysis(self, files_to_analyze):
+    def run_analysis(self, files_to_analyze, resume=False):
         """Run comprehensive analysis on all files"""
         print("Starting comprehensive Money Quiz plugin analysis with Grok AI")
         print("=" * 60)
         
+        interrupted = self.load_pending() if resume else None
+        if resume and not interrupted:
+            print(f"Nothing to resume ({PENDING_FILE} or raw results missing)")
+            sys.exit(1)
+        if interrupted:
+            pending, self.results = interrupted
+            self.run_id = pending['run_id']
+            # The same copies are left out as in the interrupted run, so chunks line up
+            self.clones = pending.get('clones', [])
+            self.collapsed = collapsed_regions(self.clones)
+            files_to_analyze = list(pending['files'])
+            # Probe with the first call instead of failing several times again
+            self.client.breaker.half_open()
+            print(f"Resuming run {self.run_id}: {len(files_to_analyze)} files with pending units")
+        else:
+            if not any(Path(filepath).exists() for filepath in files_to_analyze):
+                print(f"None of the files to review were found: {', '.join(map(str, files_to_analyze))}")
+                sys.exit(1)
+            files_to_analyze, self.excluded = split_first_party(files_to_analyze)
+            self.report_excluded()
+            self.find_clones(files_to_analyze)
+        self.log = ResultLog(RAW_LOG, append=bool(interrupted))
+        
+        small = []
         for filepath in files_to_analyze:
-            if Path(filepath).exists():
+            if not Path(filepath).exists():
+                print(f"File not found: {filepath}")
+                continue
+            if interrupted:
+                previous = (pending['files'][filepath], self.results[filepath])
+                self.results[filepath] = self.analyze_file(filepath, previous)
+                continue
+            code = self.read_file(filepath) if self.packing else None
+            if code:
+                code = self.without_clones(filepath, code)
+            if code and is_small(code):
+                small.append((filepath, code))
+            else:
                 self.results[filepath] = self.analyze_file(filepath)
+        
+        # Small files share requests instead of paying the prompt overhead each, one language per request
+        languages = {}
+        for filepath, code in small:
+            languages.setdefault(chunker_for(filepath).name, []).append((filepath, code))
+        bins = [packed for group in languages.values() for packed in pack_files(group)]
+        for packed in bins:
+            if len(packed) == 1:
+                self.results[packed[0][0]] = self.analyze_file(packed[0][0])
             else:
-                print(f"File not found: {filepath}")
+                self.results.update(self.analyze_packed(packed))
+        if small:
+            order = {filepath: i for i, filepath in enumerate(files_to_analyze)}
+            self.results = dict(sorted(self.results.items(), key=lambda item: order.get(item[0], len(order))))
+            passes = len(self.analysis_types())
+            print(f"\n✓ Reviewed {len(small)} small files in {len(bins)} groups "
+                  f"({len(bins) * passes} requests instead of {len(small) * passes})")
         
         # Save raw results
         with open('grok-analysis-raw-results.json', 'w') as f:
-            json.dump(self.results, f, indent=2)
-        print("\n✓ Raw results saved to grok-analysis-raw-results.json")
+            json.dump(self.results, f, indent=2, default=UnitResult.to_dict)
+        print(f"\n✓ Raw results saved to grok-analysis-raw-results.json (response bodies in {RAW_LOG})")
+        
+        # Index parsed findings, and those decided locally, for fast cross-run queries
+        findings = findings_from_results(self.results) + self.local_findings()
+        index = FindingsIndex(FINDINGS_DB)
+        reviewed = reviewed_files(self.results)
+        index.add_run(self.run_id, MODEL, findings, 'grok-analysis-raw-results.json', reviewed)
+        previous_run = index.previous_run(self.run_id)
+        previous_findings = index.query(run_id=previous_run, limit=-1) if previous_run else None
+        index.close()
+        print(f"✓ Indexed {len(findings)} findings in {FINDINGS_DB} (run {self.run_id})")
         
         # Generate and save markdown report
-        report = self.generate_report()
+        report = self.generate_report(findings, previous_findings, previous_run, reviewed)
         with open('grok-analysis-report.md', 'w') as f:
             f.write(report)
         print("✓ Formatted report saved to grok-analysis-report.md")
         
+        self.finish_run()
+        self.save_pending()
+        
         print("\nAnalysis complete!")
+    
+    def report_excluded(self):
+        """Print the files the vendored classifier kept out of the review"""
+        for path, (kind, reason, tokens) in self.excluded.items():
+            print(f"Skipping {kind} file {path}: {reason} (~{tokens} tokens)")
+        if self.excluded:
+            tokens = sum(tokens for _, _, tokens in self.excluded.values())
+            print(f"✓ Left {len(self.excluded)} third-party files (~{tokens} tokens) out of the review; "
+                  f"override in {os.path.basename(REVIEW_OVERRIDES)}")
+    
+    def finish_run(self):
+        """Save call metrics and the learned models, and release the client"""
+        # Save call metrics, including the deadlines the latency model chose
+        metrics = self.client.metrics()
+        metrics["run_id"] = self.run_id
+        metrics["symbol_context_tokens"] = self.context_tokens
+        metrics["packed_requests"] = self.packed_requests
+        metrics["excluded_files"] = len(self.excluded)
+        metrics["excluded_tokens"] = sum(tokens for _, _, tokens in self.excluded.values())
+        metrics["clone_classes"] = len(self.clones)
+        metrics["clone_tokens_saved"] = self.clone_tokens_saved
+        if self.max_tokens_sent:
+            metrics["max_tokens_mean"] = round(sum(self.max_tokens_sent) / len(self.max_tokens_sent))
+        saved = metrics
+        try:
+            with open(METRICS_FILE) as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {}
+        if previous.get("run_id") == self.run_id:
+            saved = merge_metrics(previous, metrics)  # a --resume of the run these metrics describe
+        with open(METRICS_FILE, 'w') as f:
+            json.dump(saved, f, indent=2)
+        print(f"✓ Run metrics saved to {METRICS_FILE} "
+              f"({metrics['requests']} requests, {metrics['timeouts_hit']} timed out, "
+              f"{metrics['cache_hit_rate']:.0%} of prompt tokens served from the provider cache)")
+        if self.client.hedging:
+            print(f"✓ Hedged {metrics['hedges']}/{metrics['requests']} requests "
+                  f"({metrics['hedge_wins']} answered by the hedge)")
+        self.client.close()
+        self.outputs.save()
+        if self.taint is not None:
+            self.taint.save()
+    
+    def run_diff_review(self, diff_range):
+        """Review only the functions a pull request touches"""
+        base, head = parse_range(diff_range)
+        print(f"Starting Grok review of the changes in {base}...{head}")
+        print("=" * 60)
+        
+        changed = changed_lines(base, head, PLUGIN_DIR)
+        if not changed:
+            print("No PHP changes to review")
+            return
+        self.log = ResultLog('grok-diff-raw-log.jsonl')
+        
+        overrides = load_overrides(REVIEW_OVERRIDES)
+        texts = {path: file_at(head, path, PLUGIN_DIR) for path in changed}
+        for path, text in texts.items():
+            kind, reason = classify_text(path, text.encode('utf-8'), overrides)
+            if kind != FIRST_PARTY:
+                self.excluded[path] = (kind, reason, estimate_tokens(text))
+        changed = {path: lines for path, lines in changed.items() if path not in self.excluded}
+        self.report_excluded()
+        
+        proven = []
+        for path, lines in changed.items():
+            text = texts[path]
+            regions = regions_for(text, lines)
+            units = render_units(text, regions)
+            print(f"\n{path}: {len(lines)} changed lines in {len(regions)} regions ({len(units)} units)")
+            self.results[path] = self.analyze_file(path, code=text, units=units, notes=DIFF_NOTE, name=path)
+            sinks = [sink for sink in self.taint_sinks(path, text)
+                     if any(first <= sink['line'] <= last for first, last, _ in regions)]
+            proven += taint_findings(sinks, path)
+            hotspots = [record for record in self.query_hotspots(path, text)
+                        if any(first <= record['line'] <= last for first, last, _ in regions)]
+            proven += query_findings(hotspots, path)
+        
+        findings = findings_from_results(self.results) + proven
+        # Tell findings on changed lines from those elsewhere in the touched functions
+        for finding in findings:
+            finding['on_changed_lines'] = on_changed_lines(finding, changed.get(finding['file'], []))
+        
+        with open('grok-diff-findings.json', 'w') as f:
+            json.dump({"base": base, "head": head, "run_id": self.run_id, "changed_lines": changed,
+                       "findings": findings}, f, indent=2)
+        print("\n✓ Findings saved to grok-diff-findings.json")
+        
+        with open('grok-diff-report.md', 'w') as f:
+            f.write(self.generate_diff_report(findings, base, head, changed))
+        print("✓ Report saved to grok-diff-report.md")
+        
+        self.finish_run()
+        print("\nDiff review complete!")
+    
+    def generate_diff_report(self, findings, base, head, changed):
+        """Markdown report of a diff review, changed lines first"""
+        report = f"""# Money Quiz Plugin - Grok AI Pull Request Review
+
+**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Changes:** {base}...{head}
+**Reviewed by:** Grok AI ({MODEL})
 
+---
 
-def main():
+"""
+        for path, lines in changed.items():
+            report += f"- `{path}`: {len(lines)} changed lines\n"
+        report += "\n"
+        
+        on_changed = [finding for finding in findings if finding['on_changed_lines']]
+        elsewhere = [finding for finding in findings if not finding['on_changed_lines']]
+        report += "## Findings on Changed Lines\n\n"
+        report += render_group(consolidate_findings(on_changed)) if on_changed else "None.\n\n"
+        if elsewhere:
+            report += "## Other Findings in the Touched Functions\n\n"
+            report += render_group(consolidate_findings(elsewhere))
+        
+        for path, results in self.results.items():
+            for analysis_type, chunks in results.get('analyses', {}).items():
+                for i, chunk_result in enumerate(chunks):
+                    if chunk_result.error:
+                        report += (f"**Error ({path}, {analysis_type}, unit {i+1}):** "
+                                   f"{chunk_result.error}\n\n")
+        return report
+
+
+DEFAULT_FILES = [
+    "moneyquiz.php",
+    "class.moneyquiz.php",
+    "quiz.moneycoach.php",
+    "integration.admin.php",
+    "questions.admin.php",
+    "stats.admin.php",
+    "cta.admin.php"
+]
+
+def main(files_to_analyze=None, raw_report=False, full_report=False, hedging=False, resume=False,
+         packing=True, diff_range=None):
     # Initialize reviewer
-    reviewer = GrokCodeReviewer(API_KEY, API_ENDPOINT)
+    reviewer = GrokCodeReviewer(require_api_key(), API_ENDPOINT, raw_report=raw_report,
+                                full_report=full_report, hedging=hedging, packing=packing)
+    
+    if diff_range:
+        reviewer.run_diff_review(diff_range)
+        return
     
     # Define files to analyze
-    files_to_analyze = [
-        "moneyquiz.php",
-        "class.moneyquiz.php", 
-        "quiz.moneycoach.php",
-        "integration.admin.php",
-        "questions.admin.php",
-        "stats.admin.php",
-        "cta.admin.php"
-    ]
+    files_to_analyze = files_to_analyze or [plugin_path(name) for name in DEFAULT_FILES]
     
     # Run analysis
-    reviewer.run_analysis(files_to_analyze)
+    reviewer.run_analysis(files_to_analyze, resume)
     
     # Also create a summary for manual review
     summary = """
@@ -306,6 +729,7 @@ def main():
     Files generated:
     - grok-analysis-raw-results.json: Raw API responses
     - grok-analysis-report.md: Formatted markdown report
+    - grok-findings.db: Structured findings (query with: python -m mqtools findings query)
     
     The analysis covered:
     1. Security vulnerabilities
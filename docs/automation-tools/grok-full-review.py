@@ -3,18 +3,12 @@
 Send comprehensive Money Quiz review to Grok
 """
 
-import requests
 import json
 import time
-import os
 
-API_KEY = os.environ.get('GROK_API_KEY', '')
-API_ENDPOINT = "https://api.x.ai/v1/chat/completions"
-
-if not API_KEY:
-    print("Error: GROK_API_KEY environment variable not set")
-    print("Please set it with: export GROK_API_KEY='your-api-key'")
-    exit(1)
+# The API key is checked lazily, when the request is made
+from mqtools.client import GrokClient
+from mqtools.config import API_ENDPOINT, MODEL, require_api_key
 
 def read_file(filepath):
     """Read file content safely"""
@@ -26,6 +20,7 @@ def read_file(filepath):
 
 def send_comprehensive_review():
     """Send full review request to Grok"""
+    api_key = require_api_key()
     
     print("Sending comprehensive Money Quiz review to Grok...")
     
@@ -90,13 +85,8 @@ Please provide:
 
 What critical issues am I missing? What would be your top 5 priorities for fixing this plugin?"""
 
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
     payload = {
-        "model": "grok-4-0709",
+        "model": MODEL,
         "messages": [
             {
                 "role": "system",
@@ -111,16 +101,12 @@ What critical issues am I missing? What would be your top 5 priorities for fixin
         "max_tokens": 4000
     }
     
+    # 3 minutes until the latency model has seen enough full reviews
+    client = GrokClient(api_key, API_ENDPOINT, timeout=180, max_retries=1)
     try:
-        response = requests.post(
-            API_ENDPOINT,
-            headers=headers,
-            json=payload,
-            timeout=180  # Extended timeout to 3 minutes for Grok
-        )
+        result = client.complete(payload)
         
-        if response.status_code == 200:
-            result = response.json()
+        if "error" not in result:
             grok_response = result['choices'][0]['message']['content']
             
             # Save comprehensive response
@@ -138,11 +124,12 @@ What critical issues am I missing? What would be your top 5 priorities for fixin
             create_combined_report()
             
         else:
-            print(f"\n✗ Error: {response.status_code}")
-            print(response.text)
+            print(f"\n✗ Error: {result['error']}")
             
     except Exception as e:
         print(f"\n✗ Error: {e}")
+    finally:
+        client.close()
 
 def create_combined_report():
     """Create a combined report from both AIs"""
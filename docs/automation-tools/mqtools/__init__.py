@@ -0,0 +1,10 @@
+"""
+mqtools - shared helpers and a single entry point for the Money Quiz
+automation tools.
+
+Run from docs/automation-tools with:
+
+    python -m mqtools --help
+"""
+
+__version__ = "1.0.0"
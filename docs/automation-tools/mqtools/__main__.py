@@ -0,0 +1,6 @@
+"""Allow `python -m mqtools`"""
+
+from mqtools.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Latency benchmarks against the local mock server
+"""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from mqtools.latency import LatencyTracker, percentile
+
+BENCH_PAYLOAD = {
+    "model": "mock",
+    "messages": [
+        {"role": "system", "content": "You are an expert WordPress security auditor."},
+        {"role": "user", "content": "Review this code:\n" + "echo $_REQUEST['Question'];\n" * 200}
+    ],
+    "max_tokens": 1000
+}
+
+def latency_summary(latencies):
+    """p50/p90/p99 in milliseconds"""
+    return {f"p{q}": round(percentile(latencies, q / 100) * 1000, 1) for q in (50, 90, 99)}
+
+def measure_client(client, requests_count, concurrency, warmup):
+    """Latencies of requests_count calls after warmup calls"""
+    for _ in range(warmup):
+        client.complete(BENCH_PAYLOAD)
+    client.stats.update(requests=0, hedges=0, hedge_wins=0, timeouts_hit=0, latencies=[], deadlines=[])
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(lambda _: client.complete(BENCH_PAYLOAD), range(requests_count)))
+    return client.stats
+
+def run_hedge_bench(args):
+    """Entry point for `mqtools hedge-bench`: p99 with and without hedging"""
+    from mqtools.client import GrokClient
+    from mqtools.mock_server import MockSettings, start_mock_server
+
+    results = {}
+    for hedging in (False, True):
+        # Same seed for both modes so they see the same latency profile
+        settings = MockSettings(median=args.median, tail_rate=args.tail_rate,
+                                tail_factor=args.tail_factor, seed=42)
+        server, endpoint = start_mock_server(settings)
+        # Unsaved tracker: benchmark traffic must not leak into the persisted model
+        client = GrokClient("mock", endpoint, hedging=hedging, hedge_rate_cap=args.hedge_cap,
+                            tracker=LatencyTracker())
+        started = time.perf_counter()
+        stats = measure_client(client, args.requests, args.concurrency, args.warmup)
+        elapsed = time.perf_counter() - started
+        client.close()
+        server.shutdown()
+
+        summary = latency_summary(stats["latencies"])
+        summary.update(requests=stats["requests"], hedges=stats["hedges"], hedge_wins=stats["hedge_wins"],
+                       hedge_rate=round(stats["hedges"] / max(1, stats["requests"]), 3),
+                       seconds=round(elapsed, 1))
+        results["hedged" if hedging else "baseline"] = summary
+
+    print("=== Hedged request benchmark (mock server) ===")
+    print(f"Requests: {args.requests}  Concurrency: {args.concurrency}  "
+          f"Tail: {args.tail_rate:.0%} x{args.tail_factor}  Hedge cap: {args.hedge_cap:.0%}")
+    print("=" * 50)
+    print(f"{'Mode':<10} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'Hedge rate':>11} {'Hedge wins':>11}")
+    for mode, r in results.items():
+        print(f"{mode:<10} {r['p50']:>8} {r['p90']:>8} {r['p99']:>8} {r['hedge_rate']:>11.1%} {r['hedge_wins']:>11}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✓ Results saved to {args.json}")
@@ -0,0 +1,79 @@
+"""
+Circuit breaker for the Grok endpoint
+
+After FAILURE_THRESHOLD consecutive outage-type failures (connection
+errors, timeouts, 429 and 5xx answers) the circuit opens and calls fail
+immediately instead of retrying. Once PROBE_INTERVAL has passed a single
+probe call is let through (half-open): success closes the circuit, failure
+opens it again for another interval.
+"""
+
+import threading
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+FAILURE_THRESHOLD = 5
+PROBE_INTERVAL = 30.0   # seconds between half-open probes
+
+def is_outage(error):
+    """Whether a requests exception means the endpoint is unavailable"""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return True  # connection error or timeout
+    return response.status_code == 429 or response.status_code >= 500
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with half-open probing"""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, probe_interval=PROBE_INTERVAL,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.probe_interval = probe_interval
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() - self.opened_at >= self.probe_interval:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def success(self):
+        with self.lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opens += 1
+                self.state = OPEN
+                self.opened_at = self.clock()
+
+    def half_open(self):
+        """Start by probing, e.g. when resuming after an outage"""
+        with self.lock:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+
+    @property
+    def is_open(self):
+        return self.state == OPEN
@@ -0,0 +1,279 @@
+"""
+Language-aware chunking and review prompts, keyed by file type
+
+Reviews used to cut every file into 8,000 character runs of lines and
+fence them as PHP. Each chunker here knows its language's fence, the
+checklists of the three review passes and where a file can be cut:
+
+  php    runs of lines, as before (chunk_line_offsets of stored runs rely on it)
+  js     between statements at the lowest bracket depth that gives small
+         enough units, so a jQuery(function($){ ... }) wrapper is cut
+         between its handlers, not inside one
+  css    between rule blocks (an @media block stays whole where it fits)
+  html   between elements at the lowest tag depth that fits
+
+Units are then packed back together up to the chunk size, so a file is
+sent in as few calls as before but every chunk is made of whole units.
+A unit still larger than a chunk falls back to runs of lines.
+
+chunker_for() picks the chunker from the file extension; register() adds
+one for another extension.
+"""
+
+import os
+import re
+
+MAX_DEPTH = 6               # deepest nesting tried for cut points
+
+def split_lines(code, max_length):
+    """Runs of whole lines of at most max_length characters"""
+    if len(code) <= max_length:
+        return [code]
+
+    chunks = []
+    current_chunk = []
+    current_length = 0
+    for line in code.split('\n'):
+        if current_length + len(line) > max_length and current_chunk:
+            chunks.append('\n'.join(current_chunk))
+            current_chunk = [line]
+            current_length = len(line)
+        else:
+            current_chunk.append(line)
+            current_length += len(line) + 1
+    if current_chunk:
+        chunks.append('\n'.join(current_chunk))
+    return chunks
+
+def split_units(code, max_length, depths, can_cut):
+    """Chunks of whole units; depths[i] is the nesting at the start of line i
+
+    Cut points are lines at depth <= d where can_cut(lines, i) holds, for
+    the smallest d whose units all fit in max_length.
+    """
+    if len(code) <= max_length:
+        return [code]
+    lines = code.split('\n')
+    for threshold in range(MAX_DEPTH + 1):
+        cuts = [i for i in range(1, len(lines)) if depths[i] <= threshold and can_cut(lines, i)]
+        bounds = list(zip([0] + cuts, cuts + [len(lines)]))
+        units = ['\n'.join(lines[start:end]) for start, end in bounds]
+        if max(len(unit) for unit in units) <= max_length:
+            break
+
+    chunks = []
+    current = []
+    length = 0
+    for unit in units:
+        if current and length + len(unit) + 1 > max_length:
+            chunks.append('\n'.join(current))
+            current, length = [], 0
+        if len(unit) > max_length:
+            chunks.extend(split_lines(unit, max_length))
+            continue
+        current.append(unit)
+        length += len(unit) + 1
+    if current:
+        chunks.append('\n'.join(current))
+    return chunks
+
+def bracket_depths(lines, pairs, template=False):
+    """Bracket depth at the start of each line, skipping strings and comments"""
+    opening, closing = set(pairs), set(pairs.values())
+    depths = []
+    depth = 0
+    comment = False   # inside /* ... */
+    backtick = False  # inside a `template` literal
+    for line in lines:
+        depths.append(depth)
+        i, length = 0, len(line)
+        while i < length:
+            ch = line[i]
+            if comment:
+                end = line.find('*/', i)
+                if end < 0:
+                    break
+                comment, i = False, end + 2
+                continue
+            if backtick:
+                if ch == '\\':
+                    i += 2
+                    continue
+                if ch == '`':
+                    backtick = False
+                i += 1
+                continue
+            if line.startswith('/*', i):
+                comment, i = True, i + 2
+                continue
+            if template and line.startswith('//', i):
+                break
+            if ch in '\'"':
+                i += 1
+                while i < length and line[i] != ch:
+                    i += 2 if line[i] == '\\' else 1
+            elif template and ch == '`':
+                backtick = True
+            elif ch in opening:
+                depth += 1
+            elif ch in closing:
+                depth = max(0, depth - 1)
+            i += 1
+    return depths
+
+def is_comment(line):
+    stripped = line.strip()
+    return stripped.startswith(('//', '/*', '*')) or stripped.endswith('*/')
+
+def after_statement(lines, i):
+    """JS/CSS cut before line i: the previous line closes a statement or block, and is not
+    a comment that belongs to line i"""
+    previous = lines[i - 1].strip()
+    if not previous:
+        return True
+    if is_comment(lines[i - 1]):
+        return False
+    return previous.endswith((';', '}', ')', ']')) and not lines[i].lstrip().startswith(('.', '?', ':', '+', '&&', '||'))
+
+TAG_RE = re.compile(r'<!--.*?-->|<(/?)([A-Za-z][\w-]*)[^>]*?(/?)>', re.S)
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+RAW_TEXT_TAGS = {'script', 'style'}
+
+def tag_depths(code):
+    """Element depth at the start of each line of an HTML document"""
+    starts = [0] + [match.end() for match in re.finditer('\n', code)]
+    events = []
+    depth = 0
+    raw = None  # inside <script> or <style>: tags are text until its end tag
+    for match in TAG_RE.finditer(code):
+        closing, name, self_closing = match.groups()
+        if name is None:
+            continue
+        name = name.lower()
+        if raw and not (closing and name == raw):
+            continue
+        if closing:
+            depth = max(0, depth - 1)
+            raw = None
+        elif not self_closing and name not in VOID_TAGS:
+            depth += 1
+            if name in RAW_TEXT_TAGS:
+                raw = name
+        events.append((match.end(), depth))
+
+    depths = []
+    current, j = 0, 0
+    for start in starts:
+        while j < len(events) and events[j][0] <= start:
+            current = events[j][1]
+            j += 1
+        depths.append(current)
+    return depths
+
+def between_elements(lines, i):
+    """HTML cut before line i unless line i - 1 ends a comment that introduces it"""
+    return not lines[i - 1].rstrip().endswith('-->')
+
+class Chunker:
+    """Splitting, fence language and review checklists for one file type"""
+
+    def __init__(self, name, fence, subject, focus, split=split_lines, symbol_context=False, taint=False):
+        self.name = name
+        self.fence = fence              # language tag of the code fence in prompts
+        self.subject = subject          # what the review instructions call the file
+        self.focus = focus              # analysis type -> checklist items
+        self.split = split              # (code, max_length) -> chunks of whole lines
+        self.symbol_context = symbol_context  # prompts carry PHP definitions used from other files
+        self.taint = taint              # the local taint engine covers this language
+
+    def checklist(self, analysis_type):
+        """Numbered checklist lines, indented like the rest of the instructions"""
+        return '\n'.join(f"        {i}. {item}" for i, item in enumerate(self.focus[analysis_type], 1))
+
+def split_js(code, max_length):
+    lines = code.split('\n')
+    return split_units(code, max_length, bracket_depths(lines, {'{': '}', '(': ')', '[': ']'}, template=True),
+                       after_statement)
+
+def split_css(code, max_length):
+    lines = code.split('\n')
+    return split_units(code, max_length, bracket_depths(lines, {'{': '}'}), after_statement)
+
+def split_html(code, max_length):
+    return split_units(code, max_length, tag_depths(code), between_elements)
+
+PHP = Chunker("php", "php", "WordPress plugin file", {
+    "security": ["SQL Injection vulnerabilities", "Cross-Site Scripting (XSS) vulnerabilities",
+                 "Cross-Site Request Forgery (CSRF) issues", "Authentication and authorization flaws",
+                 "Insecure data storage or transmission", "Hardcoded sensitive information",
+                 "File upload vulnerabilities", "Command injection risks"],
+    "code_quality": ["WordPress coding standards compliance", "PHP best practices",
+                     "Code organization and structure", "DRY (Don't Repeat Yourself) violations",
+                     "Function complexity and maintainability", "Error handling and logging",
+                     "Documentation and comments", "Performance issues"],
+    "architecture": ["Separation of concerns", "Design patterns used (or should be used)",
+                     "Database design and queries", "API design and integration points",
+                     "Scalability considerations", "Testability", "Modularity and reusability"],
+}, symbol_context=True, taint=True)
+
+JS = Chunker("js", "javascript", "JavaScript file of a WordPress plugin", {
+    "security": ["DOM-based XSS (html(), innerHTML, append() and document.write with unescaped data)",
+                 "AJAX calls to admin-ajax.php or the REST API without a nonce",
+                 "Data from the URL, cookies or postMessage used without validation",
+                 "eval(), new Function() and string arguments to setTimeout",
+                 "Hardcoded sensitive information", "Third-party scripts and iframes loaded over http"],
+    "code_quality": ["WordPress JavaScript coding standards compliance",
+                     "Global variables and functions instead of a module or closure",
+                     "Repeated selectors and DRY (Don't Repeat Yourself) violations",
+                     "Event handlers bound more than once", "Error handling of AJAX requests",
+                     "Dead or commented-out code", "Performance issues (layout thrashing, unthrottled handlers)"],
+    "architecture": ["Separation of DOM handling, state and server calls",
+                     "How data is passed from PHP (wp_localize_script, inline globals)",
+                     "Dependency on jQuery and other libraries", "Modularity and reusability",
+                     "Testability"],
+}, split=split_js)
+
+CSS = Chunker("css", "css", "stylesheet of a WordPress plugin", {
+    "security": ["External resources (@import, url()) loaded from third-party or http origins",
+                 "Content injected with content: or expressions that could leak data",
+                 "Styles that could hide or spoof admin UI elements (clickjacking aids)"],
+    "code_quality": ["Overly generic selectors that leak into themes and wp-admin",
+                     "!important overuse and specificity conflicts",
+                     "Duplicated rules and DRY (Don't Repeat Yourself) violations",
+                     "Unused or dead rules", "Missing vendor fallbacks and browser support issues",
+                     "Accessibility (contrast, focus outlines, hidden content)"],
+    "architecture": ["Prefixing or scoping of plugin styles", "Organisation of the file into components",
+                     "Use of variables or a preprocessor", "Responsive design strategy",
+                     "Split between front-end and admin styles"],
+}, split=split_css)
+
+HTML = Chunker("html", "html", "HTML template of a WordPress plugin", {
+    "security": ["Placeholders that are filled with unescaped user data",
+                 "Links and images loaded from external or http origins",
+                 "Tracking pixels and remote content in e-mail templates",
+                 "Personal data (addresses, phone numbers) hardcoded in the template",
+                 "Inline scripts and event handler attributes"],
+    "code_quality": ["Valid, well-formed markup", "E-mail client compatibility (tables, inline styles)",
+                     "Accessibility (alt text, lang attribute, contrast)",
+                     "Duplicated inline styles and DRY (Don't Repeat Yourself) violations",
+                     "Hardcoded text that should be translatable or configurable"],
+    "architecture": ["Separation of template and data", "Reuse of partials across templates",
+                     "How the template is rendered and filled by the plugin", "Maintainability"],
+}, split=split_html)
+
+CHUNKERS = {}  # file extension -> Chunker
+
+def register(chunker, *extensions):
+    for extension in extensions:
+        CHUNKERS[extension.lower()] = chunker
+
+register(PHP, '.php', '.inc')
+register(JS, '.js', '.mjs')
+register(CSS, '.css')
+register(HTML, '.html', '.htm')
+
+def chunker_for(filename):
+    """Chunker for a file name; PHP for unknown types and when there is no name"""
+    if not filename:
+        return PHP
+    return CHUNKERS.get(os.path.splitext(filename)[1].lower(), PHP)
@@ -0,0 +1,300 @@
+"""
+Single entry point for the Money Quiz automation tools
+
+Usage (from docs/automation-tools):
+    python -m mqtools prepare                  # build the review package (local)
+    python -m mqtools review [files...]        # multi-pass Grok review
+    python -m mqtools send                     # send the review package to Grok
+    python -m mqtools test [--bench]           # check (or benchmark) the Grok API connection
+    python -m mqtools workflows [args...]      # GitHub Actions tooling
+    python -m mqtools findings query [text]    # search indexed review findings
+    python -m mqtools symbols [--file F]       # PHP symbol index / prompt context for a file
+    python -m mqtools secrets                  # scan the whole tree for hardcoded credentials
+    python -m mqtools taint [files...]         # request input reaching SQL and output, decided locally
+    python -m mqtools queries [files...]       # $wpdb queries run once per loop iteration (N+1)
+    python -m mqtools vendored [files...]      # minified and third-party files kept out of reviews
+    python -m mqtools schema [--rows N]        # missing indexes and non-sargable predicates, timed on SQLite
+    python -m mqtools clones [files...]        # near-duplicate regions across the plugin (winnowing)
+    python -m mqtools mock-server              # local stand-in for the Grok endpoint
+    python -m mqtools hedge-bench              # p99 latency with and without hedging
+    python -m mqtools startup-bench            # measure CLI start-up time
+
+Only argparse is imported up front. Each subcommand loads the script (and
+libraries such as requests) it needs when it runs, so --help and local
+subcommands start without paying for network libraries or needing a key.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+TOOLS_DIR = Path(__file__).resolve().parent.parent
+REPO_ROOT = TOOLS_DIR.parent.parent
+
+def load_script(path):
+    """Import one of the hyphenated tool scripts as a module"""
+    import importlib.util
+
+    path = Path(path)
+    name = path.stem.replace('-', '_')
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run_prepare(args):
+    load_script(TOOLS_DIR / "prepare-grok-review.py").prepare_review_package()
+
+def run_review(args):
+    if args.quick:
+        load_script(TOOLS_DIR / "grok-code-review.py").main(args.files or None)
+    else:
+        review = load_script(TOOLS_DIR / "grok-comprehensive-review.py")
+        review.main(args.files or None, args.raw_report, args.full_report, args.hedge, args.resume,
+                    not args.no_pack, args.diff)
+
+def run_send(args):
+    if args.comprehensive:
+        load_script(TOOLS_DIR / "grok-full-review.py").send_comprehensive_review()
+    else:
+        load_script(TOOLS_DIR / "send-to-grok.py").send_to_grok()
+
+def run_test(args):
+    load_script(TOOLS_DIR / "grok-api-test.py").main(args.script_args)
+
+def run_workflows(args):
+    load_script(REPO_ROOT / "check-workflows.py").main(args.script_args)
+
+def run_findings(args):
+    from mqtools import findings
+
+    if args.findings_command == 'import':
+        reviewer = load_script(TOOLS_DIR / "grok-comprehensive-review.py").GrokCodeReviewer(None, None)
+        findings.run_import(args, reviewer.chunk_code)
+    elif args.findings_command == 'runs':
+        findings.run_runs(args)
+    elif args.findings_command == 'consolidate':
+        findings.run_consolidate(args)
+    elif args.findings_command == 'diff':
+        from mqtools import rundiff
+        rundiff.run_diff(args)
+    else:
+        findings.run_query(args)
+
+def run_symbols(args):
+    from mqtools.symbols import run_symbols
+    run_symbols(args)
+
+def run_secrets(args):
+    from mqtools.secretscan import run_secrets
+    run_secrets(args)
+
+def run_taint(args):
+    from mqtools.taint import run_taint
+    run_taint(args)
+
+def run_queries(args):
+    from mqtools.queries import run_queries
+    run_queries(args)
+
+def run_vendored(args):
+    from mqtools.vendored import run_vendored
+    run_vendored(args)
+
+def run_schema(args):
+    from mqtools.schema import run_schema
+    run_schema(args)
+
+def run_clones(args):
+    from mqtools.clones import run_clones
+    run_clones(args)
+
+def run_mock_server(args):
+    from mqtools.mock_server import run_mock_server
+    run_mock_server(args)
+
+def run_hedge_bench(args):
+    from mqtools.bench import run_hedge_bench
+    run_hedge_bench(args)
+
+def run_startup_bench(args):
+    """Time `python -m mqtools ...` start-up for each subcommand"""
+    import statistics
+    import subprocess
+    import time
+
+    def measure(command):
+        timings = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            subprocess.run(command, cwd=TOOLS_DIR, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, check=False)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    baseline = measure([sys.executable, "-c", "pass"])
+    print("=== mqtools start-up benchmark ===")
+    print(f"Runs per command: {args.runs}  Interpreter baseline: {baseline:.1f} ms")
+    print("=" * 50)
+    print(f"{'Command':<32} {'Median ms':>10} {'Over baseline':>14}")
+    for command in (["--help"], ["prepare", "--help"], ["review", "--help"],
+                    ["send", "--help"], ["test", "--help"], ["workflows", "--help"]):
+        median = measure([sys.executable, "-m", "mqtools"] + command)
+        print(f"{'mqtools ' + ' '.join(command):<32} {median:>10.1f} {median - baseline:>14.1f}")
+
+def build_parser():
+    """Command-line interface"""
+    parser = argparse.ArgumentParser(prog="mqtools", description="Money Quiz automation tools")
+    subparsers = parser.add_subparsers(dest='command')
+
+    prepare = subparsers.add_parser('prepare', help="build the Grok review package (no API key needed)")
+    prepare.set_defaults(handler=run_prepare)
+
+    review = subparsers.add_parser('review', help="run a Grok code review over plugin files")
+    review.add_argument('files', nargs='*', help="files to review (default: the key plugin files)")
+    review.add_argument('--quick', action='store_true', help="single-pass review (grok-code-review.py)")
+    review.add_argument('--raw-report', action='store_true',
+                        help="full per-chunk output instead of consolidated findings")
+    review.add_argument('--full-report', action='store_true',
+                        help="report every finding, not only the delta against the previous run")
+    review.add_argument('--hedge', action='store_true',
+                        help="send a duplicate request when a call exceeds the p90 latency for its size")
+    review.add_argument('--diff', metavar='BASE[...HEAD]',
+                        help="review only the PHP functions changed since BASE, e.g. main or develop...HEAD")
+    review.add_argument('--no-pack', action='store_true',
+                        help="review every small file in its own requests instead of packing them together")
+    review.add_argument('--resume', action='store_true',
+                        help="retry only the units skipped while the API was down in the last run")
+    review.set_defaults(handler=run_review)
+
+    send = subparsers.add_parser('send', help="send the prepared review package to Grok")
+    send.add_argument('--comprehensive', action='store_true', help="send the full review (grok-full-review.py)")
+    send.set_defaults(handler=run_send)
+
+    test = subparsers.add_parser('test', help="test the Grok API connection (--bench: latency sweep)",
+                                 add_help=False)
+    test.add_argument('script_args', nargs=argparse.REMAINDER)
+    test.set_defaults(handler=run_test)
+
+    workflows = subparsers.add_parser('workflows', help="GitHub Actions status, flakes, cost and fleet views",
+                                      add_help=False)
+    workflows.add_argument('script_args', nargs=argparse.REMAINDER)
+    workflows.set_defaults(handler=run_workflows)
+
+    findings = subparsers.add_parser('findings', help="query the structured findings index")
+    findings.add_argument('--db', default=None, help="findings database (default: $MQTOOLS_FINDINGS_DB or grok-findings.db)")
+    findings.set_defaults(handler=run_findings, findings_command='query', file=None, category=None,
+                          min_severity=None, run=None, text=None, limit=50, json=False)
+    findings_commands = findings.add_subparsers(dest='findings_command')
+    query = findings_commands.add_parser('query', help="filter findings across runs")
+    query.add_argument('text', nargs='?', help="full-text search over rule, description and snippet "
+                                               "(every word must match; word* matches a prefix)")
+    query.add_argument('--file', help="exact file name, e.g. quiz.moneycoach.php")
+    query.add_argument('--category', help="e.g. sql_injection, xss, csrf, hardcoded_secret")
+    query.add_argument('--min-severity', choices=['info', 'low', 'medium', 'high', 'critical'])
+    query.add_argument('--run', help="restrict to one run id")
+    query.add_argument('--limit', type=int, default=50)
+    query.add_argument('--json', action='store_true', help="print rows as JSON")
+    import_ = findings_commands.add_parser('import', help="index an existing grok-analysis-raw-results.json")
+    import_.add_argument('raw_results')
+    import_.add_argument('--run-id', help="run id to record (default: current timestamp)")
+    import_.add_argument('--model', default='grok-4-0709')
+    findings_commands.add_parser('runs', help="list indexed runs")
+    consolidate = findings_commands.add_parser('consolidate', help="merge near-duplicate findings of a run")
+    consolidate.add_argument('--run', help="run id (default: latest run)")
+    consolidate.add_argument('--threshold', type=float, default=0.5, help="MinHash similarity to merge at")
+    diff = findings_commands.add_parser('diff', help="new, resolved and persisting findings between two runs")
+    diff.add_argument('old', nargs='?', help="older run id (default: run before NEW)")
+    diff.add_argument('new', nargs='?', help="newer run id (default: latest run)")
+    diff.add_argument('--file', dest='files', action='append',
+                      help="compare only this file (repeatable; default: the files NEW reviewed)")
+
+    symbols = subparsers.add_parser('symbols', help="build the PHP symbol index used for prompt context")
+    symbols.add_argument('--root', help="plugin directory (default: $MQTOOLS_PLUGIN_DIR or the repository root)")
+    symbols.add_argument('--file', help="show the context a prompt for this file would get")
+    symbols.add_argument('--budget', type=int, default=1500, help="context token budget")
+    symbols.set_defaults(handler=run_symbols)
+
+    secrets = subparsers.add_parser('secrets', help="scan every file for hardcoded credentials")
+    secrets.add_argument('--root', help="tree to scan (default: $MQTOOLS_PLUGIN_DIR or the repository root)")
+    secrets.add_argument('--baseline', help="accepted findings (default: secrets-baseline.json)")
+    secrets.add_argument('--update-baseline', action='store_true', help="accept every current finding")
+    secrets.add_argument('--jobs', type=int, help="worker processes (default: CPU count)")
+    secrets.add_argument('--json', action='store_true', help="print new findings as JSON")
+    secrets.set_defaults(handler=run_secrets)
+
+    taint = subparsers.add_parser('taint', help="follow request input to SQL queries and output without the API")
+    taint.add_argument('files', nargs='*', help="PHP files to report on (default: the whole plugin)")
+    taint.add_argument('--root', help="plugin directory (default: $MQTOOLS_PLUGIN_DIR or the repository root)")
+    taint.add_argument('--all', action='store_true', help="also list the sinks proven safe")
+    taint.add_argument('--json', action='store_true', help="print sinks as JSON")
+    taint.set_defaults(handler=run_taint)
+
+    queries = subparsers.add_parser('queries', help="find $wpdb queries that run inside loops (N+1)")
+    queries.add_argument('files', nargs='*', help="PHP files to report on (default: the whole plugin)")
+    queries.add_argument('--root', help="plugin directory (default: $MQTOOLS_PLUGIN_DIR or the repository root)")
+    queries.add_argument('--all', action='store_true', help="list every extracted query with its SQL template")
+    queries.add_argument('--json', action='store_true', help="print records as JSON")
+    queries.set_defaults(handler=run_queries)
+
+    vendored = subparsers.add_parser('vendored', help="list minified and vendored files that reviews skip")
+    vendored.add_argument('files', nargs='*', help="files to classify (default: every code file in the plugin)")
+    vendored.add_argument('--root', help="plugin directory (default: $MQTOOLS_PLUGIN_DIR or the repository root)")
+    vendored.add_argument('--all', action='store_true', help="also list first-party files")
+    vendored.add_argument('--json', action='store_true', help="print the classification as JSON")
+    vendored.set_defaults(handler=run_vendored)
+
+    schema = subparsers.add_parser('schema', help="recommend indexes from the table definitions and query templates")
+    schema.add_argument('--root', help="plugin directory (default: $MQTOOLS_PLUGIN_DIR or the repository root)")
+    schema.add_argument('--rows', type=int, default=20000, help="synthetic rows per table for validation")
+    schema.add_argument('--no-validate', action='store_true', help="skip the before/after timings on SQLite")
+    schema.add_argument('--json', action='store_true', help="print tables, issues and recommendations as JSON")
+    schema.set_defaults(handler=run_schema)
+
+    clones = subparsers.add_parser('clones', help="find near-duplicate code regions with winnowing fingerprints")
+    clones.add_argument('files', nargs='*', help="files to compare (default: the plugin's first-party PHP, JS and CSS)")
+    clones.add_argument('--root', help="plugin directory (default: $MQTOOLS_PLUGIN_DIR or the repository root)")
+    clones.add_argument('--json', action='store_true', help="print clone classes as JSON")
+    clones.set_defaults(handler=run_clones)
+
+    mock = subparsers.add_parser('mock-server', help="run a local mock of the Grok endpoint")
+    mock.add_argument('--port', type=int, default=8765)
+    mock.add_argument('--median', type=float, default=0.2, help="median latency in seconds")
+    mock.add_argument('--sigma', type=float, default=0.3, help="log-normal spread")
+    mock.add_argument('--tail-rate', type=float, default=0.05, help="share of slow tail calls")
+    mock.add_argument('--tail-factor', type=float, default=8.0, help="slowdown of tail calls")
+    mock.add_argument('--error-rate', type=float, default=0.0, help="share of 503 answers")
+    mock.set_defaults(handler=run_mock_server)
+
+    hedge = subparsers.add_parser('hedge-bench', help="compare p99 latency with and without hedging")
+    hedge.add_argument('--requests', type=int, default=300)
+    hedge.add_argument('--concurrency', type=int, default=4)
+    hedge.add_argument('--warmup', type=int, default=40, help="calls that seed the latency model")
+    hedge.add_argument('--median', type=float, default=0.05, help="mock median latency in seconds")
+    hedge.add_argument('--tail-rate', type=float, default=0.05)
+    hedge.add_argument('--tail-factor', type=float, default=10.0)
+    hedge.add_argument('--hedge-cap', type=float, default=0.1, help="maximum share of hedged requests")
+    hedge.add_argument('--json', help="also write results to a JSON file")
+    hedge.set_defaults(handler=run_hedge_bench)
+
+    bench = subparsers.add_parser('startup-bench', help="measure start-up time of each subcommand")
+    bench.add_argument('--runs', type=int, default=10, help="runs per command")
+    bench.set_defaults(handler=run_startup_bench)
+
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if extra:
+        # REMAINDER only starts at the first positional; leading options belong to the script too
+        if not hasattr(args, 'script_args'):
+            parser.error(f"unrecognized arguments: {' '.join(extra)}")
+        args.script_args = extra + args.script_args
+    if not args.command:
+        parser.print_help()
+        return
+    if getattr(args, 'db', '') is None:
+        from mqtools.config import FINDINGS_DB
+        args.db = FINDINGS_DB
+    args.handler(args)
@@ -0,0 +1,230 @@
+"""
+Shared Grok API call path
+
+GrokClient wraps the chat completions endpoint with the retry/backoff the
+review scripts used inline, one pooled keep-alive session and a latency
+model (mqtools.latency) that is loaded from and saved to the tools cache.
+
+- Adaptive timeouts: connect, read and total deadlines for each request
+  come from the model for its prompt size and max_tokens. The script's
+  old fixed timeout is only used until the model has enough samples.
+- Circuit breaker: after repeated outage failures calls fail at once with
+  {"error": ..., "circuit_open": True} instead of retrying, until a
+  half-open probe succeeds (mqtools.breaker).
+- Hedging (optional): when a call is still running after the observed p90
+  latency for its shape, a duplicate is sent and whichever answer arrives
+  first is used. Nothing is hedged until the model has samples for the
+  shape, and hedges are capped at a fraction of the requests sent so far.
+  The losing request, and any abandoned at the total deadline, stop
+  reading and close their connection.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from mqtools.breaker import CircuitBreaker, is_outage
+from mqtools.latency import LatencyTracker, payload_tokens, percentile
+
+HEDGE_PERCENTILE = 0.9
+HEDGE_RATE_CAP = 0.1    # at most 10% of requests get a duplicate
+
+class Cancelled(Exception):
+    """A request whose answer is no longer wanted"""
+
+class GrokClient:
+    """Chat completion calls with retries, adaptive timeouts and hedging"""
+
+    def __init__(self, api_key, api_endpoint, timeout=60, max_retries=3,
+                 hedging=False, hedge_rate_cap=HEDGE_RATE_CAP, tracker=None, breaker=None):
+        self.api_key = api_key
+        self.api_endpoint = api_endpoint
+        self.timeout = timeout  # fallback read timeout until the model has data
+        self.max_retries = max_retries
+        self.hedging = hedging
+        self.hedge_rate_cap = hedge_rate_cap
+        if tracker is None:
+            from mqtools.config import LATENCY_MODEL_PATH
+            tracker = LatencyTracker(path=LATENCY_MODEL_PATH)
+        self.tracker = tracker
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "timeouts_hit": 0, "skipped": 0,
+                      "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+                      "latencies": [], "deadlines": []}
+        self.lock = threading.Lock()
+        self._session = None
+        self._executor = None
+
+    @property
+    def session(self):
+        """Pooled keep-alive session, created on first use"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            self._session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            })
+        return self._session
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="grok-call")
+        return self._executor
+
+    def _post(self, payload, deadlines, cancelled):
+        """One HTTP attempt; returns (response json, seconds), or raises Cancelled once cancelled is set"""
+        connect, read, _ = deadlines
+        started = time.perf_counter()
+        if cancelled.is_set():
+            raise Cancelled()
+        response = self.session.post(self.api_endpoint, json=payload, timeout=(connect, read), stream=True)
+        try:
+            response.raise_for_status()
+            body = bytearray()
+            for block in response.iter_content(1 << 12):
+                if cancelled.is_set():
+                    raise Cancelled()  # closing an unread response drops its connection
+                body += block
+        finally:
+            response.close()
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            # Like response.json(): a truncated or HTML body goes through the retry and breaker path
+            import requests
+            raise requests.exceptions.RequestException(f"invalid JSON in response body: {e}") from e
+        return data, time.perf_counter() - started
+
+    def _hedge_allowed(self):
+        with self.lock:
+            return self.stats["hedges"] + 1 <= self.hedge_rate_cap * self.stats["requests"]
+
+    def _first_result(self, futures, hedge, remaining):
+        """First successful result among futures within the remaining deadline"""
+        import requests
+
+        pending = set(futures)
+        error = None
+        deadline = time.perf_counter() + remaining
+        while pending:
+            done, pending = wait(pending, timeout=max(0, deadline - time.perf_counter()),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise requests.exceptions.Timeout(f"total deadline of {remaining:.1f}s exceeded")
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if future is hedge:
+                    with self.lock:
+                        self.stats["hedge_wins"] += 1
+                return result
+        raise error
+
+    def _timed_post(self, payload, tokens, deadlines):
+        """Send within the total deadline, hedging slow calls if enabled"""
+        cancelled = threading.Event()
+        futures = [self.executor.submit(self._post, payload, deadlines, cancelled)]
+        try:
+            return self._hedged(futures, payload, tokens, deadlines, cancelled)
+        finally:
+            # Whatever is still running lost the race or ran out of time
+            cancelled.set()
+            for future in futures:
+                future.cancel()
+
+    def _hedged(self, futures, payload, tokens, deadlines, cancelled):
+        total = deadlines[2]
+        threshold = self.tracker.percentile(tokens, HEDGE_PERCENTILE, payload.get('max_tokens'))
+        if not self.hedging or threshold is None or threshold >= total:
+            return self._first_result(futures, None, total)
+
+        done, _ = wait(futures, timeout=threshold)
+        if done or not self._hedge_allowed():
+            return self._first_result(futures, None, total - threshold)
+
+        with self.lock:
+            self.stats["hedges"] += 1
+        hedge = self.executor.submit(self._post, payload, deadlines, cancelled)
+        futures.append(hedge)
+        return self._first_result(futures, hedge, total - threshold)
+
+    def complete(self, payload):
+        """POST a chat completion with retry logic; errors come back as {"error": ...}"""
+        import requests
+
+        tokens = payload_tokens(payload)
+        max_tokens = payload.get('max_tokens')
+        for attempt in range(self.max_retries):
+            if not self.breaker.allow():
+                with self.lock:
+                    self.stats["skipped"] += 1
+                return {"error": f"circuit open after {self.breaker.failures} consecutive failures",
+                        "circuit_open": True}
+            deadlines = self.tracker.timeouts(tokens, max_tokens, self.timeout)
+            started = time.perf_counter()
+            with self.lock:
+                self.stats["requests"] += 1
+                self.stats["deadlines"].append(deadlines)
+            try:
+                result, seconds = self._timed_post(payload, tokens, deadlines)
+            except requests.exceptions.RequestException as e:
+                if isinstance(e, requests.exceptions.Timeout):
+                    self.tracker.record_timeout(tokens, deadlines[1], max_tokens)
+                    with self.lock:
+                        self.stats["timeouts_hit"] += 1
+                if is_outage(e):
+                    self.breaker.failure()
+                else:
+                    self.breaker.success()  # the endpoint answered; the request itself was bad
+                print(f"API call failed (attempt {attempt + 1}/{self.max_retries}): {e}")
+                if self.breaker.is_open:
+                    return {"error": str(e), "circuit_open": True}
+                if attempt < self.max_retries - 1:
+                    time.sleep(2 ** attempt)  # Exponential backoff
+                    continue
+                return {"error": str(e)}
+            self.breaker.success()
+            self.tracker.record(tokens, seconds, max_tokens)
+            usage = result.get('usage') or {}
+            with self.lock:
+                self.stats["latencies"].append(time.perf_counter() - started)
+                # Provider prefix cache hits, to measure prompt layout changes
+                self.stats["prompt_tokens"] += usage.get('prompt_tokens') or 0
+                self.stats["cached_tokens"] += (usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0
+                self.stats["completion_tokens"] += usage.get('completion_tokens') or 0
+            return result
+
+    def metrics(self):
+        """Summary of this client's calls for run metrics"""
+        with self.lock:
+            latencies = list(self.stats["latencies"])
+            deadlines = list(self.stats["deadlines"])
+            summary = {key: self.stats[key] for key in ("requests", "hedges", "hedge_wins", "timeouts_hit", "skipped",
+                                                  "prompt_tokens", "cached_tokens", "completion_tokens")}
+            summary["circuit_opens"] = self.breaker.opens
+        summary["cache_hit_rate"] = round(summary["cached_tokens"] / max(1, summary["prompt_tokens"]), 3)
+        if latencies:
+            summary["latency_seconds"] = {f"p{q}": round(percentile(latencies, q / 100), 2)
+                                          for q in (50, 90, 99)}
+        if deadlines:
+            summary["deadlines_seconds"] = {
+                name: {"min": min(d[i] for d in deadlines),
+                       "p50": percentile([d[i] for d in deadlines], 0.5),
+                       "max": max(d[i] for d in deadlines)}
+                for i, name in enumerate(("connect", "read", "total"))
+            }
+        return summary
+
+    def close(self):
+        """Release connections and persist the latency model"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        if self._session is not None:
+            self._session.close()
+        self.tracker.save()
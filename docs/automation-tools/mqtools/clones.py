@@ -0,0 +1,360 @@
+"""
+Sub-file clone detection with winnowing fingerprints
+
+Files are read as one token stream each, PHP and the HTML around it alike:
+variables become $, string literals S and numbers N, so
+$last_thirty_Warrior_question and $last_thirty_Initiator_question are the
+same token. Every run of K tokens is hashed with a rolling (Karp-Rabin)
+hash, and winnowing keeps the smallest hash of each window of WINDOW
+hashes. Two regions that share a run of K + WINDOW - 1 tokens are certain
+to share a fingerprint, and the work stays linear in the size of the tree.
+
+Matching fingerprints of two files are chained into clone pairs when they
+follow one another in both files, allowing DRIFT tokens of insertions or
+deletions between copies. A region repeated back to back inside one file
+(the per-archetype blocks of stats.admin.php) is cut into its periods.
+Pairs are then joined into clone classes: regions that are copies of each
+other, or that cover the same place, belong to one class.
+
+The reviewer sends one representative of each class (its longest copy)
+and blanks the other copies' lines, keeping line numbers, behind a comment
+naming the representative. A copy that overlaps any class's representative,
+or a larger copy already blanked, is sent as it is: blanking it would hide
+code the model is said to have reviewed. The report lists the classes as
+refactoring targets.
+"""
+
+import os
+import re
+from collections import deque
+
+from mqtools.queries import line_index
+
+K = 20                      # tokens per hashed k-gram; shorter matches are noise
+WINDOW = 8                  # winnowing window
+MIN_TOKENS = 80             # shortest clone reported
+MIN_LINES = 6               # and its fewest lines
+MAX_BUCKET = 40             # fingerprints seen more often than this are boilerplate
+GAP = K + WINDOW            # largest step between consecutive fingerprints of one clone
+DRIFT = 8                   # tokens inserted or deleted between copies of a near-duplicate
+SAME_PLACE = 0.6            # regions overlapping this share of the longer are one place
+BASE = 1000003
+MODULUS = (1 << 61) - 1
+
+TOKEN_RE = re.compile(r'''
+    (?P<comment>/\*.*?\*/|<!--.*?-->|(?<![:\w])//[^\n]*)
+  | (?P<var>\$\w+)
+  | (?P<string>"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<word>[A-Za-z_][\w-]*)
+  | (?P<other>\S)
+''', re.S | re.X)
+NORMALIZED = {'var': '$', 'string': 'S', 'number': 'N'}
+COMMENTS = {'.css': '/* {} */', '.html': '<!-- {} -->', '.htm': '<!-- {} -->'}  # default: // {}
+
+def tokenize(text):
+    """[(normalized token, offset)] of any source file"""
+    tokens = []
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        value = NORMALIZED.get(kind) or (match.group().lower() if kind == 'word' else match.group())
+        tokens.append((value, match.start()))
+    return tokens
+
+def kgram_hashes(ids, k=K):
+    """Rolling hash of every run of k token ids"""
+    if len(ids) < k:
+        return []
+    top = pow(BASE, k - 1, MODULUS)
+    value = 0
+    for token in ids[:k]:
+        value = (value * BASE + token) % MODULUS
+    hashes = [value]
+    for i in range(k, len(ids)):
+        value = ((value - ids[i - k] * top) * BASE + ids[i]) % MODULUS
+        hashes.append(value)
+    return hashes
+
+def winnow(hashes, window=WINDOW):
+    """[(hash, position)] fingerprints: the rightmost smallest hash of each window"""
+    fingerprints = []
+    candidates = deque()  # positions of increasing hashes in the current window
+    for i, value in enumerate(hashes):
+        while candidates and hashes[candidates[-1]] >= value:
+            candidates.pop()
+        candidates.append(i)
+        if candidates[0] <= i - window:
+            candidates.popleft()
+        if i >= window - 1 and (not fingerprints or fingerprints[-1][1] != candidates[0]):
+            fingerprints.append((hashes[candidates[0]], candidates[0]))
+    if hashes and not fingerprints:
+        position = min(range(len(hashes)), key=lambda i: (hashes[i], -i))
+        fingerprints.append((hashes[position], position))
+    return fingerprints
+
+def chains(matches):
+    """Runs of (a, b) fingerprint matches that follow one another in both files"""
+    runs, open_runs = [], []
+    for a, b in sorted(matches):
+        open_runs = [run for run in open_runs if a - run[-1][0] <= GAP]
+        for run in open_runs:
+            last_a, last_b = run[-1]
+            if a > last_a and b > last_b and abs((b - a) - (last_b - last_a)) <= DRIFT:
+                run.append((a, b))
+                break
+        else:
+            run = [(a, b)]
+            runs.append(run)
+            open_runs.append(run)
+    return runs
+
+class UnionFind:
+    def __init__(self):
+        self.parent = []
+
+    def add(self):
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        self.parent[self.find(i)] = self.find(j)
+
+class CloneIndex:
+    """Winnowing fingerprints of a set of files, and the clone classes they share"""
+
+    def __init__(self):
+        self.files = {}         # name -> {"tokens", "line_of"}
+        self.ids = {}           # normalized token -> id
+        self.fingerprints = {}  # hash -> [(name, token position)]
+
+    def add_file(self, name, text):
+        tokens = tokenize(text)
+        ids = [self.ids.setdefault(value, len(self.ids) + 1) for value, _ in tokens]
+        self.files[name] = {"tokens": tokens, "line_of": line_index(text)}
+        for value, position in winnow(kgram_hashes(ids)):
+            self.fingerprints.setdefault(value, []).append((name, position))
+
+    def pairs(self):
+        """[((name, start, end), (name, start, end))] of cloned token ranges"""
+        matches = {}  # (name a, name b) -> [(position a, position b)]
+        for places in self.fingerprints.values():
+            if len(places) < 2 or len(places) > MAX_BUCKET:
+                continue
+            places = sorted(places)
+            for i, (name_a, a) in enumerate(places):
+                for name_b, b in places[i + 1:]:
+                    if name_a != name_b or b - a >= K:
+                        matches.setdefault((name_a, name_b), []).append((a, b))
+
+        found = []
+        periodic = {}  # name -> [(start, end, period)] of blocks repeated back to back
+        for (name_a, name_b), positions in sorted(matches.items()):
+            runs = chains(positions)
+            if name_a == name_b:
+                runs.sort(key=lambda run: run[0][1] - run[0][0])  # shortest period first
+            for run in runs:
+                start_a, end_a = run[0][0], run[-1][0] + K
+                start_b, end_b = run[0][1], run[-1][1] + K
+                if name_a == name_b and start_b < end_a:
+                    # A block repeated back to back: the copies are its periods
+                    period = start_b - start_a
+                    if any(low - DRIFT <= start_a and end_b <= high + DRIFT
+                           and min(period % step, step - period % step) <= DRIFT
+                           for low, high, step in periodic.get(name_a, [])):
+                        continue  # a multiple of a period found already
+                    periodic.setdefault(name_a, []).append((start_a, end_b, period))
+                    starts = range(start_a, end_b - period + 1, period)
+                    found += [((name_a, left, left + period), (name_a, left + period, left + 2 * period))
+                              for left in starts if left + 2 * period <= end_b + DRIFT]
+                    continue
+                found.append(((name_a, start_a, end_a), (name_b, start_b, end_b)))
+        return [pair for pair in found if self.big_enough(*pair[0]) and self.big_enough(*pair[1])]
+
+    def big_enough(self, name, start, end):
+        start_line, end_line = self.lines(name, start, end)
+        return end - start >= MIN_TOKENS and end_line - start_line + 1 >= MIN_LINES
+
+    def lines(self, name, start, end):
+        """First and last line of a token range"""
+        tokens, line_of = self.files[name]['tokens'], self.files[name]['line_of']
+        return line_of(tokens[start][1]), line_of(tokens[min(end, len(tokens)) - 1][1])
+
+    def classes(self):
+        """Clone classes, largest first: each a list of members, the representative first"""
+        regions, groups = [], UnionFind()
+        for left, right in self.pairs():
+            regions += [left, right]
+            i, j = groups.add(), groups.add()
+            groups.union(i, j)
+        by_file = {}
+        for i, (name, start, end) in enumerate(regions):
+            by_file.setdefault(name, []).append(i)
+        for indexes in by_file.values():
+            indexes.sort(key=lambda i: regions[i][1])
+            for n, i in enumerate(indexes):
+                for j in indexes[n + 1:]:
+                    if regions[j][1] >= regions[i][2]:
+                        break
+                    overlap = min(regions[i][2], regions[j][2]) - regions[j][1]
+                    longer = max(regions[i][2] - regions[i][1], regions[j][2] - regions[j][1])
+                    if overlap >= SAME_PLACE * longer:
+                        groups.union(i, j)
+
+        members = {}
+        for i, region in enumerate(regions):
+            members.setdefault(groups.find(i), []).append(region)
+        classes = []
+        for spans in members.values():
+            merged = []
+            for name, start, end in sorted(set(spans)):
+                if merged and merged[-1][0] == name and start < merged[-1][2]:
+                    merged[-1] = (name, merged[-1][1], max(end, merged[-1][2]))
+                else:
+                    merged.append((name, start, end))
+            if len(merged) < 2:
+                continue
+            copies = []
+            for name, start, end in merged:
+                start_line, end_line = self.lines(name, start, end)
+                copies.append({"file": name, "start_line": start_line, "end_line": end_line, "tokens": end - start})
+            copies.sort(key=lambda copy: (-copy['tokens'], copy['file'], copy['start_line']))
+            classes.append(copies[:1] + sorted(copies[1:], key=lambda copy: (copy['file'], copy['start_line'])))
+        classes.sort(key=lambda copies: (-sum(copy['tokens'] for copy in copies[1:]), copies[0]['file'],
+                                         copies[0]['start_line']))
+        return [{"id": n, "copies": copies, "lines": copies[0]['end_line'] - copies[0]['start_line'] + 1,
+                 "duplicated_tokens": sum(copy['tokens'] for copy in copies[1:])}
+                for n, copies in enumerate(classes, 1)]
+
+def find_clones(paths, root=None):
+    """Clone classes of files on disk, named relative to root"""
+    from mqtools.vendored import relative_name
+
+    index = CloneIndex()
+    for path in paths:
+        try:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                index.add_file(relative_name(path, root), f.read())
+        except OSError:
+            continue
+    return index.classes()
+
+def overlaps(first, last, spans):
+    """Whether lines first-last meet any (first, last) span"""
+    return any(first <= span_last and span_first <= last for span_first, span_last in spans)
+
+def collapsed_regions(classes):
+    """file -> [(first line, last line, note)] of the copies left out of prompts
+
+    Copies are taken largest first. One that overlaps a representative of
+    any class, or a copy already taken, stays in the prompt.
+    """
+    representatives = {}
+    for clone in classes:
+        representative = clone['copies'][0]
+        representatives.setdefault(representative['file'], []).append(
+            (representative['start_line'], representative['end_line']))
+    candidates = []
+    for clone in classes:
+        representative = clone['copies'][0]
+        for copy in clone['copies'][1:]:
+            note = (f"lines {copy['start_line'] + 1}-{copy['end_line'] - 1} left out: near-copy of "
+                    f"{representative['file']}:{representative['start_line']}-{representative['end_line']} "
+                    f"(clone class {clone['id']}), reviewed there")
+            candidates.append((copy['file'], copy['start_line'], copy['end_line'], note))
+    regions = {}
+    largest_first = sorted(candidates, key=lambda region: (region[1] - region[2], region[0], region[1]))
+    for name, first, last, note in largest_first:
+        taken = [(region[0], region[1]) for region in regions.get(name, [])]
+        if last - first < 2 or overlaps(first, last, representatives.get(name, []) + taken):
+            continue
+        regions.setdefault(name, []).append((first, last, note))
+    return regions
+
+def collapse(code, regions, filename=''):
+    """code with the inner lines of each region blanked and the first replaced by its note
+
+    The first and last line of a region stay, as they may hold code outside
+    the clone; line numbers do not change.
+    """
+    if not regions:
+        return code
+    template = COMMENTS.get(os.path.splitext(filename)[1].lower(), '// {}')
+    lines = code.split('\n')
+    blanked = set()
+    for first, last, note in sorted(regions, key=lambda region: (region[0] - region[1], region[0])):  # largest first
+        inner = range(first, min(last - 1, len(lines)))  # indexes of lines first + 1 to last - 1
+        if not inner or blanked.intersection(inner):
+            continue
+        indent = re.match(r'[ \t]*', lines[first]).group()
+        lines[first] = indent + template.format(f"[{note}]")
+        for i in inner[1:]:
+            lines[i] = ''
+        blanked.update(inner)
+    return '\n'.join(lines)
+
+def render_clones(classes, limit=30):
+    """Markdown section listing clone classes as refactoring targets"""
+    if not classes:
+        return ""
+    left_out = {(name, first, last) for name, regions in collapsed_regions(classes).items()
+                for first, last, _ in regions}
+    section = (f"\n## Refactoring Targets: Duplicated Code\n\n"
+               f"{len(classes)} clone classes. Copies marked (left out) were not sent for review; "
+               f"the findings of their class's first copy apply to them.\n\n")
+    for clone in classes[:limit]:
+        copies = clone['copies']
+        files = sorted({copy['file'] for copy in copies})
+        advice = ("extract the block into one function and call it with what differs"
+                  if len(files) == 1 else "move the block into a shared function or template part")
+        section += (f"**Class {clone['id']}** - {len(copies)} copies of ~{clone['lines']} lines "
+                    f"(~{clone['duplicated_tokens']} duplicated tokens): {advice}\n")
+        for n, copy in enumerate(copies):
+            left = (copy['file'], copy['start_line'], copy['end_line']) in left_out
+            section += (f"- {copy['file']}:{copy['start_line']}-{copy['end_line']}"
+                        + (" (reviewed)" if n == 0 else " (left out)" if left else "") + "\n")
+        section += "\n"
+    if len(classes) > limit:
+        section += f"... and {len(classes) - limit} smaller classes (`python -m mqtools clones`)\n\n"
+    return section
+
+def run_clones(args):
+    """Entry point for `mqtools clones`"""
+    import glob
+    import json
+    import time
+
+    from mqtools.config import PLUGIN_DIR
+    from mqtools.symbols import EXCLUDE_RE, SOURCES
+    from mqtools.vendored import split_first_party
+
+    root = args.root or PLUGIN_DIR
+    started = time.perf_counter()
+    paths = args.files
+    if not paths:
+        paths = sorted({path for pattern in SOURCES + ['assets/**/*.js', 'assets/**/*.css']
+                        for path in glob.glob(os.path.join(root, pattern), recursive=True)
+                        if not EXCLUDE_RE.search(os.path.relpath(path, root))})
+        paths, _ = split_first_party(paths, root)
+    classes = find_clones(paths, root)
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(classes, indent=2))
+        return
+    for clone in classes:
+        copies = clone['copies']
+        print(f"class {clone['id']}: {len(copies)} copies of ~{clone['lines']} lines, "
+              f"{clone['duplicated_tokens']} duplicated tokens")
+        for copy in copies:
+            print(f"    {copy['file']}:{copy['start_line']}-{copy['end_line']}")
+    tokens = sum(clone['duplicated_tokens'] for clone in classes)
+    print(f"✓ {len(classes)} clone classes in {len(paths)} files, {tokens} duplicated tokens "
+          f"({elapsed:.1f} s)")
@@ -0,0 +1,56 @@
+"""
+Configuration shared by the automation tools
+
+Nothing here is validated at import time: the API key is only checked
+when a command actually needs to call the API.
+"""
+
+import os
+import sys
+
+API_ENDPOINT = os.environ.get('GROK_API_ENDPOINT', "https://api.x.ai/v1/chat/completions")
+MODEL = os.environ.get('GROK_MODEL', "grok-4-0709")
+
+# SQLite database holding parsed findings from every review run
+FINDINGS_DB = os.environ.get('MQTOOLS_FINDINGS_DB', "grok-findings.db")
+
+# Per-machine state kept between runs (latency model, ...)
+CACHE_DIR = os.environ.get('MQTOOLS_CACHE_DIR',
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.mqtools-cache'))
+LATENCY_MODEL_PATH = os.path.join(CACHE_DIR, 'latency-model.json')
+OUTPUT_MODEL_PATH = os.path.join(CACHE_DIR, 'output-lengths.json')
+SYMBOL_INDEX_PATH = os.path.join(CACHE_DIR, 'symbol-index.json')
+TAINT_CACHE_PATH = os.path.join(CACHE_DIR, 'taint-summaries.json')
+# Linked copies of the plugin files and reports `prepare` packages, kept out of the tracked tree
+REVIEW_PACKAGE_DIR = os.environ.get('MQTOOLS_REVIEW_PACKAGE_DIR', os.path.join(CACHE_DIR, 'review-package'))
+
+# Accepted findings of `mqtools secrets`, kept under version control
+SECRETS_BASELINE = os.environ.get('MQTOOLS_SECRETS_BASELINE',
+                                  os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                               'secrets-baseline.json'))
+
+# Files forced into ("include") or out of ("exclude") reviews, whatever the vendored classifier says
+REVIEW_OVERRIDES = os.environ.get('MQTOOLS_REVIEW_OVERRIDES',
+                                  os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                               'review-overrides.json'))
+
+# Plugin source tree indexed for prompt context (the repository root)
+PLUGIN_DIR = os.environ.get('MQTOOLS_PLUGIN_DIR',
+                            os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+def plugin_path(name):
+    """Path of a plugin file given relative to PLUGIN_DIR, as seen from the current directory"""
+    return os.path.relpath(os.path.join(PLUGIN_DIR, name))
+
+def get_api_key():
+    """API key from the environment (may be empty)"""
+    return os.environ.get('GROK_API_KEY', '')
+
+def require_api_key():
+    """API key, or exit with setup instructions if it is missing"""
+    api_key = get_api_key()
+    if not api_key:
+        print("Error: GROK_API_KEY environment variable not set")
+        print("Please set it with: export GROK_API_KEY='your-api-key'")
+        sys.exit(1)
+    return api_key
@@ -0,0 +1,142 @@
+"""
+Near-duplicate finding consolidation
+
+The same advice ("use $wpdb->prepare()") comes back for every chunk and
+analysis type that touches similar code. Each finding is fingerprinted
+with MinHash over word shingles; locality-sensitive hashing (banding)
+proposes candidate pairs in roughly linear time and pairs above the
+similarity threshold are merged with union-find. Every cluster becomes
+one canonical finding listing all of its locations.
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+
+NUM_PERMUTATIONS = 64
+BANDS = 16                       # 16 bands x 4 rows: ~50% similarity catches most pairs
+ROWS = NUM_PERMUTATIONS // BANDS
+SIMILARITY_THRESHOLD = 0.5
+SHINGLE_SIZE = 3
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME | 1,
+     int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), 'big') % _MERSENNE_PRIME)
+    for i in range(NUM_PERMUTATIONS)
+]
+
+WORD_RE = re.compile(r"[a-z_$][a-z0-9_$>-]*|\d+")
+CATEGORY_TITLES = {'sql_injection': 'SQL Injection', 'xss': 'XSS', 'csrf': 'CSRF'}
+
+LINE_REF_RE = re.compile(r'\blines?\s*\d+(\s*(-|–|to)\s*\d+)?', re.I)
+
+def finding_text(finding):
+    """Text that identifies what a finding is about (not where)"""
+    text = f"{finding['rule']} {finding['description']} {finding['snippet']}"
+    return LINE_REF_RE.sub(' ', text).lower()
+
+def shingles(text):
+    """Word n-gram shingles, hashed to 64-bit integers"""
+    words = WORD_RE.findall(text)
+    if len(words) < SHINGLE_SIZE:
+        grams = [' '.join(words)] if words else ['']
+    else:
+        grams = (' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+    return {int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), 'big') for g in grams}
+
+def minhash(shingle_set):
+    """MinHash signature of a shingle set"""
+    return [min((a * s + b) % _MERSENNE_PRIME for s in shingle_set) for a, b in _PERMUTATIONS]
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERMUTATIONS
+
+def cluster_findings(findings, threshold=SIMILARITY_THRESHOLD):
+    """Group near-duplicate findings; returns a list of index lists"""
+    signatures = [minhash(shingles(finding_text(f))) for f in findings]
+    parent = list(range(len(findings)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = defaultdict(list)
+    for i, signature in enumerate(signatures):
+        for band in range(BANDS):
+            key = (findings[i]['category'], band, tuple(signature[band * ROWS:(band + 1) * ROWS]))
+            buckets[key].append(i)
+
+    for members in buckets.values():
+        first = members[0]
+        for other in members[1:]:
+            root_a, root_b = find(first), find(other)
+            if root_a != root_b and similarity(signatures[first], signatures[other]) >= threshold:
+                parent[root_b] = root_a
+
+    clusters = defaultdict(list)
+    for i in range(len(findings)):
+        clusters[find(i)].append(i)
+    return list(clusters.values())
+
+def consolidate_findings(findings, threshold=SIMILARITY_THRESHOLD):
+    """One canonical finding per cluster, with every location it was seen at"""
+    from mqtools.findings import severity_rank
+
+    consolidated = []
+    for members in cluster_findings(findings, threshold):
+        group = [findings[i] for i in members]
+        # Most severe, then the one that shows code, then the most detailed
+        canonical = max(group, key=lambda f: (severity_rank(f['severity']), bool(f['snippet']),
+                                              len(f['description'])))
+        locations = sorted({(f['file'], f['line_start'], f['line_end']) for f in group},
+                           key=lambda loc: (loc[0], loc[1] or 0))
+        merged = dict(canonical)
+        merged['locations'] = [{"file": file, "line_start": start, "line_end": end}
+                               for file, start, end in locations]
+        merged['occurrences'] = len(group)
+        merged['analysis_types'] = sorted({f['analysis_type'] for f in group})
+        consolidated.append(merged)
+
+    consolidated.sort(key=lambda f: (-severity_rank(f['severity']), -f['occurrences'], f['category']))
+    return consolidated
+
+def format_location(location):
+    """file:start-end"""
+    text = location['file']
+    if location['line_start']:
+        text += f":{location['line_start']}"
+        if location['line_end'] and location['line_end'] != location['line_start']:
+            text += f"-{location['line_end']}"
+    return text
+
+def render_consolidated(consolidated, total):
+    """Markdown section listing each canonical finding once"""
+    report = "## Consolidated Findings\n\n"
+    report += (f"{total} raw findings consolidated into {len(consolidated)} distinct issues.\n\n")
+    by_category = defaultdict(list)
+    for finding in consolidated:
+        by_category[finding['category']].append(finding)
+
+    # Categories appear in the order of their most severe finding
+    for category, group in by_category.items():
+        title = CATEGORY_TITLES.get(category, category.replace('_', ' ').title())
+        report += f"### {title}\n\n"
+        report += render_group(group)
+    return report
+
+def render_group(group):
+    """Markdown for the findings of one category"""
+    report = ''
+    for finding in group:
+        title = finding['rule'] or finding['description'].split('\n')[0][:80]
+        report += f"#### [{finding['severity'].upper()}] {title}\n\n"
+        locations = ', '.join(format_location(loc) for loc in finding['locations'][:20])
+        if len(finding['locations']) > 20:
+            locations += f", ... (+{len(finding['locations']) - 20} more)"
+        report += f"**Seen {finding['occurrences']}x at:** {locations}\n\n"
+        report += finding['description'] + "\n\n"
+    return report
@@ -0,0 +1,119 @@
+"""
+Diff-scoped review regions
+
+For a pull request only the code it touches is reviewed. The new-side
+line ranges of `git diff base...head` are widened to the PHP function
+around them (found with the symbol scanner's brace matching), or to a few
+lines of context for top-level code. Regions are sent with their real line
+numbers in front of every line, so findings come back with file line
+numbers and can be matched to the changed lines.
+"""
+
+import re
+import subprocess
+
+from mqtools.symbols import FUNCTION_RE, block_end, docblock_start, line_of
+
+HUNK_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@')
+PATHSPECS = ['*.php', ':(exclude)vendor/*', ':(exclude)package/*']
+CONTEXT_LINES = 5           # around changes outside any function
+MAX_FUNCTION_LINES = 200    # longer functions only get CONTEXT_LINES * 4 around the change
+UNIT_CHARS = 8000
+
+DIFF_NOTE = """Only the regions of this file changed by a pull request are shown, each line prefixed
+        with its line number in the file ("123| code"). Review these regions and use those line
+        numbers; code between regions is omitted.
+
+        """
+
+def parse_range(spec):
+    """'base...head' or 'base' -> (base, head or 'HEAD')"""
+    base, _, head = spec.partition('...')
+    return base, head or 'HEAD'
+
+def changed_lines(base, head, cwd):
+    """{path: sorted new-side line numbers touched} for PHP files in base...head"""
+    # Explicit prefixes, whatever diff.noprefix says
+    diff = subprocess.run(['git', 'diff', '--unified=0', '--no-color', '--relative', '--src-prefix=a/',
+                           '--dst-prefix=b/', f'{base}...{head}', '--'] + PATHSPECS,
+                          cwd=cwd, capture_output=True, text=True, check=True).stdout
+    return parse_diff(diff)
+
+def parse_diff(diff):
+    """{path: sorted new-side line numbers touched} of a unified diff, with or without a/ b/ prefixes"""
+    changed = {}
+    path = None
+    for line in diff.split('\n'):
+        if line.startswith('+++ '):
+            path = line[4:].split('\t')[0]
+            path = None if path == '/dev/null' else path[2:] if path.startswith('b/') else path
+            if path:
+                changed.setdefault(path, set())
+        elif line.startswith('@@') and path:
+            match = HUNK_RE.match(line)
+            start, count = int(match.group(1)), int(match.group(2) if match.group(2) is not None else 1)
+            # A pure deletion has no new lines; mark the line it happened before
+            changed[path].update(range(start, start + count) if count else [max(1, start)])
+    return {path: sorted(lines) for path, lines in changed.items() if lines}
+
+def file_at(head, path, cwd):
+    """Source of path at head"""
+    return subprocess.run(['git', 'show', f'{head}:{path}'], cwd=cwd, capture_output=True,
+                          text=True, check=True, errors='replace').stdout
+
+def function_spans(text):
+    """(first line, last line, name) of every function, including its docblock"""
+    spans = []
+    for match in FUNCTION_RE.finditer(text):
+        end = block_end(text, match.end())
+        spans.append((line_of(text, docblock_start(text, match.start())), line_of(text, end - 1), match.group(1)))
+    return spans
+
+def regions_for(text, lines):
+    """Merged (first, last, label) regions covering the changed lines"""
+    total = text.count('\n') + 1
+    spans = function_spans(text)
+    regions = []
+    for line in lines:
+        around = [span for span in spans if span[0] <= line <= span[1]]
+        if around:
+            first, last, name = min(around, key=lambda span: span[1] - span[0])  # innermost
+            if last - first + 1 <= MAX_FUNCTION_LINES:
+                regions.append([first, last, f"function {name}"])
+                continue
+            width = CONTEXT_LINES * 4
+            regions.append([max(first, line - width), min(last, line + width), f"part of function {name}"])
+        else:
+            regions.append([max(1, line - CONTEXT_LINES), min(total, line + CONTEXT_LINES), "top-level code"])
+
+    merged = []
+    for region in sorted(regions):
+        if merged and region[0] <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], region[1])
+            if region[2] not in merged[-1][2]:
+                merged[-1][2] += f", {region[2]}"
+        else:
+            merged.append(region)
+    return [tuple(region) for region in merged]
+
+def render_units(text, regions, unit_chars=UNIT_CHARS):
+    """Line-numbered region text, grouped into units of about unit_chars"""
+    source = text.split('\n')
+    units, current = [], ''
+    for first, last, label in regions:
+        block = f"// lines {first}-{last} ({label})\n"
+        block += '\n'.join(f"{number}| {source[number - 1]}" for number in range(first, last + 1)) + '\n'
+        if current and len(current) + len(block) > unit_chars:
+            units.append(current)
+            current = ''
+        current += block
+    if current:
+        units.append(current)
+    return units
+
+def on_changed_lines(finding, lines):
+    """Whether a finding's line range touches a changed line"""
+    if finding['line_start'] is None:
+        return False
+    end = finding['line_end'] or finding['line_start']
+    return any(finding['line_start'] <= line <= end for line in lines)
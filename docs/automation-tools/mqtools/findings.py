@@ -0,0 +1,375 @@
+"""
+Structured findings: parsing review output and indexing it in SQLite
+
+Review responses are free-form markdown. parse_findings() turns one
+response into finding dicts (file, line range, category, severity, rule,
+snippet, description), preferring a ```json {"findings": [...]} block when
+the model provides one. FindingsIndex stores findings from many runs in an
+indexed SQLite database with full-text search over descriptions.
+"""
+
+import json
+import re
+import sqlite3
+import time
+
+from mqtools.results import result_content
+
+SEVERITIES = ['info', 'low', 'medium', 'high', 'critical']
+
+# Category -> phrases that identify it in free-form review text
+CATEGORY_KEYWORDS = [
+    ('sql_injection', ('sql injection', 'sqli', '$wpdb->prepare', 'prepared statement')),
+    ('xss', ('xss', 'cross-site scripting', 'esc_html', 'esc_attr', 'unescaped output')),
+    ('csrf', ('csrf', 'cross-site request forgery', 'nonce')),
+    ('hardcoded_secret', ('hardcoded', 'hard-coded', 'secret key', 'credential', 'api key')),
+    ('access_control', ('authorization', 'authentication', 'current_user_can', 'capability', 'access control')),
+    ('file_upload', ('file upload', 'upload')),
+    ('command_injection', ('command injection', 'shell_exec', 'exec(')),
+    ('input_validation', ('input validation', 'sanitiz', 'validate')),
+    ('division_by_zero', ('division by zero', 'divide by zero')),
+    ('error_handling', ('error handling', 'exception', 'insert_id')),
+    ('performance', ('performance', 'n+1', 'inside a loop', 'caching', 'slow query')),
+    ('coding_standards', ('coding standard', 'naming convention', 'wpcs', 'psr')),
+    ('duplication', ('duplicat', 'dry ', "don't repeat")),
+    ('architecture', ('architecture', 'separation of concerns', 'mvc', 'design pattern', 'dependency injection')),
+    ('documentation', ('documentation', 'docblock', 'comment')),
+]
+
+SEVERITY_RE = re.compile(r'\b(critical|high|medium|moderate|low|info(?:rmational)?)\b', re.I)
+LINE_NUMBER_RE = re.compile(r'\d+')
+LINE_RE = re.compile(r'\blines?\s*:?\s*(\d+)(?:\s*(?:-|–|to)\s*(\d+))?', re.I)
+FENCE_RE = re.compile(r'```[\w+-]*\n(.*?)```', re.S)
+JSON_BLOCK_RE = re.compile(r'```json\s*\n(.*?)```', re.S)
+HEADING_RE = re.compile(r'^(?:#{2,6}\s+|\d+\.\s+\*\*|\*\*\d+\.\s*|[-*]\s+\*\*)(.+?)(?:\*\*)?\s*:?\s*$', re.M)
+
+def severity_rank(severity):
+    """Numeric rank for ordering and range queries"""
+    return SEVERITIES.index(severity) if severity in SEVERITIES else 0
+
+def normalize_severity(text):
+    """Map free-form severity wording onto SEVERITIES"""
+    text = (text or '').lower()
+    if text.startswith('moderate'):
+        return 'medium'
+    if text.startswith('info'):
+        return 'info'
+    return text if text in SEVERITIES else 'medium'
+
+def classify_category(text):
+    """Best matching category for a piece of review text"""
+    lowered = text.lower()
+    for category, phrases in CATEGORY_KEYWORDS:
+        if any(phrase in lowered for phrase in phrases):
+            return category
+    return 'general'
+
+def make_finding(filename, description, analysis_type, line_start=None, line_end=None,
+                 category=None, severity=None, rule='', snippet=''):
+    """Finding dict with every field filled in"""
+    return {
+        "file": filename,
+        "line_start": line_start,
+        "line_end": line_end if line_end is not None else line_start,
+        "category": category or classify_category(f"{rule} {description}"),
+        "severity": normalize_severity(severity),
+        "rule": rule.strip(),
+        "snippet": snippet.strip(),
+        "description": description.strip(),
+        "analysis_type": analysis_type
+    }
+
+def parse_line(value):
+    """Line number the model gave ("45", 45, "45-50", "N/A"): its first integer, or None"""
+    match = LINE_NUMBER_RE.search(str(value)) if value is not None else None
+    return int(match.group()) if match else None
+
+def field(value):
+    """Model-supplied text field as a string, whatever JSON type it came in"""
+    return value if isinstance(value, str) else '' if value is None else json.dumps(value)
+
+def _offset(line, line_offset):
+    """Chunk-relative line number -> file line number"""
+    return line + line_offset if line is not None else None
+
+def parse_structured_findings(content, filename, analysis_type, line_offset=0):
+    """Findings from a ```json {"findings": [...]} block, or None"""
+    for block in JSON_BLOCK_RE.findall(content):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        items = data.get('findings') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            continue
+        findings = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            start = parse_line(item.get('line_start', item.get('line')))
+            findings.append(make_finding(
+                field(item.get('file')) or filename,
+                field(item.get('description')),
+                analysis_type,
+                _offset(start, line_offset) if start else None,
+                _offset(parse_line(item.get('line_end')), line_offset) if start else None,
+                field(item.get('category')),
+                field(item.get('severity')),
+                field(item.get('rule')),
+                field(item.get('snippet'))
+            ))
+        return findings
+    return None
+
+def parse_findings(content, filename, analysis_type, line_offset=0):
+    """Split one review response into structured findings"""
+    structured = parse_structured_findings(content, filename, analysis_type, line_offset)
+    if structured is not None:
+        return structured
+
+    headings = list(HEADING_RE.finditer(content))
+    findings = []
+    for i, heading in enumerate(headings):
+        end = headings[i + 1].start() if i + 1 < len(headings) else len(content)
+        body = content[heading.end():end].strip()
+        title = heading.group(1).strip('*: ')
+        text = f"{title}\n{body}"
+        category = classify_category(text)
+        lines = LINE_RE.search(text)
+        if category == 'general' and not lines:
+            # Summary / intro sections, not findings
+            continue
+
+        severity = SEVERITY_RE.search(text)
+        snippet = FENCE_RE.search(body)
+        line_start = _offset(int(lines.group(1)), line_offset) if lines else None
+        line_end = _offset(int(lines.group(2)), line_offset) if lines and lines.group(2) else None
+        findings.append(make_finding(
+            filename, body, analysis_type, line_start, line_end, category,
+            severity.group(1) if severity else None, title,
+            snippet.group(1) if snippet else ''
+        ))
+    return findings
+
+def chunk_line_offsets(chunks):
+    """First line number (1-based) of each chunk from chunk_code()"""
+    offsets = []
+    line = 1
+    for chunk in chunks:
+        offsets.append(line)
+        line += chunk.count('\n') + 1
+    return offsets
+
+def fts_query(text):
+    """FTS5 query matching every word of text, each quoted so $wpdb->prepare or esc_html() are not syntax"""
+    terms = []
+    for term in text.split():
+        prefix = term.endswith('*') and len(term) > 1
+        term = term[:-1] if prefix else term
+        terms.append('"' + term.replace('"', '""') + '"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+class FindingsIndex:
+    """Findings from every run in one indexed SQLite database"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            run_id TEXT PRIMARY KEY,
+            model TEXT,
+            created_at TEXT,
+            source TEXT
+        );
+        CREATE TABLE IF NOT EXISTS findings (
+            id INTEGER PRIMARY KEY,
+            run_id TEXT NOT NULL REFERENCES runs(run_id),
+            file TEXT NOT NULL,
+            line_start INTEGER,
+            line_end INTEGER,
+            category TEXT NOT NULL,
+            severity TEXT NOT NULL,
+            severity_rank INTEGER NOT NULL,
+            rule TEXT,
+            snippet TEXT,
+            description TEXT,
+            analysis_type TEXT,
+            model TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_findings_file ON findings (file, category, severity_rank);
+        CREATE INDEX IF NOT EXISTS idx_findings_category ON findings (category, severity_rank);
+        CREATE INDEX IF NOT EXISTS idx_findings_run ON findings (run_id);
+        CREATE VIRTUAL TABLE IF NOT EXISTS findings_fts USING fts5 (rule, description, snippet);
+        CREATE TABLE IF NOT EXISTS run_files (
+            run_id TEXT NOT NULL REFERENCES runs(run_id),
+            file TEXT NOT NULL,
+            PRIMARY KEY (run_id, file)
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.executescript(self.SCHEMA)
+
+    def add_run(self, run_id, model, findings, source='', files=None):
+        """Store one run's findings and the files it reviewed (replacing a previous import of it)"""
+        if files is None:
+            files = {f['file'] for f in findings}
+        with self.db:
+            self.db.execute("DELETE FROM findings_fts WHERE rowid IN "
+                            "(SELECT id FROM findings WHERE run_id = ?)", (run_id,))
+            self.db.execute("DELETE FROM findings WHERE run_id = ?", (run_id,))
+            self.db.execute("DELETE FROM run_files WHERE run_id = ?", (run_id,))
+            # An upsert keeps the run's rowid, and with it its place in previous_run() order, on --resume
+            self.db.execute("INSERT INTO runs VALUES (?, ?, ?, ?) ON CONFLICT (run_id) DO UPDATE SET "
+                            "model = excluded.model, created_at = excluded.created_at, source = excluded.source",
+                            (run_id, model, time.strftime('%Y-%m-%d %H:%M:%S'), source))
+            for f in findings:
+                cursor = self.db.execute(
+                    "INSERT INTO findings (run_id, file, line_start, line_end, category, severity, "
+                    "severity_rank, rule, snippet, description, analysis_type, model) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run_id, f['file'], f['line_start'], f['line_end'], f['category'], f['severity'],
+                     severity_rank(f['severity']), f['rule'], f['snippet'], f['description'],
+                     f['analysis_type'], model))
+                self.db.execute("INSERT INTO findings_fts (rowid, rule, description, snippet) "
+                                "VALUES (?, ?, ?, ?)",
+                                (cursor.lastrowid, f['rule'], f['description'], f['snippet']))
+            self.db.executemany("INSERT OR IGNORE INTO run_files VALUES (?, ?)",
+                                [(run_id, file) for file in sorted(files)])
+        return len(findings)
+
+    def query(self, file=None, category=None, min_severity=None, run_id=None, text=None, limit=50):
+        """Findings matching every given filter, most severe first"""
+        clauses, params = [], []
+        if file:
+            clauses.append("f.file = ?")
+            params.append(file)
+        if category:
+            clauses.append("f.category = ?")
+            params.append(category)
+        if min_severity:
+            clauses.append("f.severity_rank >= ?")
+            params.append(severity_rank(min_severity))
+        if run_id:
+            clauses.append("f.run_id = ?")
+            params.append(run_id)
+        if text and text.strip():
+            clauses.append("f.id IN (SELECT rowid FROM findings_fts WHERE findings_fts MATCH ?)")
+            params.append(fts_query(text))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        sql = (f"SELECT f.* FROM findings f {where} "
+               f"ORDER BY f.severity_rank DESC, f.file, f.line_start LIMIT ?")
+        return [dict(row) for row in self.db.execute(sql, params + [limit])]
+
+    def runs(self):
+        """Every indexed run with its finding count"""
+        return [dict(row) for row in self.db.execute(
+            "SELECT r.*, COUNT(f.id) AS findings FROM runs r "
+            "LEFT JOIN findings f ON f.run_id = r.run_id GROUP BY r.run_id ORDER BY r.rowid")]
+
+    def previous_run(self, run_id):
+        """Run indexed just before run_id, or None"""
+        row = self.db.execute(
+            "SELECT run_id FROM runs WHERE rowid < (SELECT rowid FROM runs WHERE run_id = ?) "
+            "ORDER BY rowid DESC LIMIT 1", (run_id,)).fetchone()
+        return row['run_id'] if row else None
+
+    def run_files(self, run_id):
+        """Files a run reviewed (for runs indexed before these were recorded: the files it has findings in)"""
+        rows = self.db.execute("SELECT file FROM run_files WHERE run_id = ?", (run_id,)).fetchall()
+        if not rows:
+            rows = self.db.execute("SELECT DISTINCT file FROM findings WHERE run_id = ?", (run_id,)).fetchall()
+        return {row['file'] for row in rows}
+
+    def close(self):
+        self.db.close()
+
+def reviewed_files(results):
+    """Names of the files GrokCodeReviewer.results holds analyses for, as findings record them"""
+    return {file_results['filename'] for file_results in results.values() if 'analyses' in file_results}
+
+def findings_from_results(results, chunk_code=None):
+    """Parse GrokCodeReviewer.results (UnitResults, their dicts or raw API responses) into findings"""
+    findings = []
+    for filepath, file_results in results.items():
+        if 'analyses' not in file_results:
+            continue
+        filename = file_results['filename']
+        offsets = file_results.get('chunk_lines')
+        for analysis_type, chunks in file_results['analyses'].items():
+            if offsets is None and chunk_code is not None and len(chunks) > 1:
+                try:
+                    with open(filepath, encoding='utf-8') as f:
+                        offsets = chunk_line_offsets(chunk_code(f.read(), filename=filepath))
+                except OSError:
+                    offsets = None
+            for i, chunk_result in enumerate(chunks):
+                content = result_content(chunk_result)
+                if content is None:
+                    continue
+                start = offsets[i] if offsets and i < len(offsets) else 1
+                for finding in parse_findings(content, filename, analysis_type, start - 1):
+                    # Keyed by the reviewed file, not whatever name the model wrote
+                    finding['file'] = filename
+                    findings.append(finding)
+    return findings
+
+def run_query(args):
+    """Entry point for `mqtools findings query`"""
+    index = FindingsIndex(args.db)
+    started = time.perf_counter()
+    rows = index.query(args.file, args.category, args.min_severity, args.run, args.text, args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    index.close()
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    for row in rows:
+        lines = ''
+        if row['line_start']:
+            lines = f":{row['line_start']}"
+            if row['line_end'] and row['line_end'] != row['line_start']:
+                lines += f"-{row['line_end']}"
+        print(f"[{row['severity'].upper():<8}] {row['file']}{lines}  {row['category']}  "
+              f"({row['run_id']})")
+        print(f"           {row['rule'][:100]}")
+    print(f"\n{len(rows)} finding(s) in {elapsed:.1f} ms")
+
+def run_import(args, chunk_code=None):
+    """Entry point for `mqtools findings import`"""
+    with open(args.raw_results) as f:
+        results = json.load(f)
+    run_id = args.run_id or time.strftime('%Y%m%d-%H%M%S')
+    index = FindingsIndex(args.db)
+    count = index.add_run(run_id, args.model, findings_from_results(results, chunk_code), args.raw_results,
+                          reviewed_files(results))
+    index.close()
+    print(f"✓ Indexed {count} finding(s) from {args.raw_results} as run {run_id}")
+
+def run_runs(args):
+    """Entry point for `mqtools findings runs`"""
+    index = FindingsIndex(args.db)
+    for run in index.runs():
+        print(f"{run['run_id']:<20} {run['created_at']}  {run['findings']:>5} findings  "
+              f"{run['model'] or ''}  {run['source'] or ''}")
+    index.close()
+
+def run_consolidate(args):
+    """Entry point for `mqtools findings consolidate`"""
+    from mqtools.dedupe import consolidate_findings, render_consolidated
+
+    index = FindingsIndex(args.db)
+    runs = index.runs()
+    run_id = args.run or (runs[-1]['run_id'] if runs else None)
+    rows = index.query(run_id=run_id, limit=-1) if run_id else []
+    index.close()
+    if not rows:
+        print("No findings indexed")
+        return
+    started = time.perf_counter()
+    consolidated = consolidate_findings(rows, args.threshold)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(render_consolidated(consolidated, len(rows)))
+    print(f"({len(rows)} -> {len(consolidated)} in {elapsed:.0f} ms, run {run_id})")
@@ -0,0 +1,120 @@
+"""
+Rolling latency model keyed by prompt size and max_tokens
+
+Latencies are kept per (prompt tokens, max_tokens) bucket - powers of two
+of each - in a bounded window, so percentiles follow the endpoint's recent
+behaviour and a 40-line chunk is not compared with a 2,000-line one. The
+model derives per-request connect/read/total deadlines and is saved
+between runs so every run starts with what the previous ones learned.
+"""
+
+import json
+import os
+import threading
+from collections import defaultdict, deque
+
+WINDOW = 200          # samples kept per bucket
+MIN_SAMPLES = 20      # below this a bucket borrows from wider buckets
+
+# Deadline derivation
+TIMEOUT_PERCENTILE = 0.99
+TIMEOUT_HEADROOM = 1.5      # multiplier on the p99 latency
+TIMEOUT_MARGIN = 5.0        # seconds added on top
+MIN_READ_TIMEOUT = 10.0
+MAX_READ_TIMEOUT = 600.0
+MIN_CONNECT_TIMEOUT = 3.0
+MAX_CONNECT_TIMEOUT = 10.0
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+def payload_tokens(payload):
+    """Estimated prompt tokens of a chat completion payload"""
+    return sum(estimate_tokens(m.get('content') or '') for m in payload.get('messages', []))
+
+def size_bucket(tokens):
+    """Power-of-two bucket for a token count"""
+    return max(0, int(tokens or 0).bit_length() - 1)
+
+def percentile(values, q):
+    """q-th percentile (0-1) by nearest rank"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+class LatencyTracker:
+    """Recent call latencies per (prompt size, max_tokens) bucket"""
+
+    def __init__(self, window=WINDOW, min_samples=MIN_SAMPLES, path=None):
+        self.window = window
+        self.min_samples = min_samples
+        self.path = path
+        self.samples = defaultdict(lambda: deque(maxlen=self.window))
+        self.lock = threading.Lock()
+        if path:
+            self.load(path)
+
+    def record(self, prompt_tokens, seconds, max_tokens=None):
+        with self.lock:
+            self.samples[(size_bucket(prompt_tokens), size_bucket(max_tokens))].append(seconds)
+
+    def _samples_for(self, prompt_tokens, max_tokens=None):
+        """Exact bucket, else same prompt size, else everything"""
+        prompt_bucket = size_bucket(prompt_tokens)
+        with self.lock:
+            exact = list(self.samples.get((prompt_bucket, size_bucket(max_tokens)), ()))
+            if len(exact) >= self.min_samples:
+                return exact
+            same_prompt = [s for (p, _), samples in self.samples.items() if p == prompt_bucket for s in samples]
+            if len(same_prompt) >= self.min_samples:
+                return same_prompt
+            return [s for samples in self.samples.values() for s in samples]
+
+    def percentile(self, prompt_tokens, q, max_tokens=None):
+        """Latency percentile for this request shape, or None if unknown"""
+        samples = self._samples_for(prompt_tokens, max_tokens)
+        if len(samples) < self.min_samples:
+            return None
+        return percentile(samples, q)
+
+    def timeouts(self, prompt_tokens, max_tokens=None, default=60):
+        """(connect, read, total) deadlines in seconds for one request"""
+        samples = self._samples_for(prompt_tokens, max_tokens)
+        if len(samples) < self.min_samples:
+            read = float(default)
+            connect = MAX_CONNECT_TIMEOUT
+        else:
+            read = percentile(samples, TIMEOUT_PERCENTILE) * TIMEOUT_HEADROOM + TIMEOUT_MARGIN
+            read = min(MAX_READ_TIMEOUT, max(MIN_READ_TIMEOUT, read))
+            # The fastest full answer bounds how long connecting can take
+            connect = min(MAX_CONNECT_TIMEOUT, max(MIN_CONNECT_TIMEOUT, 2 * min(samples)))
+        return round(connect, 1), round(read, 1), round(connect + read, 1)
+
+    def record_timeout(self, prompt_tokens, read_timeout, max_tokens=None):
+        """A call hit its deadline: widen the bucket so the next one waits longer"""
+        self.record(prompt_tokens, read_timeout * 2, max_tokens)
+
+    def load(self, path):
+        """Restore samples saved by a previous run"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for key, samples in data.get('buckets', {}).items():
+                prompt_bucket, max_bucket = (int(part) for part in key.split(':'))
+                self.samples[(prompt_bucket, max_bucket)].extend(samples)
+
+    def save(self, path=None):
+        """Persist samples for the next run"""
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.lock:
+            data = {"buckets": {f"{p}:{m}": list(samples) for (p, m), samples in self.samples.items()}}
+        with open(path, 'w') as f:
+            json.dump(data, f)
@@ -0,0 +1,190 @@
+"""
+Local mock of the Grok chat completions endpoint
+
+Answers POST /v1/chat/completions with a canned review after a simulated
+delay: log-normal around a median that grows with prompt size, plus a
+configurable share of slow tail calls. Requests with "stream": true get
+server-sent events: the first token after that delay, then max_tokens
+tokens at a per-token pace that slows once more streams are open than the
+mock's capacity (first-token delays stretch the same way). Prompts are
+prefix-cached in blocks like the real API, and usage reports
+prompt_tokens_details.cached_tokens. Point the tools at it with
+GROK_API_ENDPOINT=http://127.0.0.1:8765/v1/chat/completions and any
+GROK_API_KEY.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MOCK_REVIEW = """### 1. SQL Injection (High)
+Line 3: user input is concatenated into the query.
+```php
+$wpdb->get_row("SELECT * FROM t WHERE Email = '".$Email."'");
+```
+Use $wpdb->prepare().
+"""
+
+CACHE_BLOCK_CHARS = 1024   # ~256 tokens per cached prefix block
+
+PACKED_FILE_RE = re.compile(r'^\s*=== FILE: (.+?) ===$', re.M)
+
+def mock_review(body):
+    """Canned review; one section per file for packed requests"""
+    prompt = body.get('messages', [{}])[-1].get('content') or ''
+    names = PACKED_FILE_RE.findall(prompt)
+    if not names:
+        return MOCK_REVIEW
+    return "\n".join(f"=== FILE: {name} ===\n{MOCK_REVIEW}" for name in names)
+
+class MockSettings:
+    """Latency profile of the mock server"""
+
+    def __init__(self, median=0.2, sigma=0.3, per_1k_tokens=0.05, tail_rate=0.05, tail_factor=8.0,
+                 error_rate=0.0, seed=None, token_seconds=0.002, capacity=8):
+        self.median = median
+        self.sigma = sigma
+        self.per_1k_tokens = per_1k_tokens
+        self.tail_rate = tail_rate
+        self.tail_factor = tail_factor
+        self.error_rate = error_rate
+        self.token_seconds = token_seconds
+        self.capacity = capacity
+        self.active = 0  # requests being answered right now
+        self.prefix_cache = set()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self, prompt_tokens):
+        """Seconds to wait before answering"""
+        with self.lock:
+            base = self.median + self.per_1k_tokens * prompt_tokens / 1000
+            delay = base * self.random.lognormvariate(0, self.sigma) * self.load()
+            if self.random.random() < self.tail_rate:
+                delay *= self.tail_factor
+            failed = self.random.random() < self.error_rate
+        return delay, failed
+
+    def cached_tokens(self, body):
+        """Tokens of the prompt's longest already-seen block prefix; caches the rest"""
+        text = "\n".join(f"{m.get('role')}:{m.get('content') or ''}" for m in body.get('messages', []))
+        digest = hashlib.sha256()
+        cached, hit = 0, True
+        with self.lock:
+            for start in range(0, len(text) - CACHE_BLOCK_CHARS + 1, CACHE_BLOCK_CHARS):
+                digest.update(text[start:start + CACHE_BLOCK_CHARS].encode('utf-8'))
+                key = digest.hexdigest()
+                if hit and key in self.prefix_cache:
+                    cached += CACHE_BLOCK_CHARS // 4
+                else:
+                    hit = False
+                    self.prefix_cache.add(key)
+        return cached
+
+    def load(self):
+        """Slowdown factor once more requests are open than capacity (lock held)"""
+        return max(1.0, self.active / self.capacity)
+
+    def token_delay(self):
+        """Seconds per streamed token at the current load"""
+        with self.lock:
+            return self.token_seconds * self.load()
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        settings = self.server.settings
+        with settings.lock:
+            settings.active += 1
+        try:
+            self.answer()
+        finally:
+            with settings.lock:
+                settings.active -= 1
+
+    def answer(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        prompt_tokens = sum(len(m.get('content') or '') // 4 for m in body.get('messages', []))
+        delay, failed = self.server.settings.delay(prompt_tokens)
+        time.sleep(delay)
+
+        if failed:
+            self.send_json(503, {"error": {"message": "mock: service unavailable"}})
+            return
+        if body.get('stream'):
+            self.stream_completion(body, prompt_tokens)
+            return
+        completion_tokens = min(body.get('max_tokens', 4000), len(MOCK_REVIEW) // 4)
+        cached_tokens = self.server.settings.cached_tokens(body)
+        self.send_json(200, {
+            "id": f"mock-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get('model', 'mock'),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": mock_review(body)}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens,
+                      "prompt_tokens_details": {"cached_tokens": cached_tokens}}
+        })
+
+    def stream_completion(self, body, prompt_tokens):
+        """Answer as OpenAI-style server-sent events, one token per event"""
+        settings = self.server.settings
+        words = MOCK_REVIEW.split(' ')
+        completion_tokens = body.get('max_tokens', 4000)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def event(data):
+            self.wfile.write(f"data: {json.dumps(data)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        for i in range(completion_tokens):
+            if i:
+                time.sleep(settings.token_delay())
+            event({"object": "chat.completion.chunk", "model": body.get('model', 'mock'),
+                   "choices": [{"index": 0, "delta": {"content": words[i % len(words)] + ' '}}]})
+        event({"object": "chat.completion.chunk", "choices": [],
+               "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}})
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def send_json(self, status, data):
+        payload = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def start_mock_server(settings=None, host='127.0.0.1', port=0):
+    """Start the mock in a background thread; returns (server, endpoint URL)"""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.settings = settings or MockSettings()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/v1/chat/completions"
+
+def run_mock_server(args):
+    """Entry point for `mqtools mock-server`"""
+    settings = MockSettings(args.median, args.sigma, tail_rate=args.tail_rate,
+                            tail_factor=args.tail_factor, error_rate=args.error_rate)
+    server, endpoint = start_mock_server(settings, port=args.port)
+    print(f"Mock Grok endpoint: {endpoint}")
+    print(f"export GROK_API_ENDPOINT={endpoint} GROK_API_KEY=mock")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,129 @@
+"""
+Output length model for max_tokens
+
+Completion lengths of earlier calls are kept per (analysis type, input
+size bucket) and saved in the tools cache. max_tokens for a new unit is
+the bucket's p95 plus headroom, so a 40-line chunk no longer gets room for
+a 4,000 token essay. Until a bucket has history, a per-type allowance that
+grows with the input is used.
+
+Answers end with STOP_SEQUENCE, which the prompt asks for. Only models
+known to accept a `stop` parameter are also sent it (xAI rejects `stop`
+for reasoning models such as grok-4); for the others the answer is cut at
+the sentinel on our side. An answer cut off by
+max_tokens is asked for again with double the room, and the cut-off
+length is recorded so the bucket grows.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import defaultdict, deque
+
+from mqtools.latency import percentile, size_bucket
+
+DEFAULT_MAX_TOKENS = 4000
+MIN_MAX_TOKENS = 512
+HEADROOM = 1.3
+WINDOW = 100
+MIN_SAMPLES = 5
+WORDS_PER_TOKEN = 0.75
+
+STOP_SEQUENCE = "=== END OF REVIEW ==="
+STOP_INSTRUCTION = f'When every finding has been listed, write "{STOP_SEQUENCE}" on its own line and stop.'
+# Non-reasoning models that take a stop parameter
+STOP_MODELS_RE = re.compile(r'^grok-(?:2|3)(?!-mini)\b|non-reasoning')
+
+# (base tokens, tokens per input token) before a bucket has history
+FALLBACK = {
+    "security": (600, 0.5),
+    "code_quality": (600, 0.5),
+    "architecture": (800, 0.4),
+    "comprehensive": (800, 0.6),
+}
+
+class OutputModel:
+    """Recent completion lengths per (analysis type, input size bucket)"""
+
+    def __init__(self, path=None, window=WINDOW, min_samples=MIN_SAMPLES, cap=DEFAULT_MAX_TOKENS):
+        self.path = path
+        self.min_samples = min_samples
+        self.cap = cap
+        self.samples = defaultdict(lambda: deque(maxlen=window))
+        self.lock = threading.Lock()
+        if path:
+            self.load(path)
+
+    def record(self, analysis_type, input_tokens, completion_tokens):
+        with self.lock:
+            self.samples[f"{analysis_type}:{size_bucket(input_tokens)}"].append(completion_tokens)
+
+    def max_tokens(self, analysis_type, input_tokens):
+        """max_tokens for one unit"""
+        with self.lock:
+            history = list(self.samples.get(f"{analysis_type}:{size_bucket(input_tokens)}", ()))
+        if len(history) >= self.min_samples:
+            budget = percentile(history, 0.95) * HEADROOM
+        else:
+            base, per_input = FALLBACK.get(analysis_type, (self.cap, 0))
+            budget = base + per_input * input_tokens
+        return int(min(self.cap, max(MIN_MAX_TOKENS, budget)))
+
+    def guidance(self, max_tokens):
+        """Response length hint matching max_tokens"""
+        words = max(100, int(max_tokens * WORDS_PER_TOKEN * 0.8) // 50 * 50)
+        return (f"Keep the answer under about {words} words: concrete findings only, "
+                f"no restated code or general advice.")
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self.lock:
+            for key, samples in data.get('buckets', {}).items():
+                self.samples[key].extend(samples)
+
+    def save(self, path=None):
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self.lock:
+            data = {"buckets": {key: list(samples) for key, samples in self.samples.items()}}
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+def accepts_stop(model_name):
+    """Whether the API takes a stop parameter for this model"""
+    return bool(STOP_MODELS_RE.search(model_name or ''))
+
+def stop_parameters(model_name):
+    """{"stop": [STOP_SEQUENCE]} for models that accept it, else nothing"""
+    return {"stop": [STOP_SEQUENCE]} if accepts_stop(model_name) else {}
+
+def cut_at_stop(result):
+    """Drop STOP_SEQUENCE and anything after it from each answer"""
+    for choice in result.get('choices') or []:
+        message = choice.get('message') or {}
+        content = message.get('content')
+        if isinstance(content, str) and STOP_SEQUENCE in content:
+            message['content'] = content[:content.index(STOP_SEQUENCE)].rstrip()
+    return result
+
+def complete_sized(client, payload, model, analysis_type, input_tokens):
+    """Send payload with its max_tokens; retry once with more room if the answer was cut off"""
+    result = cut_at_stop(client.complete(payload))
+    choices = result.get('choices') or [{}]
+    if choices[0].get('finish_reason') == 'length' and payload['max_tokens'] < model.cap:
+        print(f"  Answer cut off at {payload['max_tokens']} tokens, asking again with more room")
+        payload = dict(payload, max_tokens=min(model.cap, payload['max_tokens'] * 2))
+        retried = cut_at_stop(client.complete(payload))
+        if 'error' not in retried:
+            result = retried
+    usage = result.get('usage') or {}
+    if usage.get('completion_tokens'):
+        model.record(analysis_type, input_tokens, usage['completion_tokens'])
+    return result
@@ -0,0 +1,77 @@
+"""
+Packing small files into shared review requests
+
+Every review request pays for the same system prompt and instructions.
+Files below SMALL_FILE_TOKENS are grouped first-fit-decreasing into bins
+of up to PACK_TOKEN_BUDGET tokens and sent as one request, each file
+between FILE/END FILE delimiter lines. The model is asked to answer in one
+section per file, which split_packed_response() maps back to the files.
+"""
+
+import json
+import re
+
+from mqtools.findings import parse_structured_findings
+from mqtools.latency import estimate_tokens
+
+SMALL_FILE_TOKENS = 1500
+PACK_TOKEN_BUDGET = 4000    # code per request, about two regular 8,000 character chunks
+
+FILE_MARKER = "=== FILE: {name} ==="
+END_MARKER = "=== END FILE: {name} ==="
+SECTION_RE = re.compile(r'^[#*\s]*=== FILE: (.+?) ===[*\s]*$', re.M)
+
+PACKED_NOTE = """This request contains several small files, each between "=== FILE: <name> ===" and
+        "=== END FILE: <name> ===" lines. Review each file separately. Start the part of your answer
+        about each file with its own "=== FILE: <name> ===" line, and give line numbers relative to
+        the start of that file.
+
+        """
+
+def is_small(code):
+    return estimate_tokens(code) <= SMALL_FILE_TOKENS
+
+def pack_files(files, budget=PACK_TOKEN_BUDGET):
+    """Group (name, code) pairs into bins of at most budget tokens, largest first"""
+    bins = []
+    for name, code in sorted(files, key=lambda item: estimate_tokens(item[1]), reverse=True):
+        tokens = estimate_tokens(code) + estimate_tokens(FILE_MARKER.format(name=name) * 2)
+        for packed in bins:
+            if packed['tokens'] + tokens <= budget:
+                packed['files'].append((name, code))
+                packed['tokens'] += tokens
+                break
+        else:
+            bins.append({"files": [(name, code)], "tokens": tokens})
+    return [packed['files'] for packed in bins]
+
+def render_packed(files):
+    """Code of several files with delimiter lines around each"""
+    return "\n".join(f"{FILE_MARKER.format(name=name)}\n{code}\n{END_MARKER.format(name=name)}"
+                     for name, code in files)
+
+def split_packed_response(content, names, analysis_type):
+    """Per-file parts of a packed answer, or None if it cannot be split
+
+    Uses the per-file sections when the model wrote them, otherwise a JSON
+    findings block whose entries name their files.
+    """
+    sections = list(SECTION_RE.finditer(content))
+    if sections:
+        parts = {name: "" for name in names}
+        for i, section in enumerate(sections):
+            name = section.group(1).strip()
+            if name not in parts:
+                continue
+            end = sections[i + 1].start() if i + 1 < len(sections) else len(content)
+            parts[name] += content[section.end():end].strip() + "\n"
+        return parts
+
+    structured = parse_structured_findings(content, None, analysis_type)
+    if structured and all(finding['file'] in names for finding in structured):
+        parts = {}
+        for name in names:
+            own = [finding for finding in structured if finding['file'] == name]
+            parts[name] = "```json\n" + json.dumps({"findings": own}, indent=2) + "\n```\n"
+        return parts
+    return None
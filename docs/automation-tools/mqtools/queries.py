@@ -0,0 +1,523 @@
+"""
+Local $wpdb query extraction and N+1 detection
+
+Every $wpdb->query/get_results/get_row/get_var/get_col call (and the
+insert/update/delete/replace helpers) is found with the taint engine's
+PHP tokenizer. Its SQL is rendered as a template: string literals are
+kept, $table_prefix/$wpdb->prefix become {prefix}, TABLE_* constants stay
+as {TABLE_*}, a variable is replaced by the value it was last assigned
+(and appended to) before the call, and any other expression becomes ?.
+The write helpers become "UPDATE {prefix}{TABLE_X} WHERE Col = ?", with
+the keys of their WHERE array.
+
+Each call is placed in the for/foreach/while/do loops around it, with the
+loop header and, for counted for loops, the number of iterations. A query
+inside a loop is a hotspot:
+
+- n+1: the query uses a value that changes per iteration, or the loop
+  walks the rows of another query
+- invariant: the same query is sent every iteration and can be hoisted
+- write: one insert/update/delete per iteration instead of a batch
+
+Calls inside loops to plugin functions that run queries (directly or
+through other plugin functions) are hotspots too, reported with the
+call chain.
+"""
+
+import bisect
+import glob
+import os
+import re
+
+from mqtools.symbols import EXCLUDE_RE, SOURCES
+from mqtools.taint import ASSIGN_OPS, INTERPOLATION_RE, closing, parse_units, split_top
+
+READ_METHODS = {'query', 'get_results', 'get_row', 'get_var', 'get_col'}
+WRITE_METHODS = {'insert', 'update', 'delete', 'replace'}
+LOOP_WORDS = {'for', 'foreach', 'while', 'do'}
+LOOP_ENDS = {'for': 'endfor', 'foreach': 'endforeach', 'while': 'endwhile'}
+PREFIX_VARS = {'$table_prefix', '$prefix', '$wp_prefix'}
+CONSTANT_RE = re.compile(r'^[A-Z][A-Z0-9_]*$')
+PLACEHOLDER_RE = re.compile(r'%[dsfi]|\?(?:\s*\?)+')
+PROPERTY_RE = re.compile(r'\{\$(\w+)->(\w+)\}|\$(\w+)->(\w+)')
+WHERE_ARGUMENT = {'update': 2, 'delete': 1}  # position of the array of WHERE columns
+MAX_RESOLVE_DEPTH = 3       # variables followed through this many assignments
+
+def line_index(text):
+    """offset -> 1-based line number"""
+    newlines = [i for i, ch in enumerate(text) if ch == '\n']
+    return lambda offset: bisect.bisect_right(newlines, offset - 1) + 1
+
+def statement_end(tokens, i):
+    """Index of the ; ending the statement that starts at tokens[i] (or of a block it opens)"""
+    while i < len(tokens):
+        value = tokens[i][1]
+        if value in ('(', '['):
+            i = closing(tokens, i)
+        elif value == '{':
+            return closing(tokens, i)
+        elif value == ';':
+            return i
+        i += 1
+    return len(tokens) - 1
+
+def find_loops(tokens):
+    """Loops as dicts: kind, header (token range inside the parentheses) and body (token range)"""
+    loops = []
+    do_conditions = set()   # the while of a do ... while is not a loop of its own
+    for i, (kind, value, offset) in enumerate(tokens):
+        value = value.lower() if kind == 'name' else None
+        if value not in LOOP_WORDS or i in do_conditions:
+            continue
+        if i and tokens[i - 1][1] in ('->', '::', 'function'):
+            continue
+        if value == 'do':
+            if i + 1 < len(tokens) and tokens[i + 1][1] == '{':
+                end = closing(tokens, i + 1)
+                header = (end + 3, closing(tokens, end + 2)) if end + 2 < len(tokens) else (end, end)
+                do_conditions.add(end + 1)
+                loops.append({"kind": "do", "offset": offset, "header": header, "body": (i + 2, end)})
+            continue
+        if i + 1 >= len(tokens) or tokens[i + 1][1] != '(':
+            continue
+        header_end = closing(tokens, i + 1)
+        start = header_end + 1
+        if start >= len(tokens):
+            continue
+        if tokens[start][1] == '{':
+            body = (start + 1, closing(tokens, start))
+        elif tokens[start][1] == ':':
+            # Alternative syntax: for (...): ... endfor;
+            depth, j = 0, start + 1
+            while j < len(tokens):
+                word = tokens[j][1].lower() if tokens[j][0] == 'name' else None
+                if word == value and j + 1 < len(tokens) and tokens[j + 1][1] == '(':
+                    depth += 1
+                elif word == LOOP_ENDS[value]:
+                    if depth == 0:
+                        break
+                    depth -= 1
+                j += 1
+            body = (start + 1, j)
+        else:
+            body = (start, statement_end(tokens, start) + 1)
+        loops.append({"kind": value, "offset": offset, "header": (i + 2, header_end), "body": body})
+    return loops
+
+def assignments(tokens):
+    """var -> [(index, operator, value tokens)] for every assignment statement"""
+    found = {}
+    for i in range(len(tokens) - 1):
+        if tokens[i][0] == 'var' and tokens[i + 1][0] == 'op' and tokens[i + 1][1] in ASSIGN_OPS:
+            if i and tokens[i - 1][1] in ('->', '::'):
+                continue
+            end = i + 2
+            while end < len(tokens) and tokens[end][1] not in (';', ')', ']', '}'):
+                if tokens[end][1] in ('(', '[', '{'):
+                    end = closing(tokens, end)
+                end += 1
+            found.setdefault(tokens[i][1], []).append((i, tokens[i + 1][1], tokens[i + 2:end]))
+    return found
+
+def assigned_value(assigned, var, before):
+    """Tokens of var's last plain assignment before index `before`, with later .= appends"""
+    entries = [entry for entry in assigned.get(var, []) if entry[0] < before]
+    start = max((n for n, entry in enumerate(entries) if entry[1] == '='), default=None)
+    if start is None:
+        return None
+    value = list(entries[start][2])
+    for _, operator, tokens in entries[start + 1:]:
+        if operator == '.=':
+            value += [('op', '.', tokens[0][2] if tokens else 0)] + list(tokens)
+    return value
+
+def skip_access(tokens, i):
+    """Index of the last token of the variable at tokens[i] with its [index] and ->property parts"""
+    while i + 1 < len(tokens):
+        if tokens[i + 1][1] == '[':
+            i = closing(tokens, i + 1)
+        elif tokens[i + 1][1] == '->' and i + 2 < len(tokens) and tokens[i + 2][0] == 'name' \
+                and not (i + 3 < len(tokens) and tokens[i + 3][1] == '('):
+            i += 2
+        else:
+            return i
+    return i
+
+def interpolated(match):
+    return '{prefix}' if '$' + match.group(1) in PREFIX_VARS else '?'
+
+def interpolate(string):
+    """Template of the inside of a double-quoted string or heredoc"""
+    string = PROPERTY_RE.sub(lambda match: '{prefix}' if match.group(2) == 'prefix' or match.group(4) == 'prefix'
+                             else '?', string)
+    return INTERPOLATION_RE.sub(interpolated, string)
+
+def render(tokens, assigned=None, before=0, depth=0):
+    """SQL template of an expression: literals kept, constants as {NAME}, anything else as ?"""
+    assigned = assigned or {}
+    parts = []
+    i = 0
+    while i < len(tokens):
+        kind, value, _ = tokens[i]
+        following = tokens[i + 1][1] if i + 1 < len(tokens) else None
+        if kind == 'sq':
+            parts.append(value[1:-1].replace("\\'", "'"))
+        elif kind == 'dq':
+            parts.append(interpolate(value[1:-1]).replace('\\"', '"'))
+        elif kind == 'heredoc':
+            parts.append(interpolate(value.split('\n', 1)[-1].rsplit('\n', 1)[0]))
+        elif kind == 'var' and value in PREFIX_VARS:
+            parts.append('{prefix}')
+        elif kind == 'var' and following == '->' and i + 2 < len(tokens) and tokens[i + 2][1] == 'prefix':
+            parts.append('{prefix}')
+            i += 2
+        elif kind == 'var' and following == '->' and i + 3 < len(tokens) and tokens[i + 2][1] == 'prepare' \
+                and tokens[i + 3][1] == '(':
+            end = closing(tokens, i + 3)
+            first = split_top(tokens[i + 4:end], {','})
+            parts.append(PLACEHOLDER_RE.sub('?', render(first[0], assigned, before, depth)) if first else '?')
+            i = end
+        elif kind == 'var':
+            end = skip_access(tokens, i)
+            value_tokens = assigned_value(assigned, value, before) if end == i and depth < MAX_RESOLVE_DEPTH else None
+            parts.append(render(value_tokens, assigned, before, depth + 1) if value_tokens else '?')
+            i = end
+        elif kind == 'name' and CONSTANT_RE.match(value) and following != '(':
+            parts.append('{' + value + '}')
+        elif kind == 'name' and following == '(':
+            parts.append('?')
+            i = closing(tokens, i + 1)
+        elif kind == 'op' and value in ('(', '['):
+            parts.append('?')
+            i = closing(tokens, i)
+        elif not (kind == 'op' and value == '.'):
+            parts.append('?')
+        i += 1
+    return re.sub(r'\?(?:\s*\?)+', '?', ''.join(parts))
+
+def array_keys(tokens, assigned=None, before=0):
+    """String keys of an array(...) or [...] literal, or of the one a variable was assigned"""
+    if len(tokens) == 1 and tokens[0][0] == 'var':
+        tokens = assigned_value(assigned or {}, tokens[0][1], before) or []
+    if tokens and tokens[0][0] == 'name' and tokens[0][1].lower() == 'array':
+        tokens = tokens[1:]
+    if not tokens or tokens[0][1] not in ('(', '['):
+        return []
+    end = closing(tokens, 0)
+    return [part[0][1][1:-1] for part in split_top(tokens[1:end], {','})
+            if len(part) > 1 and part[0][0] in ('sq', 'dq') and part[1][1] == '=>']
+
+def normalize_template(template):
+    """Template on one line with runs of whitespace collapsed"""
+    return re.sub(r'\s+', ' ', template).strip()
+
+def used_vars(tokens, assigned, before, depth=0):
+    """Variables an expression depends on, through the assignments it resolves to"""
+    found = set()
+    for kind, value, _ in tokens:
+        if kind == 'var':
+            found.add(value)
+            value_tokens = assigned_value(assigned, value, before) if depth < MAX_RESOLVE_DEPTH else None
+            if value_tokens:
+                found |= used_vars(value_tokens, assigned, before, depth + 1)
+        elif kind in ('dq', 'heredoc'):
+            found |= {'$' + match.group(1) for match in INTERPOLATION_RE.finditer(value)}
+    return found
+
+def iterations(loop, tokens):
+    """Iteration count of for ($i = A; $i < B; ...) with literal bounds, else None"""
+    if loop['kind'] != 'for':
+        return None
+    parts = split_top(tokens[loop['header'][0]:loop['header'][1]], {';'})
+    if len(parts) != 3 or len(parts[0]) != 3 or len(parts[1]) != 3:
+        return None
+    (var, assign, start), (left, compare, bound) = parts[0], parts[1]
+    if var[0] != 'var' or assign[1] != '=' or left[1] != var[1] or start[0] != 'num' or bound[0] != 'num':
+        return None
+    first, last = float(start[1]), float(bound[1])
+    count = {'<': last - first, '<=': last - first + 1, '>': first - last, '>=': first - last + 1}.get(compare[1])
+    return int(count) if count is not None and count > 0 else None
+
+def loop_vars(loop, tokens):
+    """Variables that change from one iteration of loop to the next"""
+    changed = set()
+    start, end = loop['header']
+    header = tokens[start:end]
+    if loop['kind'] == 'foreach':
+        words = [token[1].lower() for token in header]
+        if 'as' in words:
+            changed |= {token[1] for token in header[words.index('as'):] if token[0] == 'var'}
+    elif loop['kind'] == 'for':
+        changed |= {token[1] for token in header if token[0] == 'var'}
+    body = tokens[loop['body'][0]:loop['body'][1]]
+    for i, token in enumerate(body[:-1]):
+        following = body[i + 1][1]
+        if token[0] == 'var' and (following in ASSIGN_OPS or following in ('+', '-') and i + 2 < len(body)
+                                  and body[i + 2][1] == following or following == '['):
+            changed.add(token[1])
+        elif token[0] == 'name' and token[1].lower() == 'list':
+            changed |= {t[1] for t in body[i:closing(body, i + 1) + 1] if t[0] == 'var'} if following == '(' else set()
+    return changed
+
+class QueryIndex:
+    """$wpdb calls and loops of every plugin file, and the functions that run queries"""
+
+    def __init__(self, root, sources=SOURCES):
+        self.root = root
+        self.units = {}         # key -> unit
+        self.files = {}         # relative path -> unit keys
+        self.functions = {}     # lower name -> key
+        self.methods = {}       # lower name -> [keys]
+        self.querying = None    # key -> (callee chain, first query), worked out on demand
+        for pattern in sources:
+            for path in sorted(glob.glob(os.path.join(root, pattern), recursive=True)):
+                relative = os.path.relpath(path, root)
+                if EXCLUDE_RE.search(relative):
+                    continue
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    self.add_file(relative.replace(os.sep, '/'), f.read())
+
+    def add_file(self, name, text):
+        """Index (or replace) the queries, calls and loops of one file"""
+        for key in self.files.pop(name, []):
+            self.units.pop(key, None)
+        self.querying = None
+        line_of = line_index(text)
+        units, main, _ = parse_units(text)
+        keys = []
+        for unit in units:
+            key = f"{name}::{unit['class'] + '::' if unit['class'] else ''}{unit['name']}"
+            self.units[key] = self.scan(unit['tokens'], text, line_of, name, unit['name'], unit['class'])
+            keys.append(key)
+            if unit['class']:
+                self.methods.setdefault(unit['name'].lower(), []).append(key)
+            else:
+                self.functions[unit['name'].lower()] = key
+        key = f"{name}::<main>"
+        self.units[key] = self.scan(main, text, line_of, name, '<main>', None)
+        keys.append(key)
+        self.files[name] = keys
+
+    def scan(self, tokens, text, line_of, filename, function, owner):
+        """Queries and plugin calls of one function body (or top-level code), each with its loops"""
+        loops = find_loops(tokens)
+        assigned = assignments(tokens)
+        for loop in loops:
+            start, end = loop['header']
+            loop['line'] = line_of(loop['offset'])
+            header_text = text[tokens[start - 1][2]:tokens[end][2] + 1] if end < len(tokens) else ''
+            loop['text'] = f"{loop['kind']} {normalize_template(header_text)}".strip()
+            loop['iterations'] = iterations(loop, tokens)
+            loop['changes'] = loop_vars(loop, tokens)
+            loop['rows_of'] = None
+            if loop['kind'] == 'foreach':
+                source = tokens[start:end]
+                if source and source[0][0] == 'var':
+                    value = assigned_value(assigned, source[0][1], start) or []
+                    call = next((j for j in range(len(value) - 3) if value[j][1] == '$wpdb'
+                                 and value[j + 2][1] in READ_METHODS and value[j + 3][1] == '('), None)
+                    if call is not None:
+                        arguments = split_top(value[call + 4:closing(value, call + 3)], {','})
+                        loop['rows_of'] = normalize_template(render(arguments[0], assigned, start)) \
+                            if arguments else '?'
+
+        def around(i):
+            return [loop for loop in loops if loop['body'][0] <= i < loop['body'][1]]
+
+        queries, calls = [], []
+        for i, (kind, value, offset) in enumerate(tokens):
+            following = tokens[i + 1][1] if i + 1 < len(tokens) else None
+            is_wpdb = (kind == 'var' and value == '$wpdb') or (kind == 'name' and value == 'wpdb' and i
+                                                               and tokens[i - 1][1] == '->')
+            if is_wpdb and following == '->' and i + 3 < len(tokens) and tokens[i + 3][1] == '(':
+                method = tokens[i + 2][1]
+                if method not in READ_METHODS | WRITE_METHODS:
+                    continue
+                end = closing(tokens, i + 3)
+                arguments = split_top(tokens[i + 4:end], {','})
+                if method in WRITE_METHODS:
+                    template = f"{method.upper()} {render(arguments[0], assigned, i) if arguments else '?'}"
+                    position = WHERE_ARGUMENT.get(method)
+                    keys = array_keys(arguments[position], assigned, i) if position and len(arguments) > position \
+                        else []
+                    if keys:
+                        template += " WHERE " + " AND ".join(f"{key} = ?" for key in keys)
+                else:
+                    template = render(arguments[0], assigned, i) if arguments else '?'
+                uses = used_vars(tokens[i + 4:end], assigned, i)
+                queries.append({"line": line_of(offset), "method": method,
+                                "kind": "write" if method in WRITE_METHODS else "read",
+                                "template": normalize_template(template), "uses": uses, "loops": around(i)})
+            elif kind == 'name' and following == '(' and (not i or tokens[i - 1][1] not in ('function', 'new')):
+                receiver = tokens[i - 2][1] if i >= 2 and tokens[i - 1][1] in ('->', '::') else None
+                if receiver is not None and receiver not in ('$this', 'self', 'static', 'parent'):
+                    continue
+                loops_here = around(i)
+                if not loops_here:
+                    calls.append({"name": value.lower(), "method": receiver is not None, "line": line_of(offset),
+                                  "uses": set(), "loops": []})
+                    continue
+                end = closing(tokens, i + 1)
+                calls.append({"name": value.lower(), "method": receiver is not None, "line": line_of(offset),
+                              "uses": used_vars(tokens[i + 2:end], assigned, i), "loops": loops_here})
+        return {"file": filename, "function": function, "class": owner, "queries": queries, "calls": calls}
+
+    def callees(self, call, caller):
+        """Keys of the plugin functions or methods a call may reach"""
+        if call['method']:
+            keys = self.methods.get(call['name'], [])
+            same_class = [key for key in keys if self.units[key]['class'] == caller['class']]
+            return same_class or keys
+        key = self.functions.get(call['name'])
+        return [key] if key else []
+
+    def resolve(self):
+        """key -> (chain of function names, first query) for every unit that runs a query"""
+        querying = {key: ([], unit['queries'][0]) for key, unit in self.units.items() if unit['queries']}
+        changed = True
+        while changed:
+            changed = False
+            for key, unit in self.units.items():
+                if key in querying:
+                    continue
+                for call in unit['calls']:
+                    reached = next((callee for callee in self.callees(call, unit) if callee in querying), None)
+                    if reached:
+                        chain, query = querying[reached]
+                        querying[key] = ([self.units[reached]['function']] + chain, query)
+                        changed = True
+                        break
+        self.querying = querying
+        return querying
+
+    def queries(self, files=None):
+        """Every extracted query of the given files (default: all), in file order"""
+        records = []
+        for name in (files if files is not None else list(self.files)):
+            for key in self.files.get(name, []):
+                unit = self.units[key]
+                for query in unit['queries']:
+                    records.append({"file": name, "line": query['line'], "function": unit['function'],
+                                    "method": query['method'], "kind": query['kind'],
+                                    "template": query['template'], "in_loop": bool(query['loops'])})
+        return sorted(records, key=lambda record: (record['file'], record['line']))
+
+    def hotspots(self, files=None):
+        """Queries (and calls of querying functions) that run once per loop iteration"""
+        querying = self.querying if self.querying is not None else self.resolve()
+        records = []
+        for name in (files if files is not None else list(self.files)):
+            for key in self.files.get(name, []):
+                unit = self.units[key]
+                for query in unit['queries']:
+                    if query['loops']:
+                        records.append(self.hotspot(name, unit, query, query, []))
+                for call in unit['calls']:
+                    if not call['loops']:
+                        continue
+                    reached = next((callee for callee in self.callees(call, unit) if callee in querying), None)
+                    if reached:
+                        chain, query = querying[reached]
+                        records.append(self.hotspot(name, unit, call, query, [self.units[reached]['function']] + chain))
+        return sorted(records, key=lambda record: (record['file'], record['line']))
+
+    def hotspot(self, name, unit, site, query, via):
+        """Record of one query (or call) inside loops"""
+        loops = site['loops']
+        variant = any(site['uses'] & loop['changes'] for loop in loops)
+        total = 1
+        for loop in loops:
+            total = total * loop['iterations'] if total and loop['iterations'] else None
+        return {
+            "file": name, "line": site['line'], "function": unit['function'], "method": query['method'],
+            "kind": query['kind'], "template": query['template'], "via": via,
+            "pattern": "write" if query['kind'] == 'write' else "n+1" if variant else "invariant",
+            "loops": [{"kind": loop['kind'], "line": loop['line'], "header": loop['text'],
+                       "iterations": loop['iterations'], "rows_of": loop['rows_of']} for loop in loops],
+            "queries_per_run": total,
+        }
+
+def describe(record):
+    """One-line description of a hotspot"""
+    where = "top-level code" if record['function'] == '<main>' else f"{record['function']}()"
+    loops = ' > '.join(f"{loop['header'][:60]} (line {loop['line']}"
+                       + (f", {loop['iterations']} iterations" if loop['iterations'] else "")
+                       + (f", rows of {loop['rows_of'][:60]}" if loop['rows_of'] else "") + ")"
+                       for loop in record['loops'])
+    via = f" via {' -> '.join(name + '()' for name in record['via'])}" if record['via'] else ""
+    return f"$wpdb->{record['method']}(){via} in {where} runs inside {loops}"
+
+def query_findings(records, filename):
+    """Findings for the hotspots of one file"""
+    from mqtools.findings import make_finding
+
+    findings = []
+    for record in records:
+        if record['pattern'] == 'n+1':
+            rule = "Query per loop iteration (N+1)"
+            advice = ("Fetch all rows in one query before the loop (WHERE ... IN (...) or a JOIN/GROUP BY) "
+                      "and look them up by key inside it.")
+            severity = "high" if len(record['loops']) > 1 or any(loop['rows_of'] for loop in record['loops']) \
+                else "medium"
+        elif record['pattern'] == 'write':
+            rule = "One write per loop iteration"
+            advice = ("Batch the rows into one multi-row INSERT, or at least run the loop in a single "
+                      "transaction (START TRANSACTION ... COMMIT).")
+            severity = "low"
+        else:
+            rule = "Loop-invariant query inside a loop"
+            advice = "The query does not depend on the loop; run it once before the loop."
+            severity = "medium"
+        findings.append(make_finding(filename, f"{describe(record)}: {record['template']}. {advice}",
+                                     "queries", record['line'], category="performance", severity=severity,
+                                     rule=rule, snippet=record['template']))
+    return findings
+
+def query_note(records, filename=None):
+    """Prompt section with the queries found to run inside loops, so the model does not repeat them"""
+    if not records:
+        return ""
+    where = f" of {filename}" if filename else ""
+    return (f"Static analysis{where} already found these $wpdb queries running once per loop iteration;\n"
+            f"        they are reported separately, do not repeat them: "
+            + "; ".join(f"line {record['line']} ({record['pattern']})" for record in records[:30]) + ".\n\n        ")
+
+def load_query_index(root=None):
+    """Query index over the plugin"""
+    from mqtools.config import PLUGIN_DIR
+    return QueryIndex(root or PLUGIN_DIR)
+
+def run_queries(args):
+    """Entry point for `mqtools queries`"""
+    import json
+    import time
+
+    started = time.perf_counter()
+    index = load_query_index(args.root)
+    files = None
+    if args.files:
+        files = []
+        for path in args.files:
+            name = os.path.relpath(os.path.abspath(path), os.path.abspath(index.root)).replace(os.sep, '/')
+            with open(path, encoding='utf-8', errors='replace') as f:
+                index.add_file(name, f.read())
+            files.append(name)
+    records = index.queries(files) if args.all else index.hotspots(files)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    if args.json:
+        print(json.dumps(records, indent=2))
+        return
+    if args.all:
+        for record in records:
+            print(f"{record['file']}:{record['line']} {record['method']}{' [loop]' if record['in_loop'] else ''}: "
+                  f"{record['template'][:160]}")
+        print(f"✓ {len(records)} queries in {len(index.files)} files ({elapsed:.0f} ms)")
+        return
+    for record in records:
+        print(f"{record['pattern']:<10} {record['file']}:{record['line']} {describe(record)}")
+        print(f"           {record['template'][:160]}")
+    counts = {pattern: sum(record['pattern'] == pattern for record in records)
+              for pattern in ('n+1', 'invariant', 'write')}
+    print(f"✓ {len(records)} queries inside loops: {counts['n+1']} N+1, {counts['invariant']} loop-invariant, "
+          f"{counts['write']} per-row writes ({len(index.files)} files, {elapsed:.0f} ms)")
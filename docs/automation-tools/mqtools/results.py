@@ -0,0 +1,110 @@
+"""
+Compact per-unit review results
+
+A full chat completion body (id, created, model, choices, usage, ...) is
+several times the size of the answer it carries, and a review keeps one
+per chunk and pass. UnitResult keeps only the answer, token usage, timing
+and status in __slots__; the body itself is appended to a JSONL log and
+read back with raw() only when it is needed.
+
+grok-analysis-raw-results.json holds the compact form (to_dict). Older
+files with full response bodies still load through from_dict().
+"""
+
+import json
+import os
+
+RAW_LOG = 'grok-analysis-raw-log.jsonl'
+
+class UnitResult:
+    """Answer, usage, timing and status of one review request"""
+
+    __slots__ = ('content', 'error', 'finish_reason', 'prompt_tokens', 'completion_tokens',
+                 'cached_tokens', 'seconds', 'circuit_open', 'packed', 'log', 'raw_offset')
+
+    def __init__(self, content=None, error=None, finish_reason=None, prompt_tokens=0, completion_tokens=0,
+                 cached_tokens=0, seconds=0.0, circuit_open=False, packed=False, log=None, raw_offset=None):
+        self.content = content
+        self.error = error
+        self.finish_reason = finish_reason
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.cached_tokens = cached_tokens
+        self.seconds = seconds
+        self.circuit_open = circuit_open
+        self.packed = packed
+        self.log = log
+        self.raw_offset = raw_offset
+
+    @property
+    def ok(self):
+        return self.error is None and self.content is not None
+
+    @classmethod
+    def from_response(cls, response, seconds=0.0, log=None, raw_offset=None):
+        """Compact result of a GrokClient.complete() answer"""
+        if 'error' in response:
+            return cls(error=str(response['error']), circuit_open=bool(response.get('circuit_open')),
+                       seconds=seconds, log=log, raw_offset=raw_offset)
+        choice = (response.get('choices') or [{}])[0]
+        usage = response.get('usage') or {}
+        content = (choice.get('message') or {}).get('content')
+        return cls(content=content, error=None if content is not None else "response without content",
+                   finish_reason=choice.get('finish_reason'), prompt_tokens=usage.get('prompt_tokens') or 0,
+                   completion_tokens=usage.get('completion_tokens') or 0,
+                   cached_tokens=(usage.get('prompt_tokens_details') or {}).get('cached_tokens') or 0,
+                   seconds=seconds, log=log, raw_offset=raw_offset)
+
+    @classmethod
+    def from_dict(cls, data, log=None):
+        """Result saved by to_dict(), or a full response body from older raw results"""
+        if 'choices' in data:
+            return cls.from_response(data, log=log)
+        fields = {key: data[key] for key in cls.__slots__ if key in data and key != 'log'}
+        return cls(log=log, **fields)
+
+    def to_dict(self):
+        """Fields that differ from their defaults (offset 0 is a real offset)"""
+        values = ((key, getattr(self, key)) for key in self.__slots__ if key != 'log')
+        return {key: value for key, value in values if value is not None and (value or key == 'raw_offset')}
+
+    def raw(self):
+        """Full response body from the JSONL log, or None"""
+        if self.log is None or self.raw_offset is None:
+            return None
+        return self.log.read(self.raw_offset)
+
+class ResultLog:
+    """Append-only JSONL log of full response bodies"""
+
+    def __init__(self, path=RAW_LOG, append=False):
+        self.path = path
+        if not append and os.path.exists(path):
+            os.remove(path)
+
+    def record(self, response, seconds, label=''):
+        """Log response and return its compact UnitResult"""
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(json.dumps({"unit": label, "response": response}).encode('utf-8') + b'\n')
+        return UnitResult.from_response(response, seconds, self, offset)
+
+    def read(self, offset):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())['response']
+
+def result_content(chunk_result):
+    """Answer text of a UnitResult or a raw response dict, or None"""
+    if isinstance(chunk_result, UnitResult):
+        return chunk_result.content if chunk_result.error is None else None
+    if chunk_result and 'choices' in chunk_result:
+        return chunk_result['choices'][0]['message']['content']
+    return chunk_result.get('content') if chunk_result and not chunk_result.get('error') else None
+
+def load_results(data, log=None):
+    """Reviewer results from JSON, with every unit as a UnitResult"""
+    for file_results in data.values():
+        for analysis_type, chunks in file_results.get('analyses', {}).items():
+            file_results['analyses'][analysis_type] = [UnitResult.from_dict(chunk, log) for chunk in chunks]
+    return data
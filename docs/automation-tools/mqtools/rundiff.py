@@ -0,0 +1,107 @@
+"""
+Cross-run finding diff
+
+Findings from two runs are matched by a stable fingerprint of file,
+category and the normalised code snippet (or, without a snippet, the
+normalised rule text). Line numbers are deliberately left out so a
+finding still matches after code above it moves. Only the files the newer
+run reviewed are compared: a file it did not look at has not had its
+findings resolved.
+"""
+
+import hashlib
+import re
+
+from mqtools.dedupe import consolidate_findings, format_location, render_group
+
+WHITESPACE_RE = re.compile(r'\s+')
+NUMBER_RE = re.compile(r'\d+')
+COMMENT_RE = re.compile(r'//[^\n]*|#[^\n]*|/\*.*?\*/', re.S)
+
+def normalize_snippet(snippet):
+    """Code with comments and whitespace differences removed"""
+    snippet = COMMENT_RE.sub(' ', snippet or '')
+    return WHITESPACE_RE.sub(' ', snippet).strip().lower()
+
+def normalize_rule(rule):
+    """Rule text without numbering, line numbers and punctuation"""
+    rule = NUMBER_RE.sub(' ', (rule or '').lower())
+    return WHITESPACE_RE.sub(' ', re.sub(r'[^a-z$_>() ]', ' ', rule)).strip()
+
+def fingerprint(finding):
+    """Line-independent identity of a finding"""
+    anchor = normalize_snippet(finding.get('snippet')) or normalize_rule(finding.get('rule'))
+    key = f"{finding['file']}\0{finding['category']}\0{anchor}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def diff_findings(old_findings, new_findings, files=None):
+    """Split findings into new, resolved and persisting sets, over files only when given"""
+    if files is not None:
+        old_findings = [f for f in old_findings if f['file'] in files]
+        new_findings = [f for f in new_findings if f['file'] in files]
+    old = {}
+    for finding in old_findings:
+        old.setdefault(fingerprint(finding), finding)
+    new = {}
+    for finding in new_findings:
+        new.setdefault(fingerprint(finding), finding)
+
+    persisting = []
+    for fp in new.keys() & old.keys():
+        finding = dict(new[fp])
+        finding['previous_line_start'] = old[fp].get('line_start')
+        persisting.append(finding)
+
+    return {
+        "new": [new[fp] for fp in new.keys() - old.keys()],
+        "resolved": [old[fp] for fp in old.keys() - new.keys()],
+        "persisting": persisting
+    }
+
+def render_delta(delta, old_run, new_run, files=None):
+    """Markdown section with only what changed between two runs"""
+    report = f"## Changes Since Run {old_run}\n\n"
+    if files is not None:
+        report += f"Compared over {len(files)} file(s): {', '.join(sorted(files))}\n\n"
+    report += (f"**New:** {len(delta['new'])}  **Resolved:** {len(delta['resolved'])}  "
+               f"**Persisting:** {len(delta['persisting'])}\n\n")
+
+    if delta['new']:
+        report += "### New Findings\n\n"
+        report += render_group(consolidate_findings(delta['new']))
+
+    if delta['resolved']:
+        report += "### Resolved Findings\n\n"
+        for finding in sorted(delta['resolved'], key=lambda f: (f['file'], f['line_start'] or 0)):
+            title = finding['rule'] or finding['description'].split('\n')[0][:80]
+            report += f"- ~~[{finding['severity'].upper()}] {title}~~ ({format_location(finding)})\n"
+        report += "\n"
+
+    if delta['persisting']:
+        report += "### Persisting Findings\n\n"
+        for finding in sorted(delta['persisting'], key=lambda f: (f['file'], f['line_start'] or 0)):
+            title = finding['rule'] or finding['description'].split('\n')[0][:80]
+            moved = ''
+            if finding['previous_line_start'] and finding['previous_line_start'] != finding['line_start']:
+                moved = f" (was line {finding['previous_line_start']})"
+            report += f"- [{finding['severity'].upper()}] {title} ({format_location(finding)}){moved}\n"
+        report += "\n"
+
+    return report
+
+def run_diff(args):
+    """Entry point for `mqtools findings diff`"""
+    from mqtools.findings import FindingsIndex
+
+    index = FindingsIndex(args.db)
+    run_ids = [run['run_id'] for run in index.runs()]
+    new_run = args.new or (run_ids[-1] if run_ids else None)
+    old_run = args.old or index.previous_run(new_run)
+    if not old_run or not new_run:
+        print("Need two indexed runs to diff")
+        index.close()
+        return
+    files = set(args.files) if args.files else index.run_files(new_run)
+    delta = diff_findings(index.query(run_id=old_run, limit=-1), index.query(run_id=new_run, limit=-1), files)
+    index.close()
+    print(render_delta(delta, old_run, new_run, files))
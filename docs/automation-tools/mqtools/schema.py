@@ -0,0 +1,623 @@
+"""
+Schema and index advisor
+
+Table definitions are read from the CREATE TABLE strings the plugin passes
+to dbDelta() (rendered with the query extractor, so "CREATE TABLE
+".$table_prefix.TABLE_MQ_TAKEN." (" becomes mq_taken), plus any ALTER
+TABLE ... ADD INDEX and CREATE INDEX statements. Every query template of
+`mqtools queries --all` is then parsed for its tables and aliases, WHERE
+and JOIN ... ON predicates, ORDER BY and GROUP BY columns.
+
+Reported:
+
+- non-sargable predicates: a column wrapped in a function, LIKE '%...',
+  a text column compared with a bare number, and dates kept in text
+  columns in a format that does not sort (Date_Taken holds date('d-M-y'),
+  so the plugin loads every row and compares strtotime() values in PHP)
+- existing indexes on columns the table does not have
+- missing indexes: per query, the equality and join columns of each table
+  followed by one range, ORDER BY or GROUP BY column, unless an existing
+  index already starts with the first of them; candidates that are a
+  prefix of another are merged into it
+
+Recommendations are checked on an in-memory SQLite copy of the tables
+filled with synthetic rows: each read query that uses a recommended index
+is timed, and its EXPLAIN QUERY PLAN taken, before and after the indexes
+are created. SQLite's automatic indexes are turned off so that, like
+MySQL, it scans without them. Timings show the shape of the gain, not
+what a production MySQL server will measure.
+"""
+
+import glob
+import os
+import random
+import re
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from mqtools.queries import QueryIndex, assignments, line_index, render
+from mqtools.symbols import EXCLUDE_RE, SOURCES
+from mqtools.taint import parse_units
+
+CONSTANT_DEFINITION_RE = re.compile(r'''\bconst\s+([A-Z][A-Z0-9_]*)\s*=\s*['"]([^'"]*)['"]'''
+                                    r'''|\bdefine\(\s*['"]([A-Z][A-Z0-9_]*)['"]\s*,\s*['"]([^'"]*)['"]''')
+CREATE_TABLE_RE = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?([`{}\w]+)\s*\((.*)\)', re.I | re.S)
+ADD_INDEX_RE = re.compile(r'ALTER\s+TABLE\s+([`{}\w]+)\s+ADD\s+(UNIQUE\s+)?(?:INDEX|KEY)\s+`?(\w+)`?\s*\(([^)]*)\)',
+                          re.I)
+CREATE_INDEX_RE = re.compile(r'CREATE\s+(UNIQUE\s+)?INDEX\s+`?(\w+)`?\s+ON\s+([`{}\w]+)\s*\(([^)]*)\)', re.I)
+COLUMN_DEFINITION_RE = re.compile(r'^`?(\w+)`?\s+(\w+)\s*(?:\(([^)]*)\))?', re.S)
+KEY_DEFINITION_RE = re.compile(r'^(PRIMARY\s+KEY|UNIQUE(?:\s+KEY|\s+INDEX)?|(?:FULLTEXT\s+)?(?:KEY|INDEX))'
+                               r'\s*(?:`?(\w+)`?)?\s*\(([^)]*)\)', re.I)
+TABLE_REF_RE = re.compile(r'\b(FROM|JOIN|UPDATE|INTO)\s+([`{}\w]+)(?:\s+(?:AS\s+)?(?!(?:WHERE|LEFT|RIGHT|INNER|OUTER|'
+                          r'CROSS|JOIN|ON|ORDER|GROUP|LIMIT|SET|HAVING|VALUES|USING)\b)(\w+))?', re.I)
+CLAUSE_RE = re.compile(r'\b(WHERE|ON|ORDER\s+BY|GROUP\s+BY|HAVING|LIMIT|LEFT|RIGHT|INNER|OUTER|CROSS|JOIN|UNION|SET'
+                       r'|VALUES)\b', re.I)
+COLUMN = r'(?:`?(\w+)`?\.)?`?([A-Za-z_]\w*)`?'
+OPERATOR = r'(=|<=>|!=|<>|>=|<=|<|>|\bNOT\s+IN\b|\bIN\b|\bNOT\s+LIKE\b|\bLIKE\b|\bBETWEEN\b|\bIS\b)'
+PREDICATE_RE = re.compile(rf'^{COLUMN}\s*{OPERATOR}\s*(.*)$', re.I | re.S)
+FUNCTION_PREDICATE_RE = re.compile(rf'^(\w+)\s*\(\s*{COLUMN}\s*(?:,[^)]*)?\)\s*{OPERATOR}', re.I | re.S)
+COLUMN_VALUE_RE = re.compile(rf'^{COLUMN}$')
+DATE_WRITE_RE = re.compile(r'''['"](\w+)['"]\s*=>\s*(?:date|gmdate)\(\s*['"]([^'"]+)['"]''')
+PHP_DATE_FILTER_RE = re.compile(r'strtotime\(\s*\$\w+(?:->(\w+)|\[\s*[\'"](\w+)[\'"]\s*\])\s*\)\s*[<>]=?')
+
+SQL_KEYWORDS = {'and', 'or', 'not', 'null', 'true', 'false', 'select', 'from', 'where', 'as', 'on', 'asc', 'desc'}
+EQUALITY_OPS = {'=', '<=>', 'in', 'is'}
+RANGE_OPS = {'<', '>', '<=', '>=', 'between', 'like'}
+INTEGER_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint'}
+NUMBER_TYPES = INTEGER_TYPES | {'decimal', 'numeric', 'float', 'double', 'real', 'bit'}
+TEXT_TYPES = {'char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext', 'set', 'enum'}
+DATE_TYPES = {'date', 'datetime', 'timestamp', 'time', 'year'}
+DATE_NAME_RE = re.compile(r'date|time|_at$|_on$', re.I)
+SORTABLE_DATE_RE = re.compile(r'^Y\W?m\W?d(?:\W?H(?:\W?i(?:\W?s)?)?)?$')
+
+DEFAULT_ROWS = 20000        # synthetic rows per table in the validation database
+LOW_CARDINALITY_SIZE = 20   # varchar(n) up to this size gets a handful of distinct values
+IN_LIST_SIZE = 10           # values substituted for IN (?)
+TIMING_BUDGET = 0.2         # seconds spent timing each query, before and after
+MAX_TIMING_RUNS = 200
+MIN_SPEEDUP = 2.0           # a recommendation no validated query gains this much from is marked "no gain"
+SEED = 49
+
+PHP_DATE_PARTS = {
+    'd': lambda day: f"{day.day:02d}", 'j': lambda day: str(day.day), 'D': lambda day: day.strftime('%a'),
+    'l': lambda day: day.strftime('%A'), 'm': lambda day: f"{day.month:02d}", 'n': lambda day: str(day.month),
+    'M': lambda day: day.strftime('%b'), 'F': lambda day: day.strftime('%B'), 'y': lambda day: f"{day.year % 100:02d}",
+    'Y': lambda day: str(day.year), 'H': lambda day: "12", 'G': lambda day: "12", 'i': lambda day: "00",
+    's': lambda day: "00", 'A': lambda day: "PM", 'a': lambda day: "pm",
+}
+
+def php_date(format, day):
+    """date(format) of PHP for a day (times are fixed at noon)"""
+    return ''.join(PHP_DATE_PARTS[ch](day) if ch in PHP_DATE_PARTS else ch for ch in format)
+
+def split_top_level(text):
+    """Comma-separated parts of text outside parentheses and quotes"""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in '\'"`':
+            quote = ch
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+def key_columns(text):
+    """Column names of an index definition, without backticks and prefix lengths"""
+    return [re.sub(r'\(\d+\)', '', part).strip('` ').split()[0] for part in split_top_level(text)]
+
+class Schema:
+    """Tables and indexes defined by the plugin, keyed by table name without the prefix"""
+
+    def __init__(self, root, sources=SOURCES):
+        self.root = root
+        self.constants = {}     # TABLE_MQ_TAKEN -> mq_taken
+        self.tables = {}        # name -> table
+        self.texts = {}         # relative path -> source
+        for pattern in sources:
+            for path in sorted(glob.glob(os.path.join(root, pattern), recursive=True)):
+                relative = os.path.relpath(path, root)
+                if EXCLUDE_RE.search(relative):
+                    continue
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    self.texts[relative.replace(os.sep, '/')] = f.read()
+        for text in self.texts.values():
+            for match in CONSTANT_DEFINITION_RE.finditer(text):
+                name, value = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+                self.constants.setdefault(name, value)
+        for name, text in self.texts.items():
+            self.add_statements(name, text)
+
+    def table_name(self, reference):
+        """Table name of a rendered reference like {prefix}{TABLE_MQ_TAKEN}, or None if it is not known"""
+        reference = reference.replace('{prefix}', '').strip('`')
+        reference = re.sub(r'\{(\w+)\}', lambda match: self.constants.get(match.group(1), match.group(1).lower()),
+                           reference)
+        return reference if reference and re.match(r'^\w+$', reference) else None
+
+    def add_statements(self, filename, text):
+        """CREATE TABLE and index statements assigned to variables in one file"""
+        line_of = line_index(text)
+        units, main, _ = parse_units(text)
+        for tokens in [unit['tokens'] for unit in units] + [main]:
+            assigned = assignments(tokens)
+            for entries in assigned.values():
+                for index, operator, value in entries:
+                    if operator != '=' or not any(kind in ('sq', 'dq', 'heredoc') and 'CREATE' in literal.upper()
+                                                  for kind, literal, _ in value):
+                        continue
+                    self.add_sql(render(value, assigned, index), filename, line_of(tokens[index][2]))
+
+    def add_sql(self, sql, filename, line):
+        """Record the table or indexes one DDL statement defines"""
+        match = CREATE_TABLE_RE.search(sql)
+        if match:
+            name = self.table_name(match.group(1))
+            if name:
+                self.add_table(name, match.group(2), filename, line)
+            return
+        for match in ADD_INDEX_RE.finditer(sql):
+            self.add_index(match.group(1), match.group(3), key_columns(match.group(4)), bool(match.group(2)),
+                           filename, line)
+        for match in CREATE_INDEX_RE.finditer(sql):
+            self.add_index(match.group(3), match.group(2), key_columns(match.group(4)), bool(match.group(1)),
+                           filename, line)
+
+    def add_table(self, name, body, filename, line):
+        table = self.tables.setdefault(name, {"name": name, "file": filename, "line": line, "columns": {},
+                                              "indexes": []})
+        for part in split_top_level(body):
+            key = KEY_DEFINITION_RE.match(part)
+            if key:
+                kind = key.group(1).upper()
+                if not any(index['columns'] == key_columns(key.group(3)) for index in table['indexes']):
+                    table['indexes'].append({"name": 'PRIMARY' if kind.startswith('PRIMARY') else key.group(2),
+                                             "columns": key_columns(key.group(3)),
+                                             "primary": kind.startswith('PRIMARY'),
+                                             "unique": kind.startswith(('PRIMARY', 'UNIQUE')),
+                                             "file": filename, "line": line})
+                continue
+            column = COLUMN_DEFINITION_RE.match(part)
+            if column and column.group(1).upper() not in ('CONSTRAINT', 'FOREIGN', 'CHECK'):
+                table['columns'].setdefault(column.group(1), {
+                    "type": column.group(2).lower(), "size": column.group(3),
+                    "auto_increment": 'AUTO_INCREMENT' in part.upper()})
+
+    def add_index(self, reference, name, columns, unique, filename, line):
+        table = self.tables.get(self.table_name(reference))
+        if table is not None and not any(index['columns'] == columns for index in table['indexes']):
+            table['indexes'].append({"name": name, "columns": columns, "primary": False, "unique": unique,
+                                     "file": filename, "line": line})
+
+    def add_queries(self, records):
+        """Index statements sent with $wpdb->query() rather than assigned first"""
+        for record in records:
+            if re.match(r'\s*(ALTER|CREATE)\b', record['template'], re.I):
+                self.add_sql(record['template'], record['file'], record['line'])
+
+    def column(self, table, name):
+        """Column name as defined (MySQL column names are case-insensitive), or None"""
+        columns = self.tables[table]['columns'] if table in self.tables else {}
+        return next((column for column in columns if column.lower() == name.lower()), None)
+
+    def primary_key(self, table):
+        return next((index['columns'] for index in self.tables[table]['indexes'] if index['primary']), [])
+
+    def indexed(self, table, column):
+        """Whether an index of table starts with column"""
+        return any(index['columns'] and index['columns'][0].lower() == column.lower()
+                   for index in self.tables[table]['indexes'])
+
+def clauses(sql):
+    """[(keyword, text)] of the WHERE, ON, ORDER BY and GROUP BY clauses of a query"""
+    found = []
+    marks = list(CLAUSE_RE.finditer(sql))
+    for n, mark in enumerate(marks):
+        keyword = re.sub(r'\s+', ' ', mark.group(1).upper())
+        if keyword in ('WHERE', 'ON', 'ORDER BY', 'GROUP BY'):
+            end = marks[n + 1].start() if n + 1 < len(marks) else len(sql)
+            found.append((keyword, sql[mark.end():end].strip()))
+    return found
+
+def parse_query(template, schema):
+    """Tables, predicates and sort columns of a query template; columns resolved to (table, column)"""
+    aliases = {}
+    for match in TABLE_REF_RE.finditer(template):
+        name = schema.table_name(match.group(2))
+        if name in schema.tables:
+            aliases[(match.group(3) or name).lower()] = name
+            aliases.setdefault(name.lower(), name)
+    tables = list(dict.fromkeys(aliases.values()))
+
+    def resolve(alias, name):
+        if alias:
+            table = aliases.get(alias.lower())
+            return (table, schema.column(table, name)) if table and schema.column(table, name) else None
+        owners = [table for table in tables if schema.column(table, name)]
+        return (owners[0], schema.column(owners[0], name)) if len(owners) == 1 else None
+
+    parsed = {"tables": tables, "first": tables[0] if tables else None, "predicates": [], "joins": [],
+              "sorts": [], "functions": []}
+    for keyword, text in clauses(template):
+        if keyword in ('ORDER BY', 'GROUP BY'):
+            for part in split_top_level(text):
+                match = COLUMN_VALUE_RE.match(part.split()[0]) if part.split() else None
+                resolved = resolve(match.group(1), match.group(2)) if match else None
+                if resolved:
+                    parsed['sorts'].append((keyword, resolved))
+            continue
+        for part in re.split(r'\s+(?:AND|OR)\s+', text, flags=re.I):
+            part = part.strip().lstrip('(').strip()
+            function = FUNCTION_PREDICATE_RE.match(part)
+            if function and function.group(1).lower() not in SQL_KEYWORDS:
+                resolved = resolve(function.group(2), function.group(3))
+                if resolved:
+                    parsed['functions'].append((function.group(1).upper(), resolved))
+                continue
+            match = PREDICATE_RE.match(part)
+            if not match or match.group(2).lower() in SQL_KEYWORDS:
+                continue
+            resolved = resolve(match.group(1), match.group(2))
+            if not resolved:
+                continue
+            operator = re.sub(r'\s+', ' ', match.group(3).lower())
+            value = match.group(4).strip().rstrip(')').strip()
+            other = COLUMN_VALUE_RE.match(value)
+            other = resolve(other.group(1), other.group(2)) if other and not value.startswith(("'", '"')) \
+                and other.group(2).lower() not in SQL_KEYWORDS and not other.group(2).isdigit() else None
+            if other and operator == '=':
+                parsed['joins'].append((resolved, other))
+            else:
+                parsed['predicates'].append({"column": resolved, "operator": operator, "value": value,
+                                             "clause": keyword})
+    return parsed
+
+def date_formats(schema):
+    """column -> (PHP date() format, file, line) of the first array key written with date(...)"""
+    formats = {}
+    for name, text in schema.texts.items():
+        line_of = line_index(text)
+        for match in DATE_WRITE_RE.finditer(text):
+            formats.setdefault(match.group(1).lower(), (match.group(2), name, line_of(match.start())))
+    return formats
+
+def php_date_filters(schema):
+    """column -> [(file, line)] where rows are compared on strtotime($row->column) in PHP"""
+    filters = {}
+    for name, text in schema.texts.items():
+        line_of = line_index(text)
+        for match in PHP_DATE_FILTER_RE.finditer(text):
+            start = text.rfind('\n', 0, match.start()) + 1
+            if text[start:match.start()].lstrip().startswith(('//', '#', '*')):
+                continue
+            filters.setdefault((match.group(1) or match.group(2)).lower(), []).append((name, line_of(match.start())))
+    return filters
+
+def where(record):
+    return f"{record['file']}:{record['line']}"
+
+def find_issues(schema, records):
+    """Non-sargable predicates, text-typed dates and indexes on columns that do not exist"""
+    issues = []
+    formats = date_formats(schema)
+    filters = php_date_filters(schema)
+    date_uses = {}
+    for record, parsed in records:
+        for function, (table, column) in parsed['functions']:
+            issues.append({"kind": "function", "table": table, "column": column, "at": [where(record)],
+                           "detail": f"{function}({column}) in a predicate hides {column} from every index; "
+                                     f"compare the bare column with a computed value instead"})
+        for predicate in parsed['predicates']:
+            table, column = predicate['column']
+            info = schema.tables[table]['columns'][column]
+            if predicate['operator'] == 'like' and predicate['value'].lstrip('\'"').startswith('%'):
+                issues.append({"kind": "leading-wildcard", "table": table, "column": column, "at": [where(record)],
+                               "detail": f"{column} LIKE '%...' cannot use an index; use a FULLTEXT index or "
+                                         f"a prefix match"})
+            elif info['type'] in TEXT_TYPES and re.match(r'^(?:\?|-?\d+(?:\.\d+)?)$', predicate['value']):
+                issues.append({"kind": "implicit-cast", "table": table, "column": column, "at": [where(record)],
+                               "detail": f"text column {column} is compared with an unquoted value; a number "
+                                         f"makes MySQL convert every row, so the index is not used"})
+        for table, column in [predicate['column'] for predicate in parsed['predicates']] \
+                + [sort[1] for sort in parsed['sorts']]:
+            date_uses.setdefault((table, column), []).append(where(record))
+
+    for table in schema.tables.values():
+        for column, info in table['columns'].items():
+            written = formats.get(column.lower())
+            if info['type'] not in TEXT_TYPES or not (written or DATE_NAME_RE.search(column)):
+                continue
+            if written and SORTABLE_DATE_RE.match(written[0]):
+                continue
+            if written:
+                sample = php_date(written[0], date.today())
+                detail = (f"{column} is {info['type']}({info['size']}) and holds date('{written[0]}') strings "
+                          f"like '{sample}' ({written[1]}:{written[2]}); they do not sort or compare in date "
+                          f"order, so a date range cannot be a WHERE clause or use an index")
+            else:
+                detail = (f"{column} looks like a date but is {info['type']}({info['size']}); date ranges on "
+                          f"it compare strings")
+            in_php = filters.get(column.lower(), [])
+            if in_php:
+                detail += (f". The plugin instead loads every row and compares strtotime() values in PHP ("
+                           + ', '.join(f"{file}:{line}" for file, line in in_php[:6])
+                           + (", ..." if len(in_php) > 6 else "") + ")")
+            detail += f". Store it as a DATE (or DATETIME) column and index it"
+            issues.append({"kind": "text-date", "table": table['name'], "column": column,
+                           "at": date_uses.get((table['name'], column), []), "detail": detail})
+        for index in table['indexes']:
+            missing = [column for column in index['columns'] if not schema.column(table['name'], column)]
+            if missing:
+                issues.append({"kind": "unknown-column", "table": table['name'], "column": ', '.join(missing),
+                               "at": [f"{index['file']}:{index['line']}"],
+                               "detail": f"index {index['name']} is on {', '.join(missing)}, which "
+                                         f"{table['name']} does not have: the ALTER TABLE fails"})
+    return issues
+
+def candidates(schema, parsed):
+    """table -> (candidate index columns, how many of them are equality columns) for one parsed query"""
+    found = {}
+    for table in parsed['tables']:
+        equal = [column for (owner, column) in
+                 [predicate['column'] for predicate in parsed['predicates']
+                  if predicate['operator'] in EQUALITY_OPS and predicate['value'].lower() != 'null']
+                 if owner == table]
+        if table != parsed['first']:
+            for left, right in parsed['joins']:
+                equal += [column for owner, column in (left, right) if owner == table]
+        ranges = [predicate['column'][1] for predicate in parsed['predicates']
+                  if predicate['column'][0] == table and predicate['operator'] in RANGE_OPS
+                  and not predicate['value'].lstrip('\'"').startswith('%')]
+        sorts = [column for _, (owner, column) in parsed['sorts'] if owner == table] \
+            if table == parsed['first'] else []
+        columns = list(dict.fromkeys(equal))
+        equalities = len(columns)
+        last = ranges[:1] or sorts[:1]
+        # InnoDB secondary indexes end with the primary key already
+        if last and last[0] not in columns and (not columns or last[0] not in schema.primary_key(table)):
+            columns += last
+        if columns and not schema.indexed(table, columns[0]):
+            found[table] = (columns, equalities)
+    return found
+
+def recommend(schema, records):
+    """Index recommendations, each with the queries it serves"""
+    wanted = {}     # (table, columns) -> [equality column count, records]
+    for record, parsed in records:
+        for table, (columns, equalities) in candidates(schema, parsed).items():
+            wanted.setdefault((table, tuple(columns)), [equalities, []])[1].append(record)
+    # A candidate folds into a wider one it is a prefix of, or whose equality columns it only
+    # uses: those can go first in any order
+    for key in sorted(wanted, key=lambda key: len(key[1])):
+        if key not in wanted:
+            continue
+        table, columns = key
+        wider = next((other for other in sorted(wanted, key=lambda other: -len(other[1]))
+                      if other != key and other[0] == table
+                      and (other[1][:len(columns)] == columns or set(columns) <= set(other[1][:wanted[other][0]]))),
+                     None)
+        if wider:
+            served = wanted.pop(key)[1]
+            equalities, wider_served = wanted.pop(wider)
+            merged = (table, columns + tuple(column for column in wider[1] if column not in columns))
+            wanted[merged] = [equalities, wider_served + served]
+    recommendations = []
+    for (table, columns), (_, served) in wanted.items():
+        name = 'idx_' + '_'.join(column.lower() for column in columns)
+        recommendations.append({
+            "table": table, "columns": list(columns), "name": name,
+            "statement": f"ALTER TABLE {{$wpdb->prefix}}{table} ADD INDEX {name} ({', '.join(columns)})",
+            "queries": [{"at": where(record), "template": record['template'], "kind": record['kind'],
+                         "in_loop": record['in_loop']} for record in served],
+        })
+    return sorted(recommendations, key=lambda item: (-len(item['queries']), item['table']))
+
+def sqlite_type(info):
+    if info['type'] in INTEGER_TYPES:
+        return 'INTEGER'
+    return 'REAL' if info['type'] in NUMBER_TYPES else 'TEXT'
+
+def synthetic_values(schema, table, column, rows, rng, formats):
+    """Column values for rows synthetic rows"""
+    info = schema.tables[table]['columns'][column]
+    parents = {other: rows for other in schema.tables if other != table
+               and [c.lower() for c in schema.primary_key(other)] == [column.lower()]}
+    if [c.lower() for c in schema.primary_key(table)] == [column.lower()]:
+        return list(range(1, rows + 1))
+    if info['type'] in INTEGER_TYPES:
+        return [rng.randint(1, rows) if parents else rng.randint(0, 40) for _ in range(rows)]
+    if info['type'] in NUMBER_TYPES:
+        return [round(rng.uniform(0, 100), 2) for _ in range(rows)]
+    written = formats.get(column.lower())
+    if info['type'] in DATE_TYPES or written or DATE_NAME_RE.search(column):
+        format = written[0] if written else 'Y-m-d H:i:s' if info['type'] != 'date' else 'Y-m-d'
+        today = date.today()
+        return [php_date(format, today - timedelta(days=rng.randint(0, 3 * 365))) for _ in range(rows)]
+    if info['type'] in ('set', 'enum') and info['size']:
+        choices = [value.strip().strip('\'"') for value in info['size'].split(',')]
+        return [rng.choice(choices) for _ in range(rows)]
+    if 'mail' in column.lower():
+        return [f"user{n}@example.com" for n in range(1, rows + 1)]
+    if info['size'] and info['size'].isdigit() and int(info['size']) <= LOW_CARDINALITY_SIZE:
+        return [f"{column.lower()}{rng.randint(1, 5)}" for _ in range(rows)]
+    return [f"{column.lower()}-{rng.randint(1, max(1, rows // 2))}" for _ in range(rows)]
+
+def build_database(schema, tables, rows, seed=SEED):
+    """In-memory SQLite copy of tables (with their existing indexes) filled with synthetic rows"""
+    rng = random.Random(seed)
+    formats = date_formats(schema)
+    db = sqlite3.connect(':memory:')
+    db.execute("PRAGMA automatic_index = OFF")
+    for name in tables:
+        table = schema.tables[name]
+        columns = list(table['columns'])
+        primary = schema.primary_key(name)
+        definitions = [f'"{column}" {sqlite_type(table["columns"][column])}' for column in columns]
+        if primary and all(schema.column(name, column) for column in primary):
+            definitions.append(f"PRIMARY KEY ({', '.join(chr(34) + column + chr(34) for column in primary)})")
+        db.execute(f'CREATE TABLE "{name}" ({", ".join(definitions)})')
+        values = [synthetic_values(schema, name, column, rows, rng, formats) for column in columns]
+        db.executemany(f'INSERT INTO "{name}" VALUES ({", ".join("?" * len(columns))})', zip(*values))
+        for index in table['indexes']:
+            if not index['primary'] and all(schema.column(name, column) for column in index['columns']):
+                db.execute(f'CREATE INDEX "{name}_{index["name"]}" ON "{name}" '
+                           f'({", ".join(chr(34) + column + chr(34) for column in index["columns"])})')
+    db.execute("ANALYZE")
+    return db
+
+def sample(db, table, column, count=1):
+    """count values of a column from the middle of its table"""
+    total = db.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+    rows = db.execute(f'SELECT "{column}" FROM "{table}" LIMIT ? OFFSET ?', (count, total // 2)).fetchall()
+    return [row[0] for row in rows] or [1]
+
+def literal(value):
+    return str(value) if isinstance(value, (int, float)) else "'" + str(value).replace("'", "''") + "'"
+
+def instantiate(template, schema, parsed, db):
+    """Runnable SQLite text of a query template, with ? replaced by values from the synthetic rows"""
+    start = re.search(r'\bSELECT\b', template, re.I)
+    if not start:
+        return None
+    sql = template[start.start():]
+    sql = re.sub(r'(?:\{prefix\})+(\{\w+\}|\w+)',
+                 lambda match: schema.table_name(match.group(1)) or match.group(1), sql)
+    for predicate in parsed['predicates']:
+        table, column = predicate['column']
+        pattern = rf'((?:`?\w+`?\.)?`?{re.escape(column)}`?)'
+        if predicate['operator'] in ('in', 'not in'):
+            values = ', '.join(literal(value) for value in sample(db, table, column, IN_LIST_SIZE))
+            sql = re.sub(pattern + r'(\s+(?:NOT\s+)?IN\s*)\(\s*\'?\?\'?\s*\)',
+                         lambda match: f"{match.group(1)}{match.group(2)}({values})", sql, flags=re.I)
+        else:
+            value = literal(sample(db, table, column)[0])
+            sql = re.sub(pattern + r'(\s*(?:=|<=>|!=|<>|>=|<=|<|>)\s*)\'?\?\'?',
+                         lambda match: f"{match.group(1)}{match.group(2)}{value}", sql, flags=re.I)
+    sql = re.sub(r'\blimit\s+\?', 'LIMIT 10', sql, flags=re.I)
+    return None if '?' in sql or '{' in sql else sql
+
+def measure(db, sql):
+    """(mean milliseconds per run, query plan) of one query"""
+    plan = '; '.join(row[-1] for row in db.execute("EXPLAIN QUERY PLAN " + sql))
+    db.execute(sql).fetchall()
+    runs, started = 0, time.perf_counter()
+    while runs < MAX_TIMING_RUNS and (runs < 3 or time.perf_counter() - started < TIMING_BUDGET):
+        db.execute(sql).fetchall()
+        runs += 1
+    return (time.perf_counter() - started) * 1000 / runs, plan
+
+def validate(schema, recommendations, records, rows=DEFAULT_ROWS):
+    """Time the read queries behind each recommendation before and after its index exists"""
+    by_place = {where(record): (record, parsed) for record, parsed in records}
+    tables = []
+    for recommendation in recommendations:
+        for query in recommendation['queries']:
+            if query['kind'] == 'read':
+                tables += by_place[query['at']][1]['tables']
+    tables = list(dict.fromkeys(tables))
+    if not tables:
+        return
+    db = build_database(schema, tables, rows)
+    runs = {}
+    for recommendation in recommendations:
+        for query in recommendation['queries']:
+            if query['kind'] != 'read':
+                continue
+            record, parsed = by_place[query['at']]
+            sql = instantiate(record['template'], schema, parsed, db)
+            if sql is None:
+                query['error'] = "template has parts that cannot be filled in"
+                continue
+            try:
+                runs[query['at']] = (sql, measure(db, sql))
+            except sqlite3.Error as e:
+                query['error'] = f"SQLite: {e}"
+    for recommendation in recommendations:
+        db.execute(f'CREATE INDEX "{recommendation["table"]}_{recommendation["name"]}" ON "{recommendation["table"]}" '
+                   f'({", ".join(chr(34) + column + chr(34) for column in recommendation["columns"])})')
+    db.execute("ANALYZE")
+    for recommendation in recommendations:
+        for query in recommendation['queries']:
+            if query['at'] in runs:
+                sql, (before, plan_before) = runs[query['at']]
+                after, plan_after = measure(db, sql)
+                query.update({"sql": sql, "before_ms": before, "after_ms": after,
+                              "plan_before": plan_before, "plan_after": plan_after})
+        timed = [query for query in recommendation['queries'] if 'before_ms' in query]
+        if timed:
+            best = max(query['before_ms'] / max(query['after_ms'], 1e-6) for query in timed)
+            recommendation['verdict'] = "confirmed" if best >= MIN_SPEEDUP else "no gain"
+    db.close()
+
+def advise(root=None, rows=DEFAULT_ROWS, check=True):
+    """Schema, issues and validated index recommendations of the plugin"""
+    from mqtools.config import PLUGIN_DIR
+
+    root = root or PLUGIN_DIR
+    schema = Schema(root)
+    all_records = QueryIndex(root).queries()
+    schema.add_queries(all_records)
+    records = []
+    for record in all_records:
+        parsed = parse_query(record['template'], schema)
+        if parsed['tables'] and not re.match(r'\s*(ALTER|CREATE|DROP|SHOW)\b', record['template'], re.I):
+            records.append((record, parsed))
+    issues = find_issues(schema, records)
+    recommendations = recommend(schema, records)
+    if check:
+        validate(schema, recommendations, records, rows)
+    return {"tables": schema.tables, "queries": len(records), "issues": issues,
+            "recommendations": recommendations, "rows": rows if check else 0}
+
+def run_schema(args):
+    """Entry point for `mqtools schema`"""
+    import json
+
+    started = time.perf_counter()
+    report = advise(args.root, args.rows, not args.no_validate)
+    elapsed = time.perf_counter() - started
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    tables = report['tables']
+    print(f"{len(tables)} tables, {sum(len(table['columns']) for table in tables.values())} columns, "
+          f"{sum(not index['primary'] for table in tables.values() for index in table['indexes'])} secondary "
+          f"indexes; {report['queries']} queries on them")
+    if report['issues']:
+        print("\n✗ Schema and predicate issues")
+        for issue in report['issues']:
+            at = f" (used at {', '.join(issue['at'][:4])}{', ...' if len(issue['at']) > 4 else ''})" \
+                if issue['at'] and issue['kind'] != 'unknown-column' else f" ({issue['at'][0]})" if issue['at'] else ""
+            print(f"  {issue['kind']:<16} {issue['table']}.{issue['column']}{at}")
+            print(f"                   {issue['detail']}")
+    if report['recommendations']:
+        where_run = f", validated on SQLite with {report['rows']} synthetic rows per table" if report['rows'] else ""
+        print(f"\n✓ Recommended indexes{where_run}")
+    for recommendation in report['recommendations']:
+        loops = sum(query['in_loop'] for query in recommendation['queries'])
+        count = len(recommendation['queries'])
+        verdict = {"confirmed": "✓ ", "no gain": "✗ "}.get(recommendation.get('verdict'), "  ")
+        print(f"{verdict}{recommendation['statement']}")
+        print(f"      serves {count} {'query' if count == 1 else 'queries'}"
+              + (f", {loops} inside loops" if loops else "")
+              + (" - no gain on the synthetic data (the predicate matches too many rows)"
+                 if recommendation.get('verdict') == "no gain" else ""))
+        for query in recommendation['queries']:
+            if 'before_ms' in query:
+                print(f"      {query['at']}: {query['before_ms']:.3f} ms -> {query['after_ms']:.3f} ms "
+                      f"({query['before_ms'] / max(query['after_ms'], 1e-6):.0f}x), {query['plan_after'][:80]}")
+            elif 'error' in query:
+                print(f"      {query['at']}: not validated ({query['error']})")
+            else:
+                print(f"      {query['at']}: {query['kind']}{' [loop]' if query['in_loop'] else ''}")
+    print(f"\n✓ {len(report['issues'])} issues, {len(report['recommendations'])} index recommendations "
+          f"({elapsed:.1f} s)")
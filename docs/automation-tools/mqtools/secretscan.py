@@ -0,0 +1,212 @@
+"""
+Local secret scanner
+
+Every file under the tree, vendor/, archives/ and JS assets included, is
+read once and matched against a single compiled pattern: the prefixes of
+all rules are alternatives of one regex, so a file is scanned in one pass
+however many rules there are. Every alternative starts with a literal (a
+token prefix, "define", "://" or a secret-ish name in its lower, upper and
+title case spellings), which lets the regex engine skip text that cannot
+start a match; the rule, its groups and word boundaries are only worked
+out for the few hits. Token formats with a fixed prefix
+(AWS, GitHub, Slack, Google, Stripe, xAI keys, private key blocks) are
+reported as they are. Generic assignments and define()s of secret-looking
+names are reported only when the value is not a placeholder and its
+Shannon entropy is high enough to be a real key.
+
+Files are spread over a process pool. Findings whose fingerprint (rule,
+file and a hash of the value, not the line number) is in the baseline file
+are accepted ones and are not reported again.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+
+SKIP_DIRS = {'.git', '.mqtools-cache', '__pycache__', 'node_modules', '.venv', 'venv'}
+MAX_FILE_BYTES = 5 * 1024 * 1024
+MIN_ENTROPY = 3.0           # bits per character of a generic secret value
+MIN_SECRET_LENGTH = 8
+
+# Names whose values are credentials (define() constants, array keys, variables)
+SECRET_NAME = (r'(?:secret|passw(?:or)?d|pwd|api[_-]?key|access[_-]?key|auth[_-]?key|auth[_-]?token'
+               r'|access[_-]?token|private[_-]?key|client[_-]?secret|salt|token)')
+SECRET_NAME_RE = re.compile(SECRET_NAME, re.I)
+# Lower, upper and title case spellings rather than (?i:...), which has no literal to skip ahead to
+SECRET_WORDS = ['secret', 'password', 'passwd', 'pwd', 'api_key', 'api-key', 'apikey', 'access_key',
+                'access-key', 'accesskey', 'auth_key', 'authkey', 'auth_token', 'authtoken', 'access_token',
+                'accesstoken', 'private_key', 'privatekey', 'client_secret', 'clientsecret', 'salt', 'token']
+SPELLINGS = [spelling for word in SECRET_WORDS for spelling in (word, word.upper(), word.capitalize())]
+
+# Rule -> (literal prefixes, rest of the pattern). The secret is the `value` group, else the whole match.
+RULES = {
+    "private_key": (["-----BEGIN "], r'(?:RSA |EC |DSA |OPENSSH |PGP |ENCRYPTED )?PRIVATE KEY(?: BLOCK)?-----'),
+    "aws_access_key": (["AKIA", "ASIA"], r'[0-9A-Z]{16}(?![0-9A-Za-z])'),
+    "github_token": (["ghp_", "gho_", "ghu_", "ghs_", "ghr_", "github_pat_"], r'[A-Za-z0-9_]{36,}'),
+    "slack_token": (["xoxa-", "xoxb-", "xoxp-", "xoxo-", "xoxr-", "xoxs-"], r'[A-Za-z0-9-]{10,}'),
+    "google_api_key": (["AIza"], r'[0-9A-Za-z_-]{35}(?![0-9A-Za-z_-])'),
+    "stripe_key": (["sk_live_", "rk_live_"], r'[0-9A-Za-z]{20,}'),
+    "xai_api_key": (["xai-"], r'[A-Za-z0-9]{32,}'),
+    "jwt": (["eyJ"], r'[A-Za-z0-9_-]{10,}\.eyJ[A-Za-z0-9_-]{10,}\.[A-Za-z0-9_-]{10,}'),
+    "url_credentials": (["://"], r'[^\s:/@\'"]+:(?P<value>[^\s:/@\'"]{4,})@[\w.-]+'),
+    # define('MONEYQUIZ_SPECIAL_SECRET_KEY', '...') / define('..._EMAIL', '...')
+    "defined_credential": (["define"], r'\s*\(\s*[\'"](?P<name>\w+)[\'"]\s*,\s*'
+                                       r'(?P<quote>[\'"])(?P<value>[^\'"\n]{4,})(?P=quote)'),
+    # $api_key = '...', 'client_secret' => '...', password: "..."
+    "assigned_secret": (SPELLINGS, r'\w*[\'"]?\]?\s*(?:=>|=|:)\s*(?P<quote>[\'"])(?P<value>[^\'"\s]{8,200})(?P=quote)'),
+}
+# Rules whose prefix must not continue a longer word
+WORD_PREFIXED = {"aws_access_key", "github_token", "slack_token", "google_api_key", "stripe_key", "xai_api_key",
+                 "jwt", "defined_credential"}
+# Rules reported only for values that are not placeholders and have enough entropy
+SCORED = {"url_credentials", "defined_credential", "assigned_secret"}
+
+def plain(pattern):
+    """pattern without named groups, so its copies can share one regex"""
+    return re.sub(r'\(\?P<\w+>', '(?:', pattern).replace('(?P=quote)', '[\'"]')
+
+# One top-level alternative per prefix, each starting with its literal: the engine then only
+# tries the alternatives at characters that can start one. Hits are confirmed per rule.
+SECRET_RE = re.compile('|'.join(re.escape(prefix) + plain(rest)
+                                for prefixes, rest in RULES.values() for prefix in prefixes))
+RULE_RES = {rule: re.compile('(?:' + '|'.join(map(re.escape, prefixes)) + ')' + rest)
+            for rule, (prefixes, rest) in RULES.items()}
+
+PLACEHOLDER_RE = re.compile(r'(?i)example|your[-_ ]|changeme|change[-_]me|placeholder|dummy|sample|test|xxx|\*\*\*'
+                            r'|<[^>]*>|\{\{|\$\{|^\$|^%|password|secret|redacted|null|none|true|false')
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[a-z]{2,}$', re.I)
+
+def entropy(value):
+    """Shannon entropy of value in bits per character"""
+    counts = Counter(value)
+    return -sum(n / len(value) * math.log2(n / len(value)) for n in counts.values())
+
+def is_credential(rule, match):
+    """Whether a match of a scored rule carries a real-looking secret"""
+    value = match.group('value')
+    if PLACEHOLDER_RE.search(value):
+        return False
+    if rule == "defined_credential":
+        name = match.group('name')
+        if EMAIL_RE.match(value):
+            return name.upper().endswith('EMAIL')  # a hardcoded address in place of a setting
+        if not SECRET_NAME_RE.search(name):
+            return False
+    if len(value) < MIN_SECRET_LENGTH or re.fullmatch(r'[a-z_]+|[A-Z_]+|[\w.-]+\(\)?|[a-z]+://\S*', value):
+        return False  # identifiers, option names, function calls and endpoint URLs
+    return entropy(value) >= MIN_ENTROPY
+
+def fingerprint(rule, path, secret):
+    return hashlib.sha256(f"{rule}:{path}:{secret}".encode('utf-8')).hexdigest()[:16]
+
+def mask(secret):
+    return secret[:4] + '…' + f"({len(secret)} chars)" if len(secret) > 8 else '…'
+
+def scan_file(args):
+    """Findings in one file; args is (root, relative path) so it can be mapped over a pool"""
+    root, relative = args
+    path = os.path.join(root, relative)
+    try:
+        if os.path.getsize(path) > MAX_FILE_BYTES:
+            return []
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return []
+    if b'\0' in data[:8192]:
+        return []  # binary
+    text = data.decode('utf-8', errors='replace')
+
+    findings = []
+    line, position = 1, 0
+    name = relative.replace(os.sep, '/')
+    for hit in SECRET_RE.finditer(text):
+        start = hit.start()
+        rule, match = next(((rule, regex.match(text, start)) for rule, regex in RULE_RES.items()
+                            if regex.match(text, start)), (None, None))
+        if match is None:
+            continue
+        if rule in WORD_PREFIXED and start and (text[start - 1].isalnum() or text[start - 1] == '_'):
+            continue
+        if rule in SCORED and not is_credential(rule, match):
+            continue
+        secret = match.group('value') if 'value' in match.re.groupindex else match.group(0)
+        line += text.count('\n', position, start)
+        position = start
+        findings.append({"rule": rule, "file": name, "line": line, "secret": mask(secret),
+                         "entropy": round(entropy(secret), 2), "fingerprint": fingerprint(rule, name, secret)})
+    return findings
+
+def walk_files(root, exclude=()):
+    """Relative paths of every file under root"""
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for name in sorted(files):
+            relative = os.path.relpath(os.path.join(directory, name), root)
+            if relative not in exclude:
+                yield relative
+
+def scan_tree(root, jobs=None, exclude=()):
+    """All findings under root, scanning files across a process pool"""
+    files = list(walk_files(root, exclude))
+    jobs = jobs or os.cpu_count() or 1
+    work = [(root, relative) for relative in files]
+    if jobs == 1:
+        results = map(scan_file, work)
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(jobs)
+        results = pool.map(scan_file, work, chunksize=max(1, len(work) // (jobs * 8)))
+    findings = [finding for file_findings in results for finding in file_findings]
+    if jobs != 1:
+        pool.shutdown()
+    return findings, len(files)
+
+def load_baseline(path):
+    """Accepted fingerprints, or an empty set"""
+    try:
+        with open(path) as f:
+            return {entry['fingerprint'] for entry in json.load(f).get('findings', [])}
+    except (OSError, ValueError):
+        return set()
+
+def save_baseline(path, findings):
+    entries = [{key: finding[key] for key in ('fingerprint', 'rule', 'file', 'line')} for finding in findings]
+    with open(path, 'w') as f:
+        json.dump({"findings": entries}, f, indent=2)
+        f.write('\n')
+
+def run_secrets(args):
+    """Entry point for `mqtools secrets`; exits 1 when there are findings not in the baseline"""
+    import sys
+    import time
+
+    from mqtools.config import PLUGIN_DIR, SECRETS_BASELINE
+
+    root = args.root or PLUGIN_DIR
+    baseline = args.baseline or SECRETS_BASELINE
+    exclude = {os.path.relpath(os.path.abspath(baseline), os.path.abspath(root))}
+    started = time.perf_counter()
+    findings, files = scan_tree(root, args.jobs, exclude)
+    elapsed = time.perf_counter() - started
+
+    if args.update_baseline:
+        save_baseline(baseline, findings)
+        print(f"✓ {len(findings)} findings written to {baseline} as accepted")
+        return
+
+    accepted = load_baseline(baseline)
+    new = [finding for finding in findings if finding['fingerprint'] not in accepted]
+    if args.json:
+        print(json.dumps(new, indent=2))
+    else:
+        for finding in new:
+            print(f"{finding['file']}:{finding['line']}: {finding['rule']} {finding['secret']}"
+                  f" (entropy {finding['entropy']})")
+        print(f"{'✗' if new else '✓'} {len(new)} new secrets ({len(findings) - len(new)} in the baseline) "
+              f"in {files} files, {elapsed:.1f} s")
+    if new:
+        sys.exit(1)
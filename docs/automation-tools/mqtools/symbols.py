@@ -0,0 +1,235 @@
+"""
+Cross-file PHP symbol index
+
+A regex/brace-matching scan of the plugin's PHP files records constants
+(define() and const, TABLE_* names marked as tables), functions, classes
+with their methods, and include/require targets. The index is cached in
+the tools cache and only files whose size or mtime changed are rescanned.
+
+context_for() returns just the definitions a chunk of code references and
+does not define itself, so a prompt carries TABLE_MQ_PROSPECTS or
+get_percentage() instead of the whole file they live in.
+"""
+
+import glob
+import json
+import os
+import re
+
+from mqtools.latency import estimate_tokens
+
+SOURCES = ['*.php', 'includes/**/*.php']
+# Test scripts stub WordPress functions; their definitions are not the plugin's
+EXCLUDE_RE = re.compile(r'(^|[\\/])test[-_][^\\/]*$')
+MAX_BODY_LINES = 30         # longer functions are sent as their signature only
+CONTEXT_TOKEN_BUDGET = 1500
+
+DEFINE_RE = re.compile(r'''^[ \t]*define\s*\(\s*['"]([A-Za-z_][A-Za-z0-9_]*)['"]\s*,[^;]*;''', re.M)
+CONST_RE = re.compile(r'^[ \t]*const\s+([A-Za-z_][A-Za-z0-9_]*)\s*=[^;]*;', re.M)
+CLASS_RE = re.compile(r'^[ \t]*(?:abstract\s+|final\s+)?(class|interface|trait)\s+([A-Za-z_][A-Za-z0-9_]*)[^{;]*\{', re.M)
+FUNCTION_RE = re.compile(r'^[ \t]*(?:(?:public|protected|private|static|abstract|final)\s+)*'
+                         r'function\s+&?\s*([A-Za-z_][A-Za-z0-9_]*)\s*\(', re.M)
+INCLUDE_RE = re.compile(r'\b(?:require|include)(?:_once)?\s*\(?\s*([^;]+?)\s*\)?\s*;')
+IDENTIFIER_RE = re.compile(r'(::|->|\bnew\s+|\bfunction\s+&?\s*)?\b([A-Za-z_][A-Za-z0-9_]*)\s*(\()?')
+
+def block_end(text, start):
+    """Index just past the brace block opening at or after start
+
+    Skips strings, comments and inline HTML between ?> and <?php so braces
+    in them are not counted.
+    """
+    depth = 0
+    i = text.find('{', start)
+    if i < 0:
+        return len(text)
+    length = len(text)
+    while i < length:
+        ch = text[i]
+        if ch in '\'"':
+            i += 1
+            while i < length and text[i] != ch:
+                i += 2 if text[i] == '\\' else 1
+        elif text.startswith('//', i) or ch == '#':
+            newline = text.find('\n', i)
+            closing = text.find('?>', i, newline if newline >= 0 else length)
+            i = (closing if closing >= 0 else newline if newline >= 0 else length) - 1
+        elif text.startswith('/*', i):
+            i = text.find('*/', i + 2)
+            i = length if i < 0 else i + 1
+        elif text.startswith('?>', i):
+            reopen = text.find('<?', i)
+            i = length if reopen < 0 else reopen + 1
+        elif ch == '{':
+            depth += 1
+        elif ch == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return length
+
+def line_of(text, index):
+    return text.count('\n', 0, index) + 1
+
+def docblock_start(text, index):
+    """Start of a /** ... */ comment directly above index, else index"""
+    before = text[:index].rstrip()
+    if before.endswith('*/'):
+        opening = before.rfind('/**')
+        if opening >= 0:
+            return text.rfind('\n', 0, opening) + 1
+    return index
+
+def definition_text(text, start, end):
+    """Source of a definition, reduced to its signature when it is long"""
+    start = docblock_start(text, start)
+    source = text[start:end].strip('\n')
+    lines = source.split('\n')
+    if len(lines) <= MAX_BODY_LINES:
+        return source
+    signature = text[start:text.find('{', text.find('function', start)) + 1].strip('\n')
+    return f"{signature} /* {len(lines)} lines */ }}"
+
+def scan_php(path):
+    """Symbols and includes defined in one PHP file"""
+    with open(path, encoding='utf-8', errors='replace') as f:
+        text = f.read()
+    name = os.path.basename(path)
+    symbols = []
+
+    for regex in (DEFINE_RE, CONST_RE):
+        for match in regex.finditer(text):
+            constant = match.group(1)
+            symbols.append({"name": constant, "kind": "table" if constant.startswith('TABLE_') else "constant",
+                            "file": name, "line": line_of(text, match.start()),
+                            "text": match.group(0).strip()})
+
+    classes = []
+    for match in CLASS_RE.finditer(text):
+        end = block_end(text, match.end() - 1)
+        classes.append((match.start(), end, match.group(2)))
+        methods = [m.group(0).strip().rstrip('(') + '(...);'
+                   for m in FUNCTION_RE.finditer(text, match.end(), end)]
+        header = text[docblock_start(text, match.start()):match.end()].strip('\n')
+        summary = header + ''.join(f"\n    {method}" for method in methods) + "\n}"
+        symbols.append({"name": match.group(2), "kind": match.group(1), "file": name,
+                        "line": line_of(text, match.start()), "text": summary})
+
+    for match in FUNCTION_RE.finditer(text):
+        owner = next((cls for start, end, cls in classes if start < match.start() < end), None)
+        end = block_end(text, match.end())
+        symbols.append({"name": match.group(1), "kind": "method" if owner else "function",
+                        "class": owner, "file": name, "line": line_of(text, match.start()),
+                        "text": definition_text(text, match.start(), end)})
+
+    includes = [match.group(1) for match in INCLUDE_RE.finditer(text)]
+    return {"symbols": symbols, "includes": includes}
+
+class SymbolIndex:
+    """Plugin-wide PHP symbols, cached per file by size and mtime"""
+
+    def __init__(self, root, cache_path=None, sources=SOURCES):
+        self.root = root
+        self.cache_path = cache_path
+        self.files = {}
+        self.rescanned = 0
+        cached = {}
+        if cache_path:
+            try:
+                with open(cache_path) as f:
+                    data = json.load(f)
+                if data.get('root') == os.path.abspath(root):
+                    cached = data.get('files', {})
+            except (OSError, ValueError):
+                cached = {}
+
+        for pattern in sources:
+            for path in sorted(glob.glob(os.path.join(root, pattern), recursive=True)):
+                relative = os.path.relpath(path, root)
+                if EXCLUDE_RE.search(relative):
+                    continue
+                stat = os.stat(path)
+                entry = cached.get(relative)
+                if not entry or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+                    entry = dict(scan_php(path), size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                    self.rescanned += 1
+                self.files[relative] = entry
+
+        if cache_path and (self.rescanned or len(cached) != len(self.files)):
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            with open(cache_path, 'w') as f:
+                json.dump({"root": os.path.abspath(root), "files": self.files}, f)
+
+        # Lookup tables: constants are case-sensitive, functions and classes are not
+        self.constants, self.functions, self.classes, self.methods = {}, {}, {}, {}
+        for entry in self.files.values():
+            for symbol in entry['symbols']:
+                if symbol['kind'] in ('constant', 'table'):
+                    self.constants.setdefault(symbol['name'], symbol)
+                elif symbol['kind'] == 'function':
+                    self.functions.setdefault(symbol['name'].lower(), symbol)
+                elif symbol['kind'] == 'method':
+                    self.methods.setdefault(symbol['name'].lower(), []).append(symbol)
+                else:
+                    self.classes.setdefault(symbol['name'].lower(), symbol)
+
+    def __len__(self):
+        return sum(len(entry['symbols']) for entry in self.files.values())
+
+    def references(self, code):
+        """Indexed symbols used by code that it does not define itself"""
+        found = {}
+        defined = set()
+        for match in IDENTIFIER_RE.finditer(code):
+            prefix, name, call = match.group(1) or '', match.group(2), match.group(3)
+            key = name.lower()
+            if prefix.startswith('function'):
+                defined.add(key)
+            elif prefix in ('::', '->'):
+                # Methods only when exactly one indexed class has one by that name
+                candidates = self.methods.get(key, []) if call else []
+                if len(candidates) == 1:
+                    found.setdefault(('method', key), candidates[0])
+            elif call and key in self.functions:
+                found.setdefault(('function', key), self.functions[key])
+            elif key in self.classes and (prefix or code[match.end(2):match.end(2) + 2] == '::'):
+                found.setdefault(('class', key), self.classes[key])
+            elif name in self.constants:
+                found.setdefault(('constant', name), self.constants[name])
+        for match in DEFINE_RE.finditer(code):
+            defined.add(match.group(1).lower())
+        return [symbol for symbol in found.values() if symbol['name'].lower() not in defined]
+
+    def context_for(self, code, token_budget=CONTEXT_TOKEN_BUDGET):
+        """PHP source of the definitions code references, within a token budget"""
+        order = {"table": 0, "constant": 1, "class": 2, "interface": 2, "trait": 2, "function": 3, "method": 4}
+        parts, used = [], 0
+        for symbol in sorted(self.references(code), key=lambda s: (order[s['kind']], s['file'], s['line'])):
+            part = f"// {symbol['file']}:{symbol['line']}\n{symbol['text']}"
+            tokens = estimate_tokens(part)
+            if used + tokens > token_budget:
+                continue
+            parts.append(part)
+            used += tokens
+        return '\n\n'.join(parts)
+
+def load_symbol_index(root=None):
+    """Symbol index of the plugin, refreshed from the cache"""
+    from mqtools.config import PLUGIN_DIR, SYMBOL_INDEX_PATH
+    return SymbolIndex(root or PLUGIN_DIR, SYMBOL_INDEX_PATH)
+
+def run_symbols(args):
+    """Entry point for `mqtools symbols`"""
+    import time
+
+    started = time.perf_counter()
+    index = load_symbol_index(args.root)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"✓ {len(index)} symbols in {len(index.files)} files "
+          f"({index.rescanned} rescanned, {elapsed:.0f} ms)")
+    if args.file:
+        with open(args.file, encoding='utf-8', errors='replace') as f:
+            code = f.read()
+        context = index.context_for(code, args.budget)
+        print(f"Context for {args.file}: ~{estimate_tokens(context) if context else 0} tokens\n")
+        print(context)
@@ -0,0 +1,802 @@
+"""
+Local PHP taint analysis
+
+Request input ($_GET, $_POST, $_REQUEST, $_COOKIE, client $_SERVER keys)
+is followed through assignments, string concatenation and interpolation,
+and calls of plugin functions, to SQL sinks ($wpdb->query/get_results/
+get_row/get_var/get_col, the query of $wpdb->prepare) and output sinks
+(echo, print, printf, die). Sanitizers clean a value for the sinks they
+protect: esc_sql and $wpdb->prepare for SQL, esc_html and friends for
+output, intval, casts and boolean/number functions for both.
+
+Each function is reduced to a summary: which parameters and sources reach
+its return value, its sinks, and the calls it makes with the origins of
+each argument. Summaries are cached by the function's content hash, and
+reused while the return summaries of its callees are unchanged, so an
+unchanged plugin is not analysed again. Sinks that depend on parameters
+are decided from the call sites. Each sink gets a verdict:
+
+- vulnerable: request input reaches it unsanitized
+- safe: only constants, sanitized values and database data reach it
+- unknown: it depends on globals, object properties, unresolved method
+  calls or parameters of functions no plugin code calls (hook callbacks)
+
+Only unknown sinks are left for the model to judge. Stored (second-order)
+input from the database is out of scope and counted as safe here.
+"""
+
+import bisect
+import glob
+import hashlib
+import json
+import os
+import re
+
+from mqtools.symbols import EXCLUDE_RE, SOURCES
+
+ENGINE_VERSION = 1          # bump when the analysis changes, to drop cached summaries
+
+TOKEN_RE = re.compile(r'''
+    (?P<comment>(?://|\#)[^\n]*?(?=\?>|\n|$)|/\*.*?\*/)
+  | (?P<close>\?>)
+  | (?P<heredoc><<<[ \t]*(?P<hd_quote>['"]?)(?P<hd_name>\w+)(?P=hd_quote)\r?\n.*?\n[ \t]*(?P=hd_name)\b)
+  | (?P<var>\$[A-Za-z_]\w*)
+  | (?P<sq>'(?:[^'\\]|\\.)*')
+  | (?P<dq>"(?:[^"\\]|\\.)*")
+  | (?P<cast>\(\s*(?:int|integer|float|double|bool|boolean)\s*\))
+  | (?P<name>[A-Za-z_\\][\w\\]*)
+  | (?P<num>\d+(?:\.\d+)?)
+  | (?P<op>->|::|=>|===|!==|==|!=|<=|>=|&&|\|\||\?\?=|\?\?|\.=|\+=|-=|\*=|/=|[-+*/%.=<>!?:;,(){}\[\]&|^~@])
+  | (?P<ws>\s+)
+''', re.S | re.X)
+OPEN_RE = re.compile(r'<\?(php\b|=)?', re.I)
+INTERPOLATION_RE = re.compile(r'\{?\$([A-Za-z_]\w*)(?:\[[\'"]?(\w+)[\'"]?\])?')
+
+SUPERGLOBALS = {'$_GET', '$_POST', '$_REQUEST', '$_COOKIE', '$_FILES'}
+CLIENT_SERVER_KEYS = re.compile(r'^(?:HTTP_\w+|REQUEST_URI|QUERY_STRING|PHP_SELF|PATH_INFO)$')
+ASSIGN_OPS = {'=', '.=', '+=', '-=', '*=', '/=', '??='}
+COMPARE_OPS = {'==', '===', '!=', '!==', '<', '>', '<=', '>=', '&&', '||', '!'}
+COMPARE_WORDS = {'and', 'or', 'xor', 'instanceof'}
+
+# Return values that carry no string input: numbers, booleans, hashes
+CLEAN_FUNCTIONS = {
+    'intval', 'absint', 'floatval', 'boolval', 'count', 'sizeof', 'strlen', 'isset', 'empty', 'is_numeric',
+    'is_array', 'is_string', 'is_int', 'is_null', 'in_array', 'array_key_exists', 'md5', 'sha1', 'crc32',
+    'wp_hash', 'wp_create_nonce', 'wp_verify_nonce', 'check_admin_referer', 'check_ajax_referer',
+    'current_user_can', 'is_user_logged_in', 'number_format', 'round', 'ceil', 'floor', 'abs', 'max', 'min',
+    'time', 'strtotime', 'date', 'current_time', 'rand', 'mt_rand', 'wp_rand', 'uniqid', 'sanitize_key',
+    'sanitize_title', 'sanitize_html_class', 'esc_html__', 'esc_attr__', '__', 'get_current_user_id',
+}
+# Data fetched from elsewhere, out of scope like database rows
+EXTERNAL_FUNCTIONS = {'file_get_contents', 'wp_remote_get', 'wp_remote_post', 'wp_remote_request',
+                      'wp_remote_retrieve_body', 'curl_exec', 'get_option', 'get_post_meta', 'get_user_meta'}
+# Sanitizer -> sinks it protects
+SANITIZERS = {
+    'esc_sql': ('sql',), 'addslashes': ('sql',),
+    'esc_html': ('xss',), 'esc_attr': ('xss',), 'esc_url': ('xss',), 'esc_url_raw': ('xss',),
+    'esc_js': ('xss',), 'esc_textarea': ('xss',), 'wp_kses': ('xss',), 'wp_kses_post': ('xss',),
+    'wp_kses_data': ('xss',), 'htmlspecialchars': ('xss',), 'htmlentities': ('xss',), 'strip_tags': ('xss',),
+    'wp_strip_all_tags': ('xss',), 'sanitize_text_field': ('xss',), 'sanitize_textarea_field': ('xss',),
+    'sanitize_email': ('xss',), 'sanitize_file_name': ('xss',), 'json_encode': ('xss',),
+    'wp_json_encode': ('xss',), 'urlencode': ('xss', 'sql'), 'rawurlencode': ('xss', 'sql'),
+}
+OUTPUT_FUNCTIONS = {'printf', 'vprintf', 'print_r', 'die', 'exit', 'wp_die', '_e'}
+SQL_FUNCTIONS = {'mysql_query': 0, 'mysqli_query': 1}
+SQL_METHODS = {'query', 'get_results', 'get_row', 'get_var', 'get_col', 'prepare'}
+WPDB_CLEAN_METHODS = {'insert', 'update', 'delete', 'replace', 'get_charset_collate', 'print_error'}
+
+def tokenize(text):
+    """(kind, value, offset) tokens of the PHP code in text; ?> ends a statement"""
+    tokens = []
+    pos, in_php, length = 0, False, len(text)
+    while pos < length:
+        if not in_php:
+            match = OPEN_RE.search(text, pos)
+            if not match:
+                break
+            if match.group(1) == '=':
+                tokens.append(('name', 'echo', match.start()))
+            pos, in_php = match.end(), True
+            continue
+        match = TOKEN_RE.match(text, pos)
+        if not match:
+            pos += 1
+            continue
+        kind = match.lastgroup
+        if kind == 'close':
+            tokens.append(('op', ';', match.start()))
+            in_php = False
+        elif kind not in ('ws', 'comment'):
+            tokens.append((kind, match.group(kind), match.start()))
+        pos = match.end()
+    return tokens
+
+def closing(tokens, i):
+    """Index of the bracket closing the one at tokens[i]"""
+    pairs = {'(': ')', '[': ']', '{': '}'}
+    opening, depth = tokens[i][1], 0
+    for j in range(i, len(tokens)):
+        if tokens[j][0] == 'op':
+            if tokens[j][1] == opening:
+                depth += 1
+            elif tokens[j][1] == pairs[opening]:
+                depth -= 1
+                if depth == 0:
+                    return j
+    return len(tokens) - 1
+
+def split_top(tokens, separators):
+    """Split tokens at separators outside brackets"""
+    parts, current, depth = [], [], 0
+    for token in tokens:
+        if token[0] == 'op' and token[1] in '([{':
+            depth += 1
+        elif token[0] == 'op' and token[1] in ')]}':
+            depth -= 1
+        if depth == 0 and token[1] in separators and token[0] in ('op', 'name'):
+            parts.append(current)
+            current = []
+        else:
+            current.append(token)
+    parts.append(current)
+    return parts
+
+def origin(kind, detail, cleaned=()):
+    return (kind, detail, tuple(sorted(cleaned)))
+
+def cleaned(origins, sinks):
+    """origins made safe for sinks"""
+    return {origin(kind, detail, set(done) | set(sinks)) for kind, detail, done in origins}
+
+def parse_units(text):
+    """Functions and methods of a PHP file, and its top-level tokens"""
+    tokens = tokenize(text)
+    units, main, classes = [], [], []
+    closure_params = set()
+    i, depth = 0, 0
+    while i < len(tokens):
+        kind, value, offset = tokens[i]
+        if kind == 'name' and value.lower() in ('class', 'interface', 'trait') and i + 1 < len(tokens) \
+                and tokens[i + 1][0] == 'name':
+            j = i
+            while j < len(tokens) and tokens[j][1] not in ('{', ';'):
+                j += 1
+            classes.append((tokens[i + 1][1], depth + 1))
+            main.extend(tokens[i:j])
+            i = j
+            continue
+        if kind == 'name' and value.lower() == 'function':
+            j = i + 1
+            if j < len(tokens) and tokens[j][1] == '&':
+                j += 1
+            named = j < len(tokens) and tokens[j][0] == 'name'
+            start = j + 1 if named else j
+            if start < len(tokens) and tokens[start][1] == '(':
+                end = closing(tokens, start)
+                params = [part[0][1] if part and part[0][0] == 'var' else
+                          next((t[1] for t in part if t[0] == 'var'), None)
+                          for part in split_top(tokens[start + 1:end], {','}) if part]
+                if not named:
+                    closure_params.update(param for param in params if param)
+                    i = end + 1
+                    continue
+                body = end + 1
+                while body < len(tokens) and tokens[body][1] not in ('{', ';'):
+                    body += 1
+                if body < len(tokens) and tokens[body][1] == '{':
+                    last = closing(tokens, body)
+                    owner = classes[-1][0] if classes and depth >= classes[-1][1] else None
+                    end_offset = tokens[last][2] + 1
+                    units.append({"name": tokens[j][1], "class": owner, "params": params,
+                                  "tokens": tokens[body + 1:last], "offset": offset,
+                                  "source": text[offset:end_offset]})
+                    i = last + 1
+                    continue
+                i = body + 1
+                continue
+        if kind == 'op' and value == '{':
+            depth += 1
+        elif kind == 'op' and value == '}':
+            depth -= 1
+            if classes and depth < classes[-1][1]:
+                classes.pop()
+        main.append(tokens[i])
+        i += 1
+    return units, main, closure_params
+
+class UnitAnalysis:
+    """Origins of every variable in one function or file body, and what reaches its sinks"""
+
+    def __init__(self, engine, key, params, closure_params, line_of):
+        self.engine = engine
+        self.line_of = line_of
+        self.state = {param: {origin('param', i)} for i, param in enumerate(params) if param}
+        for param in closure_params:
+            self.state[param] = {origin('unknown', f'closure parameter {param}')}
+        self.returns = set()
+        self.sinks = []
+        self.calls = []
+        self.deps = {}
+        self.key = key
+
+    # Statements
+
+    def run(self, tokens):
+        """Statements in order; assignments inside blocks only add origins"""
+        depth, blocks, current = 0, 0, []
+        for token in tokens:
+            kind, value, _ = token
+            if kind == 'op' and value in ('(', '['):
+                depth += 1
+            elif kind == 'op' and value in (')', ']'):
+                depth -= 1
+            if depth <= 0 and kind == 'op' and value in (';', '{', '}'):
+                self.statement(current, blocks > 0 or value == '{')
+                blocks += {'{': 1, '}': -1}.get(value, 0)
+                current, depth = [], 0
+            else:
+                current.append(token)
+        self.statement(current, blocks > 0)
+
+    def statement(self, tokens, conditional=False):
+        if not tokens:
+            return
+        first = tokens[0][1].lower() if tokens[0][0] == 'name' else tokens[0][1]
+        if first in ('case', 'default'):
+            parts = split_top(tokens, {':'})
+            return self.statement([t for part in parts[1:] for t in part], True)
+        if first in ('else', 'do', 'try'):
+            return self.statement(tokens[1:], True)
+        if first in ('if', 'elseif', 'while', 'switch', 'for', 'foreach') and len(tokens) > 1 \
+                and tokens[1][1] == '(':
+            close = closing(tokens, 1)
+            header = tokens[2:close]
+            if first == 'foreach':
+                self.foreach(header)
+            else:
+                for part in split_top(header, {';'}):
+                    self.assignment(part, True)
+            rest = [t for t in tokens[close + 1:] if t[1] != ':']
+            return self.statement(rest, True)
+        if first in ('echo', 'print'):
+            for part in split_top(tokens[1:], {','}):
+                self.sink('xss', first, self.expr(part), self.line_of(tokens[0][2]))
+            return
+        if first == 'return':
+            self.returns |= self.expr(tokens[1:])
+            return
+        if first == 'global':
+            for token in tokens[1:]:
+                if token[0] == 'var' and token[1] != '$wpdb':
+                    self.state[token[1]] = {origin('unknown', f'global {token[1]}')}
+            return
+        if first in ('static', 'unset', 'break', 'continue', 'namespace', 'use', 'public', 'private',
+                     'protected', 'const', 'var'):
+            return
+        self.assignment(tokens, conditional)
+
+    def foreach(self, header):
+        parts = split_top(header, {'as'})
+        if len(parts) < 2:
+            return self.expr(header)
+        origins = self.expr(parts[0])
+        for token in parts[1]:
+            if token[0] == 'var':
+                self.state[token[1]] = set(origins)
+
+    def assignment(self, tokens, conditional):
+        """Expression statement, with its assignments applied"""
+        segments, ops, current, depth = [], [], [], 0
+        for token in tokens:
+            if token[0] == 'op' and token[1] in '([{':
+                depth += 1
+            elif token[0] == 'op' and token[1] in ')]}':
+                depth -= 1
+            if depth == 0 and token[0] == 'op' and token[1] in ASSIGN_OPS:
+                segments.append(current)
+                ops.append(token[1])
+                current = []
+            else:
+                current.append(token)
+        origins = self.expr(current)
+        for lhs, op in zip(reversed(segments), reversed(ops)):
+            for target, whole in self.targets(lhs):
+                if op == '=' and whole and not conditional:
+                    self.state[target] = set(origins)
+                else:
+                    self.state.setdefault(target, set()).update(origins)
+
+    def targets(self, lhs):
+        """(variable, whether it is replaced whole) assigned by an lhs"""
+        if not lhs:
+            return []
+        if lhs[0][1] in ('list', '['):
+            return [(token[1], True) for token in lhs if token[0] == 'var']
+        depth, found = 0, None
+        for i, token in enumerate(lhs):
+            if token[0] == 'op' and token[1] in '([{':
+                depth += 1
+            elif token[0] == 'op' and token[1] in ')]}':
+                depth -= 1
+            elif depth == 0 and token[0] == 'var':
+                found = i
+        if found is None:
+            return []
+        name, rest = lhs[found][1], lhs[found + 1:]
+        if name == '$this' and len(rest) >= 2 and rest[0][1] == '->':
+            return [(f'$this->{rest[1][1]}', len(rest) == 2)]
+        return [(name, not rest)]
+
+    # Expressions
+
+    def expr(self, tokens):
+        """Origins of an expression's value, recording the sinks and calls in it"""
+        if not tokens:
+            return set()
+        depth, question, compare = 0, None, False
+        for i, (kind, value, _) in enumerate(tokens):
+            if kind == 'op' and value in '([{':
+                depth += 1
+            elif kind == 'op' and value in ')]}':
+                depth -= 1
+            elif depth == 0 and kind == 'op' and value == '?' and question is None:
+                question = i
+            elif depth == 0 and (kind == 'op' and value in COMPARE_OPS
+                                 or kind == 'name' and value.lower() in COMPARE_WORDS):
+                compare = True
+        if question is not None:
+            condition, rest = tokens[:question], tokens[question + 1:]
+            branches = split_top(rest, {':'})
+            origins = self.expr(condition)
+            yes = self.expr(branches[0]) if branches[0] else origins
+            no = self.expr([t for part in branches[1:] for t in part])
+            return yes | no
+        origins = self.operands(tokens)
+        return set() if compare else origins
+
+    def operands(self, tokens):
+        origins, i, cast = set(), 0, False
+        while i < len(tokens):
+            kind, value, offset = tokens[i]
+            found = set()
+            if kind == 'var':
+                found, i = self.variable(tokens, i)
+            elif kind == 'name':
+                found, i = self.name(tokens, i)
+            elif kind in ('dq', 'heredoc'):
+                if not (kind == 'heredoc' and re.match(r"<<<[ \t]*'", value)):
+                    found = self.interpolated(value)
+                i += 1
+            elif kind == 'cast':
+                cast = True
+                i += 1
+                continue
+            elif kind == 'op' and value in ('(', '['):
+                end = closing(tokens, i)
+                inner = tokens[i + 1:end]
+                if value == '(':
+                    found = self.expr(inner)
+                else:
+                    for part in split_top(inner, {','}):
+                        found |= self.expr(split_top(part, {'=>'})[-1])
+                i = end + 1
+            else:
+                i += 1
+                continue
+            origins |= set() if cast else found
+            cast = False
+        return origins
+
+    def interpolated(self, literal):
+        found = set()
+        for match in INTERPOLATION_RE.finditer(literal):
+            name = '$' + match.group(1)
+            if name in SUPERGLOBALS or name == '$_SERVER':
+                found |= self.superglobal(name, match.group(2))
+            else:
+                found |= self.state.get(name, set())
+        return found
+
+    def superglobal(self, name, key):
+        if name == '$_SERVER' and not (key and CLIENT_SERVER_KEYS.match(key)):
+            return set()
+        return {origin('src', f"{name}['{key}']" if key else name)}
+
+    def variable(self, tokens, i):
+        """Origins of a variable with its [..], ->prop and ->method() accessors"""
+        name, line = tokens[i][1], self.line_of(tokens[i][2])
+        i += 1
+        key = None
+        if i + 2 < len(tokens) and tokens[i][1] == '[' and tokens[i + 1][0] == 'sq' and tokens[i + 2][1] == ']':
+            key = tokens[i + 1][1][1:-1]
+        if name in SUPERGLOBALS or name == '$_SERVER':
+            found = self.superglobal(name, key)
+        else:
+            found = set(self.state.get(name, set()))
+        while i < len(tokens) and tokens[i][1] in ('[', '->', '::'):
+            if tokens[i][1] == '[':
+                end = closing(tokens, i)
+                self.expr(tokens[i + 1:end])
+                i = end + 1
+                continue
+            if i + 1 >= len(tokens):
+                break
+            member = tokens[i + 1][1]
+            if i + 2 < len(tokens) and tokens[i + 2][1] == '(':
+                end = closing(tokens, i + 2)
+                args = [self.expr(part) for part in split_top(tokens[i + 3:end], {','}) if part]
+                found = self.method(name, member, args, line)
+                name = None
+                i = end + 1
+            else:
+                if name == '$this':
+                    found = set(self.state.get(f'$this->{member}', {origin('unknown', f'$this->{member}')}))
+                name = None
+                i += 2
+        return found, i
+
+    def name(self, tokens, i):
+        """Origins of a function call, static call, new or constant"""
+        value, line = tokens[i][1], self.line_of(tokens[i][2])
+        lower = value.lower().lstrip('\\')
+        if lower == 'new':
+            j = i + 2
+            if j < len(tokens) and tokens[j][1] == '(':
+                end = closing(tokens, j)
+                self.expr(tokens[j + 1:end])
+                return set(), end + 1
+            return set(), j
+        if i + 3 < len(tokens) and tokens[i + 1][1] == '::' and tokens[i + 3][1] == '(':
+            end = closing(tokens, i + 3)
+            args = [self.expr(part) for part in split_top(tokens[i + 4:end], {','}) if part]
+            return self.method(value, tokens[i + 2][1], args, line), end + 1
+        if i + 1 < len(tokens) and tokens[i + 1][1] == '(':
+            end = closing(tokens, i + 1)
+            parts = [part for part in split_top(tokens[i + 2:end], {','}) if part]
+            args = [self.expr(part) for part in parts]
+            return self.call(lower, args, line), end + 1
+        return set(), i + 1
+
+    def call(self, name, args, line):
+        everything = set().union(*args) if args else set()
+        if name in CLEAN_FUNCTIONS or name in EXTERNAL_FUNCTIONS:
+            return set()
+        if name in SANITIZERS:
+            return cleaned(everything, SANITIZERS[name])
+        if name in OUTPUT_FUNCTIONS:
+            self.sink('xss', f'{name}()', everything, line)
+            return set()
+        if name in SQL_FUNCTIONS:
+            position = SQL_FUNCTIONS[name]
+            self.sink('sql', f'{name}()', args[position] if len(args) > position else set(), line)
+            return set()
+        callee = self.engine.functions.get(name)
+        if callee:
+            return self.apply(callee, args, line)
+        return everything
+
+    def method(self, owner, method, args, line):
+        everything = set().union(*args) if args else set()
+        lower = method.lower()
+        if owner == '$wpdb':
+            if lower in SQL_METHODS:
+                self.sink('sql', f'$wpdb->{method}()', args[0] if args else set(), line)
+                return cleaned(everything, ('sql',)) if lower == 'prepare' else set()
+            return set() if lower in WPDB_CLEAN_METHODS else everything
+        callee = self.engine.resolve_method(lower, self.key if owner in ('$this', 'self', 'static') else None)
+        if callee:
+            return self.apply(callee, args, line)
+        return everything | {origin('unknown', f'{owner or "(expr)"}->{method}()')}
+
+    def apply(self, callee, args, line):
+        """Origins of a plugin function's return value for these arguments"""
+        self.calls.append({"callee": callee, "line": line, "args": [sorted(arg) for arg in args]})
+        summary = self.engine.summary(callee)
+        self.deps[callee] = self.engine.returns_digest(callee)
+        found = set()
+        for kind, detail, done in summary['returns']:
+            if kind == 'param':
+                if detail < len(args):
+                    found |= cleaned(args[detail], done)
+            else:
+                found.add(origin(kind, detail, done))
+        return found
+
+    def sink(self, kind, name, origins, line):
+        reaching = sorted(o for o in origins if kind not in o[2])
+        self.sinks.append({"kind": kind, "sink": name, "line": line, "origins": reaching})
+
+    def summary(self):
+        return {"returns": sorted(self.returns), "sinks": self.sinks, "calls": self.calls}
+
+def freeze(summary):
+    """Summary as loaded from JSON, with origins as tuples"""
+    thaw = lambda origins: [origin(kind, detail, done) for kind, detail, done in origins]
+    return {"returns": thaw(summary['returns']),
+            "sinks": [dict(sink, origins=thaw(sink['origins'])) for sink in summary['sinks']],
+            "calls": [dict(call, args=[thaw(arg) for arg in call['args']]) for call in summary['calls']]}
+
+class TaintEngine:
+    """Function summaries of the plugin, cached by content hash, and sink verdicts"""
+
+    def __init__(self, root, cache_path=None, sources=SOURCES):
+        self.root = root
+        self.cache_path = cache_path
+        self.cache = {}
+        if cache_path:
+            try:
+                with open(cache_path) as f:
+                    data = json.load(f)
+                if data.get('version') == ENGINE_VERSION:
+                    self.cache = data.get('summaries', {})
+            except (OSError, ValueError):
+                self.cache = {}
+        self.units = {}         # key -> unit
+        self.files = {}         # relative path -> unit keys
+        self.functions = {}     # lower name -> key
+        self.methods = {}       # lower name -> [keys]
+        self.summaries = {}
+        self.digests = {}       # key -> hash of its return summary
+        self.in_progress = set()
+        self.reused = self.analysed = 0
+        for pattern in sources:
+            for path in sorted(glob.glob(os.path.join(root, pattern), recursive=True)):
+                relative = os.path.relpath(path, root)
+                if EXCLUDE_RE.search(relative):
+                    continue
+                with open(path, encoding='utf-8', errors='replace') as f:
+                    self.add_file(relative.replace(os.sep, '/'), f.read())
+
+    def add_file(self, name, text):
+        """Index (or replace) one file's functions and top-level code"""
+        for key in self.files.pop(name, []):
+            self.units.pop(key, None)
+            self.summaries.pop(key, None)
+        newlines = [i for i, ch in enumerate(text) if ch == '\n']
+        line_of = lambda offset: bisect.bisect_right(newlines, offset - 1) + 1
+        units, main, closure_params = parse_units(text)
+        keys = []
+        for unit in units:
+            key = f"{name}::{unit['class'] + '::' if unit['class'] else ''}{unit['name']}"
+            start = line_of(unit['offset'])
+            self.units[key] = dict(unit, file=name, start=start, line_of=line_of, closure_params=set(),
+                                   digest=hashlib.sha256(unit['source'].encode('utf-8')).hexdigest())
+            keys.append(key)
+            if unit['class']:
+                self.methods.setdefault(unit['name'].lower(), []).append(key)
+            else:
+                self.functions.setdefault(unit['name'].lower(), key)
+        main_key = f"{name}::<main>"
+        self.units[main_key] = {"name": "<main>", "class": None, "params": [], "tokens": main, "file": name,
+                                "start": 1, "line_of": line_of, "closure_params": closure_params,
+                                "digest": hashlib.sha256(text.encode('utf-8')).hexdigest()}
+        keys.append(main_key)
+        self.files[name] = keys
+        self.summaries, self.digests = {}, {}
+        return keys
+
+    def resolve_method(self, name, caller=None):
+        """Key of a method, preferring the caller's class, else the only one by that name"""
+        candidates = self.methods.get(name, [])
+        if caller:
+            prefix = caller.rsplit('::', 1)[0] + '::'
+            own = [key for key in candidates if key.startswith(prefix)]
+            if own:
+                return own[0]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def summary(self, key):
+        """Summary of one unit, from the cache while it and its callees are unchanged"""
+        if key in self.summaries:
+            return self.summaries[key]
+        if key in self.in_progress:
+            return {"returns": [], "sinks": [], "calls": []}  # recursion: no flow through the cycle
+        unit = self.units[key]
+        entry = self.cache.get(key)
+        self.in_progress.add(key)
+        try:
+            if entry and entry['digest'] == unit['digest'] and all(
+                    dep in self.units and self.returns_digest(dep) == digest
+                    for dep, digest in entry['deps'].items()):
+                summary = freeze(entry['summary'])
+                self.reused += 1
+            else:
+                summary, deps = self.analyse(key, unit)
+                self.cache[key] = {"digest": unit['digest'], "deps": deps,
+                                   "summary": json.loads(json.dumps(summary))}
+                self.analysed += 1
+        finally:
+            self.in_progress.discard(key)
+        self.summaries[key] = summary
+        self.digests[key] = hashlib.sha256(json.dumps(summary['returns']).encode('utf-8')).hexdigest()[:16]
+        return summary
+
+    def analyse(self, key, unit):
+        # Lines are stored relative to the unit, so moving a function does not invalidate it
+        start, line_of = unit['start'], unit['line_of']
+        analysis = UnitAnalysis(self, key, unit['params'], unit['closure_params'],
+                                lambda offset: line_of(offset) - start)
+        analysis.run(unit['tokens'])
+        return analysis.summary(), analysis.deps
+
+    def returns_digest(self, key):
+        if key in self.in_progress:
+            return ''
+        self.summary(key)
+        return self.digests[key]
+
+    def call_sites(self):
+        """callee key -> [(caller key, absolute line, argument origins)]"""
+        sites = {}
+        for key in self.units:
+            for call in self.summary(key)['calls']:
+                sites.setdefault(call['callee'], []).append(
+                    (key, call['line'] + self.units[key]['start'], call['args']))
+        return sites
+
+    def resolve(self, key, param, kind, sites, seen):
+        """Verdict of a sink reached by parameter param of key, from its call sites"""
+        unit = self.units[key]
+        label = unit['params'][param] if param < len(unit['params']) else f'#{param}'
+        callers = sites.get(key, [])
+        if not callers:
+            return 'unknown', [], [f"parameter {label} of {unit['name']}(), which no plugin code calls"], []
+        verdict, sources, reasons, via = 'safe', [], [], []
+        for caller, line, args in callers:
+            if (caller, param) in seen:
+                continue
+            for kind_, detail, done in (args[param] if param < len(args) else []):
+                if kind in done:
+                    continue
+                if kind_ == 'src':
+                    verdict = 'vulnerable'
+                    sources.append(detail)
+                    via.append(f"{self.units[caller]['file']}:{line}")
+                elif kind_ == 'unknown' and verdict != 'vulnerable':
+                    verdict = 'unknown'
+                    reasons.append(detail)
+                elif kind_ == 'param':
+                    inner = self.resolve(caller, detail, kind, sites, seen | {(caller, param)})
+                    if inner[0] == 'vulnerable' or inner[0] == 'unknown' and verdict == 'safe':
+                        verdict = inner[0]
+                    sources += inner[1]
+                    reasons += inner[2]
+                    via += [f"{self.units[caller]['file']}:{line}"] + inner[3] if inner[0] != 'safe' else []
+        return verdict, sources, reasons, via
+
+    def sinks(self, files=None):
+        """Every sink of the given files (default: all) with its verdict"""
+        sites = self.call_sites()
+        records = []
+        for name in files if files is not None else self.files:
+            for key in self.files.get(name, []):
+                unit = self.units[key]
+                for sink in self.summary(key)['sinks']:
+                    verdict, sources, reasons, via = 'safe', [], [], []
+                    for kind_, detail, _ in sink['origins']:
+                        if kind_ == 'src':
+                            verdict = 'vulnerable'
+                            sources.append(detail)
+                        elif kind_ == 'unknown':
+                            reasons.append(detail)
+                        else:
+                            inner = self.resolve(key, detail, sink['kind'], sites, frozenset())
+                            sources += inner[1]
+                            reasons += inner[2]
+                            via += inner[3]
+                            if inner[0] == 'vulnerable':
+                                verdict = 'vulnerable'
+                    if verdict != 'vulnerable' and reasons:
+                        verdict = 'unknown'
+                    records.append({"file": name, "line": sink['line'] + unit['start'], "kind": sink['kind'],
+                                    "sink": sink['sink'], "function": unit['name'], "verdict": verdict,
+                                    "sources": sorted(set(sources)), "via": sorted(set(via)),
+                                    "reasons": sorted(set(reasons))})
+        return sorted(records, key=lambda record: (record['file'], record['line']))
+
+    def file_sinks(self, name, text=None):
+        """Sinks of one file, re-indexing it first if text differs from the indexed copy"""
+        name = name.replace(os.sep, '/')
+        main = self.units.get(f"{name}::<main>")
+        if text is not None and (not main or main['digest'] != hashlib.sha256(text.encode('utf-8')).hexdigest()):
+            self.add_file(name, text)
+        elif main is None:
+            return []
+        return self.sinks([name])
+
+    def save(self):
+        if not self.cache_path:
+            return
+        live = {key: entry for key, entry in self.cache.items() if key in self.units}
+        os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+        with open(self.cache_path, 'w') as f:
+            json.dump({"version": ENGINE_VERSION, "summaries": live}, f)
+
+def describe(record):
+    """One line about a sink and what reaches it"""
+    what = "SQL query" if record['kind'] == 'sql' else "output"
+    text = f"line {record['line']}: {record['sink']} ({what})"
+    if record['sources']:
+        text += " reached by " + ", ".join(record['sources'])
+    if record['via']:
+        text += " via calls at " + ", ".join(record['via'][:3])
+    if record['verdict'] == 'unknown' and record['reasons']:
+        text += " depends on " + ", ".join(record['reasons'][:3])
+    return text
+
+def taint_note(records, filename=None):
+    """Prompt section with what the engine decided, so the model only judges the rest"""
+    if not records:
+        return ""
+    proven = [record for record in records if record['verdict'] == 'vulnerable']
+    safe = sorted({record['line'] for record in records if record['verdict'] == 'safe'})
+    unknown = [record for record in records if record['verdict'] == 'unknown']
+    where = f" of {filename}" if filename else ""
+    note = (f"Static taint analysis{where} already followed request input ($_GET/$_POST/$_REQUEST/$_COOKIE)\n"
+            f"        to SQL queries and output through assignments and plugin function calls.\n")
+    if proven:
+        note += "        Proven and already reported, do not repeat: " + "; ".join(
+            describe(record) for record in proven[:20]) + ".\n"
+    if safe:
+        note += ("        No request input reaches the SQL queries and output on lines "
+                 + ", ".join(map(str, safe[:60])) + "; do not report reflected SQL injection or XSS there.\n")
+    if unknown:
+        note += "        Undecided, please judge: " + "; ".join(describe(record) for record in unknown[:20]) + ".\n"
+    return note + "\n        "
+
+def taint_findings(records, filename):
+    """Findings for the proven flows"""
+    from mqtools.findings import make_finding
+
+    findings = []
+    for record in records:
+        if record['verdict'] != 'vulnerable':
+            continue
+        if record['kind'] == 'sql':
+            rule, category = "Request input in SQL query", "sql_injection"
+            advice = "Use $wpdb->prepare() with placeholders, or intval()/esc_sql() the values."
+        else:
+            rule, category = "Unescaped request input in output", "xss"
+            advice = "Escape with esc_html()/esc_attr()/esc_url() for the output context."
+        where = "top-level code" if record['function'] == '<main>' else f"{record['function']}()"
+        description = (f"{', '.join(record['sources'])} reaches {record['sink']} in {where} without sanitization"
+                       + (f" (via calls at {', '.join(record['via'][:3])})" if record['via'] else "")
+                       + f". {advice}")
+        findings.append(make_finding(filename, description, "taint", record['line'], category=category,
+                                     severity="high", rule=rule))
+    return findings
+
+def load_taint_engine(root=None):
+    """Taint engine over the plugin, with cached summaries"""
+    from mqtools.config import PLUGIN_DIR, TAINT_CACHE_PATH
+    return TaintEngine(root or PLUGIN_DIR, TAINT_CACHE_PATH)
+
+def run_taint(args):
+    """Entry point for `mqtools taint`"""
+    import time
+
+    started = time.perf_counter()
+    engine = load_taint_engine(args.root)
+    files = None
+    if args.files:
+        files = []
+        for path in args.files:
+            name = os.path.relpath(os.path.abspath(path), os.path.abspath(engine.root)).replace(os.sep, '/')
+            with open(path, encoding='utf-8', errors='replace') as f:
+                engine.file_sinks(name, f.read())
+            files.append(name)
+    records = engine.sinks(files)
+    elapsed = (time.perf_counter() - started) * 1000
+    engine.save()
+
+    shown = records if args.all else [record for record in records if record['verdict'] != 'safe']
+    if args.json:
+        print(json.dumps(shown, indent=2))
+        return
+    for record in shown:
+        print(f"{record['verdict']:<10} {record['file']}:{describe(record)}")
+    counts = {verdict: sum(record['verdict'] == verdict for record in records)
+              for verdict in ('vulnerable', 'unknown', 'safe')}
+    print(f"✓ {len(records)} sinks: {counts['vulnerable']} vulnerable, {counts['unknown']} left to the model, "
+          f"{counts['safe']} safe ({engine.analysed} functions analysed, {engine.reused} from cache, "
+          f"{elapsed:.0f} ms)")
@@ -0,0 +1,180 @@
+"""
+Minified and vendored file detection
+
+Third-party code is not worth review tokens: assets/js/ckeditor.js alone is
+about 108k tokens on one line, and Chart.bundle.js another 142k. classify()
+decides from cheap signals, in this order:
+
+  overrides   review-overrides.json forces files in ("include") or out ("exclude")
+  hash        the file is a known library build (line endings normalised)
+  path        vendor/, node_modules/, bower_components/ or a .min.js/.min.css name
+  minified    long lines with almost no whitespace
+  license     a third-party banner in the first 2 KB (/*!, @license, Copyright 2018 ...)
+
+Whole-file character entropy does not separate the two here (5.15 bits for
+ckeditor.js, 5.1-5.4 for the plugin's own JS and PHP), so the minified
+test uses the whitespace share; the entropy is reported alongside it.
+"""
+
+import fnmatch
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+
+from mqtools.latency import estimate_tokens
+
+FIRST_PARTY = 'first-party'
+VENDORED = 'vendored'
+MINIFIED = 'minified'
+
+CODE_EXTENSIONS = {'.php', '.js', '.css', '.html', '.htm'}
+VENDOR_DIRS = {'vendor', 'node_modules', 'bower_components'}
+MINIFIED_NAME_RE = re.compile(r'[.-]min\.(?:js|css)$', re.I)
+LICENSE_RE = re.compile(r'/\*!|@license\b|Released under the|Licensed under the|Copyright\s+(?:\(c\)\s*|©\s*)?\d{4}',
+                        re.I)
+HEADER_BYTES = 2048
+
+MINIFIED_MEAN_LINE = 200    # characters per line on average
+LONG_LINE = 500             # a line this long counts towards the long-line share
+MINIFIED_LONG_SHARE = 0.5   # share of characters on long lines
+MINIFIED_WHITESPACE = 0.08  # hand-written code here is 13-30% whitespace
+ENTROPY_SAMPLE = 65536
+
+# sha256 of known library builds, after CRLF -> LF
+KNOWN_LIBRARIES = {
+    'd16578459fa80bebce63308a70743b4770ee886a3401ab34c8212762153892fb': "Chart.js 2.7.3 bundle",
+    '9c4ae1122c57fff87b0265921c9fb34d7545f1f87c4379484cd7bcde4141188a': "CKEditor 5 classic build (2018)",
+}
+
+def entropy(text):
+    """Shannon entropy of text in bits per character"""
+    if not text:
+        return 0.0
+    counts = Counter(text)
+    return -sum(n / len(text) * math.log2(n / len(text)) for n in counts.values())
+
+def text_stats(text):
+    """Line-length, whitespace and entropy figures of a file"""
+    lengths = [len(line) for line in text.splitlines()] or [0]
+    return {
+        "mean_line": len(text) / len(lengths),
+        "max_line": max(lengths),
+        "long_share": sum(n for n in lengths if n >= LONG_LINE) / max(1, len(text)),
+        "whitespace": sum(text.count(ch) for ch in ' \t\r\n') / max(1, len(text)),
+        "entropy": entropy(text[:ENTROPY_SAMPLE]),
+    }
+
+def library_digest(data):
+    return hashlib.sha256(data.replace(b'\r\n', b'\n')).hexdigest()
+
+def load_overrides(path):
+    """Include and exclude globs, or empty lists"""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {"include": [], "exclude": []}
+    return {"include": list(data.get('include', [])), "exclude": list(data.get('exclude', []))}
+
+def matches(name, patterns):
+    """Glob from patterns matching the relative name or its basename, or None"""
+    return next((pattern for pattern in patterns
+                 if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(os.path.basename(name), pattern)), None)
+
+def relative_name(path, root):
+    """path relative to root with / separators, or as given when outside it"""
+    path = os.fspath(path)
+    absolute = os.path.abspath(path)
+    if root and absolute.startswith(os.path.abspath(root) + os.sep):
+        path = os.path.relpath(absolute, root)
+    return path.replace(os.sep, '/')
+
+def classify_text(name, data, overrides):
+    """(kind, reason) of a file's name (relative, / separated) and bytes"""
+    pattern = matches(name, overrides['include'])
+    if pattern:
+        return FIRST_PARTY, f"included by override {pattern}"
+    pattern = matches(name, overrides['exclude'])
+    if pattern:
+        return VENDORED, f"excluded by override {pattern}"
+
+    library = KNOWN_LIBRARIES.get(library_digest(data))
+    if library:
+        return VENDORED, f"known library: {library}"
+    vendor_dir = next((part for part in name.split('/')[:-1] if part in VENDOR_DIRS), None)
+    if vendor_dir:
+        return VENDORED, f"under {vendor_dir}/"
+    if MINIFIED_NAME_RE.search(name):
+        return MINIFIED, "minified file name"
+
+    text = data.decode('utf-8', errors='replace')
+    stats = text_stats(text)
+    if ((stats['mean_line'] >= MINIFIED_MEAN_LINE or stats['long_share'] >= MINIFIED_LONG_SHARE)
+            and stats['whitespace'] < MINIFIED_WHITESPACE):
+        return MINIFIED, (f"{stats['mean_line']:.0f} chars per line, {stats['whitespace']:.0%} whitespace, "
+                          f"entropy {stats['entropy']:.2f}")
+    banner = LICENSE_RE.search(text[:HEADER_BYTES])
+    if banner:
+        return VENDORED, f"third-party license header ({banner.group(0).strip()})"
+    return FIRST_PARTY, ""
+
+def classify(path, root=None, overrides=None):
+    """(kind, reason, tokens) for a file on disk; tokens is its estimated prompt size"""
+    from mqtools.config import PLUGIN_DIR, REVIEW_OVERRIDES
+
+    root = root or PLUGIN_DIR
+    overrides = overrides if overrides is not None else load_overrides(REVIEW_OVERRIDES)
+    with open(path, 'rb') as f:
+        data = f.read()
+    kind, reason = classify_text(relative_name(path, root), data, overrides)
+    return kind, reason, estimate_tokens(data.decode('utf-8', errors='replace'))
+
+def split_first_party(paths, root=None, overrides=None):
+    """(first-party paths, {path: (kind, reason, tokens)} of the others); missing files are kept"""
+    from mqtools.config import REVIEW_OVERRIDES
+
+    overrides = overrides if overrides is not None else load_overrides(REVIEW_OVERRIDES)
+    kept, excluded = [], {}
+    for path in paths:
+        if not os.path.isfile(path):
+            kept.append(path)
+            continue
+        kind, reason, tokens = classify(path, root, overrides)
+        if kind == FIRST_PARTY:
+            kept.append(path)
+        else:
+            excluded[path] = (kind, reason, tokens)
+    return kept, excluded
+
+def run_vendored(args):
+    """Entry point for `mqtools vendored`: classify files, or every code file under the root"""
+    import time
+
+    from mqtools.config import PLUGIN_DIR, REVIEW_OVERRIDES
+    from mqtools.secretscan import walk_files
+
+    root = args.root or PLUGIN_DIR
+    overrides = load_overrides(REVIEW_OVERRIDES)
+    started = time.perf_counter()
+    paths = args.files or [os.path.join(root, relative) for relative in walk_files(root)
+                           if os.path.splitext(relative)[1].lower() in CODE_EXTENSIONS]
+    rows = []
+    for path in paths:
+        kind, reason, tokens = classify(path, root, overrides)
+        rows.append({"file": relative_name(path, root), "kind": kind, "reason": reason, "tokens": tokens})
+    elapsed = time.perf_counter() - started
+
+    if args.json:
+        print(json.dumps(rows if args.all else [row for row in rows if row['kind'] != FIRST_PARTY], indent=2))
+        return
+    for row in rows:
+        if args.all or row['kind'] != FIRST_PARTY:
+            print(f"{row['kind']:<12} {row['tokens']:>8} tokens  {row['file']}"
+                  + (f"  ({row['reason']})" if row['reason'] else ""))
+    excluded = [row for row in rows if row['kind'] != FIRST_PARTY]
+    print(f"✓ {len(excluded)} of {len(rows)} files are minified or vendored: "
+          f"{sum(row['tokens'] for row in excluded)} of {sum(row['tokens'] for row in rows)} tokens "
+          f"kept out of reviews ({elapsed:.1f} s)")
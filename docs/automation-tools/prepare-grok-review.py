@@ -1,20 +1,156 @@
 #!/usr/bin/env python3
 """
 Prepare code files and analysis for Grok review
+
+Files are placed into the package content-addressed: each file is hashed,
+recorded in manifest.json under its path relative to the plugin root, and
+hardlinked (or reflinked) into place instead of copied. The package lives
+in REVIEW_PACKAGE_DIR (.mqtools-cache/review-package, git-ignored), never
+over tracked files, since a hardlink shares its content with the plugin
+source. Files whose hash is unchanged since the last run are skipped.
+When linking is impossible (e.g. across filesystems) the remaining files
+go into one compressed archive instead of copies. Minified and vendored
+files are left out (see mqtools/vendored.py).
 """
 
+import errno
+import hashlib
+import json
 import os
-import shutil
+import sys
+import tarfile
+import time
 from pathlib import Path
 
+from mqtools.config import PLUGIN_DIR, REVIEW_OVERRIDES, REVIEW_PACKAGE_DIR, plugin_path
+from mqtools.vendored import FIRST_PARTY, classify, load_overrides, relative_name
+
+MANIFEST_NAME = "manifest.json"
+SAMPLE_DIR = Path(__file__).resolve().parent / "sample-code"  # tracked hand-picked examples
+ARCHIVE_NAME = "review-package.tar.gz"
+
+def file_digest(path):
+    """SHA-256 and line count of a file, read in one pass"""
+    sha = hashlib.sha256()
+    lines = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+            lines += block.count(b'\n')
+    return sha.hexdigest(), lines
+
+def load_manifest(package_dir):
+    """Manifest from the previous run, or an empty one"""
+    try:
+        with open(package_dir / MANIFEST_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}}
+
+def reflink(src, dst):
+    """Copy-on-write clone (Linux FICLONE); raises OSError if unsupported"""
+    import fcntl
+    FICLONE = 0x40049409
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.unlink(dst)
+            raise
+
+def link_into_package(src, dst):
+    """Place src at dst without copying data; returns the method used"""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+    try:
+        reflink(src, dst)
+        return "reflink"
+    except (OSError, ImportError):
+        return None
+
+def add_to_store(src, package_dir, path, previous, manifest):
+    """Record src in the manifest and link it to package_dir/path unless unchanged; returns (status, method)"""
+    stat = src.stat()
+    dst = package_dir / path
+    key = relative_name(src, PLUGIN_DIR)
+    entry = previous.get(key)
+    
+    # Unchanged size and mtime: trust the recorded hash, skip re-hashing
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        digest, lines = entry["sha256"], entry["lines"]
+    else:
+        digest, lines = file_digest(src)
+    
+    unchanged = (entry and entry["sha256"] == digest and entry.get("path") == str(path) and
+                 (entry["method"] == "archive" or
+                  (dst.exists() and dst.stat().st_ino == stat.st_ino) or
+                  (entry["method"] == "reflink" and dst.exists() and dst.stat().st_size == stat.st_size)))
+    if unchanged:
+        method = entry["method"]
+        status = "unchanged"
+    else:
+        method = link_into_package(src, dst) or "archive"
+        status = "updated"
+    
+    manifest["files"][key] = {
+        "path": str(path),
+        "source": os.path.abspath(src),
+        "sha256": digest,
+        "size": stat.st_size,
+        "lines": lines,
+        "mtime_ns": stat.st_mtime_ns,
+        "method": method
+    }
+    return status, method
+
+def describe(status, method):
+    """What happened to a file, for the progress lines"""
+    if status == "unchanged":
+        return "Unchanged"
+    return "Archived" if method == "archive" else f"Linked ({method})"
+
+def write_archive(package_dir, manifest, previous):
+    """Put every file that could not be linked into one compressed archive"""
+    archived = {k: v for k, v in manifest["files"].items() if v["method"] == "archive"}
+    archive_path = package_dir / ARCHIVE_NAME
+    if not archived:
+        if archive_path.exists():
+            archive_path.unlink()
+        return False
+    
+    previous_archived = {k: v["sha256"] for k, v in previous.items() if v["method"] == "archive"}
+    if archive_path.exists() and previous_archived == {k: v["sha256"] for k, v in archived.items()}:
+        return False
+    
+    with tarfile.open(archive_path, "w:gz") as tar:
+        for key, entry in sorted(archived.items()):
+            tar.add(entry["source"], arcname=entry["path"])
+    return True
+
+def write_if_changed(path, content):
+    """Write a generated file only when its content differs"""
+    path = Path(path)
+    if path.exists() and path.read_text() == content:
+        return False
+    path.write_text(content)
+    return True
+
 def prepare_review_package():
     """Prepare a complete package for Grok to review"""
     
-    # Create review package directory
+    # Review request, instructions and statistics
     package_dir = Path("../ai-reviews")
     package_dir.mkdir(exist_ok=True)
     
-    # Key files to include
+    # Key files to include, relative to the plugin root
     key_files = [
         "moneyquiz.php",
         "class.moneyquiz.php",
@@ -27,35 +163,50 @@ def prepare_review_package():
         "style.css"
     ]
     
-    # Copy key files
-    code_dir = Path("sample-code")
-    code_dir.mkdir(exist_ok=True)
+    started = time.perf_counter()
+    
+    # Link key files into the content-addressed package, outside the tracked tree
+    store_dir = Path(REVIEW_PACKAGE_DIR)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(store_dir)["files"]
+    manifest = {"files": {}}
+    overrides = load_overrides(REVIEW_OVERRIDES)
     
+    found = 0
     for file in key_files:
-        src = Path(file)
+        src = Path(plugin_path(file))
         if src.exists():
-            # Create subdirectories if needed
-            dst = code_dir / file
-            dst.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(src, dst)
-            print(f"✓ Copied {file}")
+            found += 1
+            kind, reason, tokens = classify(src, overrides=overrides)
+            if kind != FIRST_PARTY:
+                manifest.setdefault("excluded", {})[file] = {"kind": kind, "reason": reason, "tokens": tokens}
+                print(f"✗ Skipped {kind} file {file}: {reason} (~{tokens} tokens)")
+                continue
+            status, method = add_to_store(src, store_dir, Path("sample-code") / file, previous, manifest)
+            print(f"✓ {describe(status, method)} {file}")
         else:
-            print(f"✗ File not found: {file}")
+            print(f"✗ File not found: {src}")
+    if not found:
+        print("✗ None of the key plugin files were found; set MQTOOLS_PLUGIN_DIR to the plugin root")
+        sys.exit(1)
     
-    # Copy Claude's analysis reports
+    # Link Claude's analysis reports
     reports = [
-        "Money-Quiz-Plugin-Analysis-Report.md",
-        "Money-Quiz-Code-Review-Report.md"
+        "docs/analysis-reports/Money-Quiz-Plugin-Analysis-Report.md",
+        "docs/security-quality/Money-Quiz-Code-Review-Report.md"
     ]
     
     for report in reports:
-        if Path(report).exists():
-            shutil.copy2(report, package_dir / report)
-            print(f"✓ Copied {report}")
+        src = Path(plugin_path(report))
+        if src.exists():
+            status, method = add_to_store(src, store_dir, Path("reports") / src.name, previous, manifest)
+            print(f"✓ {describe(status, method)} {report}")
+    
+    if write_archive(store_dir, manifest, previous):
+        print(f"✓ Packed unlinkable files into {store_dir / ARCHIVE_NAME}")
     
     # Create a code snippets file with problematic examples
-    with open("sample-code/critical-code-examples.php", "w") as f:
-        f.write("""<?php
+    write_if_changed(SAMPLE_DIR / "critical-code-examples.php", """<?php
 // CRITICAL CODE EXAMPLES FROM MONEY QUIZ PLUGIN
 
 // 1. SQL INJECTION VULNERABILITIES
@@ -121,8 +272,7 @@ $prospect_data = $_POST['prospect_data']; // This line never executes
     print(f"✓ Created critical code examples file")
     
     # Create instructions file
-    with open(package_dir / "grok-instructions.md", "w") as f:
-        f.write("""# Instructions for Grok Review
+    write_if_changed(package_dir / "grok-instructions.md", """# Instructions for Grok Review
 
 ## How to Review This Plugin:
 
@@ -196,19 +346,23 @@ Please provide detailed, actionable recommendations with code examples where app
 - REST API: No
 """
     
-    with open(package_dir / "plugin-statistics.md", "w") as f:
-        f.write(stats_content)
+    write_if_changed(package_dir / "plugin-statistics.md", stats_content)
     
     print(f"✓ Created plugin statistics")
     
+    # Manifest of hashes, sizes and line counts for everything in the package
+    write_if_changed(store_dir / MANIFEST_NAME, json.dumps(manifest, indent=2, sort_keys=True))
+    total_lines = sum(entry["lines"] for entry in manifest["files"].values())
+    print(f"✓ Manifest: {len(manifest['files'])} files, {total_lines} lines "
+          f"({time.perf_counter() - started:.2f}s)")
+    
     print("\n" + "="*60)
     print("✓ Grok review package prepared successfully!")
     print(f"✓ Package location: {package_dir.absolute()}")
     print("\nThe package contains:")
     print("  - ../ai-reviews/review-request.md (main review request with Claude's findings)")
-    print("  - ../automation-tools/sample-code/ (key plugin files)")
+    print(f"  - {store_dir}/sample-code/ and reports/ (key plugin files and Claude's reports, linked)")
     print("  - ../automation-tools/sample-code/critical-code-examples.php (most problematic code)")
-    print("  - Claude's analysis reports")
     print("  - grok-instructions.md (review instructions)")
     print("  - plugin-statistics.md (codebase metrics)")
     print("\nYou can now share this package with Grok for review.")
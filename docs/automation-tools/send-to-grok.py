@@ -3,20 +3,13 @@
 Send Money Quiz review package to Grok AI
 """
 
-import requests
 import json
 import time
-import os
 from pathlib import Path
 
-# Configuration
-API_KEY = os.environ.get('GROK_API_KEY', '')
-API_ENDPOINT = "https://api.x.ai/v1/chat/completions"
-
-if not API_KEY:
-    print("Error: GROK_API_KEY environment variable not set")
-    print("Please set it with: export GROK_API_KEY='your-api-key'")
-    exit(1)
+# Configuration (the API key is checked lazily, when a request is made)
+from mqtools.client import GrokClient
+from mqtools.config import API_ENDPOINT, MODEL, REVIEW_PACKAGE_DIR, require_api_key
 
 def read_file(filepath):
     """Read file content"""
@@ -25,6 +18,7 @@ def read_file(filepath):
 
 def send_to_grok():
     """Send the review request and key files to Grok"""
+    api_key = require_api_key()
     
     print("Preparing to send Money Quiz plugin review to Grok AI...")
     print("="*60)
@@ -36,7 +30,9 @@ def send_to_grok():
     critical_code = read_file("sample-code/critical-code-examples.php")
     
     # Read a sample of the main plugin file
-    main_plugin_sample = read_file("sample-code/moneyquiz.php")[:5000]
+    # (the current copy from `prepare` when there is one)
+    packaged = Path(REVIEW_PACKAGE_DIR) / "sample-code" / "moneyquiz.php"
+    main_plugin_sample = read_file(packaged if packaged.exists() else "sample-code/moneyquiz.php")[:5000]
     
     # Construct the comprehensive prompt
     prompt = f"""{review_request}
@@ -66,13 +62,8 @@ Please be specific with line numbers and code examples in your recommendations.
 """
 
     # Prepare API request
-    headers = {
-        "Authorization": f"Bearer {API_KEY}",
-        "Content-Type": "application/json"
-    }
-    
     payload = {
-        "model": "grok-4-0709",
+        "model": MODEL,
         "messages": [
             {
                 "role": "system",
@@ -89,16 +80,12 @@ Please be specific with line numbers and code examples in your recommendations.
     
     print("Sending request to Grok AI...")
     
+    client = GrokClient(api_key, API_ENDPOINT, timeout=60, max_retries=1)
     try:
-        response = requests.post(
-            API_ENDPOINT,
-            headers=headers,
-            json=payload,
-            timeout=60
-        )
-        response.raise_for_status()
-        
-        result = response.json()
+        result = client.complete(payload)
+        if "error" in result:
+            print(f"\n✗ Error communicating with Grok API: {result['error']}")
+            return
         
         # Extract Grok's response
         if 'choices' in result and len(result['choices']) > 0:
@@ -129,12 +116,10 @@ Please be specific with line numbers and code examples in your recommendations.
             print("✗ Unexpected response format from Grok")
             print(json.dumps(result, indent=2))
             
-    except requests.exceptions.RequestException as e:
-        print(f"\n✗ Error communicating with Grok API: {e}")
-        if hasattr(e.response, 'text'):
-            print(f"Response: {e.response.text}")
     except Exception as e:
         print(f"\n✗ Unexpected error: {e}")
+    finally:
+        client.close()
 
 if __name__ == "__main__":
     send_to_grok()
\ No newline at end of file